@@ -0,0 +1,280 @@
+"""
+Admission control and load shedding for the action endpoints.
+
+Requests are rejected before they reach a router when the process is
+already saturated, instead of queueing on the event loop until every
+request times out together:
+
+- event-loop lag: a background probe measures how late the loop wakes up;
+  above ADMISSION_MAX_LOOP_LAG_MS all new action requests are shed.
+- in-flight per action: each action ("tasks.view", "users.create", ...) has
+  an AIMD concurrency limit that grows while requests finish within
+  ADMISSION_TARGET_LATENCY_MS and shrinks when they do not, so admitted
+  requests keep a bounded tail latency.
+- per-client token buckets: CLIENT_RATE_LIMIT requests/second with a
+  CLIENT_BURST allowance per client key (X-Client-ID header or host).
+
+Shed requests get APIResponse.overloaded: a 500 with a retry hint.
+"""
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from app.config import settings
+from app.database import client_key_for
+from app.utils.content import is_msgpack, unpackb
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+from app.utils.responses import APIResponse
+
+logger = get_logger(__name__)
+
+# The action tag of a JSON body is sniffed from the raw bytes; full
+# validation happens in the router. It only picks a limiter or a profile
+# label, never an authorization decision.
+_ACTION_RE = re.compile(rb'"action"\s*:\s*"([A-Za-z_]{1,32})"')
+
+# Long-polls hold a request open without using the database, so the change
+# feed is only rate limited, never counted against the concurrency limits.
+_UNLIMITED_RESOURCES = {"changes"}
+
+# Bound on remembered client buckets; the least recently seen are dropped
+_MAX_CLIENTS = 10000
+
+
+async def read_body(receive) -> bytes:
+    """Buffer the whole request body from an ASGI receive channel."""
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+def replay_body(body: bytes, receive):
+    """An ASGI receive channel that yields an already buffered body first."""
+    replayed = False
+    
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+    
+    return replay
+
+
+def sniff_action(body: bytes, content_type: Optional[str] = None) -> str:
+    """
+    The action tag of a raw action request body, or "unknown". MessagePack
+    bodies (per `content_type`) are decoded to read their top-level key.
+    """
+    if is_msgpack(content_type):
+        try:
+            request = unpackb(body)
+        except ValueError:
+            return "unknown"
+        action = request.get("action") if isinstance(request, dict) else None
+        return action if isinstance(action, str) else "unknown"
+    match = _ACTION_RE.search(body[:4096])
+    return match.group(1).decode() if match else "unknown"
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a timer that should fire on time."""
+    
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lag = 0.0
+    
+    async def run(self) -> None:
+        """Sample loop lag until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            sample = max(loop.time() - start - self.interval, 0.0)
+            # Rise immediately, decay smoothly, so a stall is acted on at once
+            self.lag = max(sample, self.lag * 0.7 + sample * 0.3)
+
+
+class ActionLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit for one action."""
+    
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+    
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+    
+    def release(self, latency: float, target: float) -> None:
+        self.in_flight -= 1
+        if latency > target:
+            self.limit = max(self.minimum, self.limit * 0.9)
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow when the limit was actually the constraint
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second."""
+    
+    __slots__ = ("tokens", "updated")
+    
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+    
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """Take one token; return 0 on success or the seconds until one is available."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / rate
+
+
+class AdmissionController:
+    """Decides whether an action request is admitted or shed."""
+    
+    def __init__(self):
+        self.enabled = settings.admission_enabled
+        self.max_loop_lag = settings.admission_max_loop_lag_ms / 1000
+        self.target_latency = settings.admission_target_latency_ms / 1000
+        self.retry_after = settings.admission_retry_after_seconds
+        self.client_rate = settings.client_rate_limit
+        self.client_burst = float(max(settings.client_burst, 1))
+        self.monitor = LoopLagMonitor()
+        self.limiters: Dict[str, ActionLimiter] = {}
+        # resource -> its actions; only these get a limiter of their own
+        self.actions: Dict[str, Set[str]] = {}
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+    
+    def register_actions(self, resource: str, actions: Iterable[str]) -> None:
+        """Declare the actions of a router, each limited separately."""
+        self.actions[resource] = set(actions)
+    
+    def limiter_key(self, resource: str, action: str) -> str:
+        """
+        "{resource}.{action}" for a registered action. Anything else a client
+        sends shares "{resource}.unknown" (or "unknown"), so unknown names
+        never create limiters or metrics of their own.
+        """
+        actions = self.actions.get(resource)
+        if actions is None:
+            return "unknown"
+        return f"{resource}.{action if action in actions else 'unknown'}"
+    
+    def limiter(self, key: str) -> ActionLimiter:
+        limiter = self.limiters.get(key)
+        if limiter is None:
+            limiter = ActionLimiter(
+                settings.admission_max_in_flight,
+                settings.admission_min_in_flight,
+                settings.admission_max_in_flight
+            )
+            self.limiters[key] = limiter
+            metrics.register_gauge(f"admission.limit.{key}", lambda: int(limiter.limit))
+            metrics.register_gauge(f"admission.in_flight.{key}", lambda: limiter.in_flight)
+        return limiter
+    
+    def check_client(self, client_key: str) -> float:
+        """Charge the client's bucket; return 0 if allowed, else seconds to wait."""
+        if self.client_rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        bucket = self.buckets.get(client_key)
+        if bucket is None:
+            bucket = TokenBucket(self.client_burst, now)
+            self.buckets[client_key] = bucket
+            if len(self.buckets) > _MAX_CLIENTS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client_key)
+        return bucket.take(self.client_rate, self.client_burst, now)
+    
+    def admit(self, resource: str, action: str, client_key: str) -> Tuple[Optional[ActionLimiter], Optional[str], float]:
+        """
+        Admit or shed a request.
+        Returns (limiter to release, None, 0) when admitted, else
+        (None, reason, retry_after).
+        """
+        wait = self.check_client(client_key)
+        if wait:
+            metrics.increment("admission.shed.rate_limited")
+            return None, "Rate limit exceeded", max(wait, 0.1)
+        
+        if resource in _UNLIMITED_RESOURCES:
+            return None, None, 0.0
+        
+        if self.monitor.lag > self.max_loop_lag:
+            metrics.increment("admission.shed.loop_lag")
+            return None, "Server overloaded", self.retry_after
+        
+        limiter = self.limiter(self.limiter_key(resource, action))
+        if not limiter.try_acquire():
+            metrics.increment("admission.shed.in_flight")
+            return None, "Server overloaded", self.retry_after
+        
+        metrics.increment("admission.admitted")
+        return limiter, None, 0.0
+
+
+# Global admission controller used by the middleware and the lifespan probe
+admission = AdmissionController()
+
+metrics.register_gauge("admission.loop_lag_ms", lambda: round(admission.monitor.lag * 1000, 2))
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the admission controller to POST action requests."""
+    
+    def __init__(self, app, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+        self.prefix = f"{settings.api_prefix}/"
+    
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not self.controller.enabled
+            or not scope["path"].startswith(self.prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        # Buffer the body to sniff the action, then replay it to the router
+        body = await read_body(receive)
+        action = sniff_action(body, Headers(scope=scope).get("content-type"))
+        resource = scope["path"][len(self.prefix):].split("/", 1)[0]
+        client_key = client_key_for(Request(scope))
+        
+        limiter, reason, retry_after = self.controller.admit(resource, action, client_key)
+        if reason:
+            response = APIResponse.overloaded(reason, math.ceil(retry_after))
+            await response(scope, receive, send)
+            return
+        
+        start = time.monotonic()
+        try:
+            await self.app(scope, replay_body(body, receive), send)
+        finally:
+            if limiter is not None:
+                limiter.release(time.monotonic() - start, self.controller.target_latency)
@@ -1,4 +1,7 @@
 from .users import router as users_router
 from .tasks import router as tasks_router
+from .changes import router as changes_router
+from .debug import router as debug_router
+from .jobs import router as jobs_router
 
-__all__ = ["users_router", "tasks_router"]
+__all__ = ["users_router", "tasks_router", "changes_router", "debug_router", "jobs_router"]
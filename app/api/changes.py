@@ -0,0 +1,99 @@
+import json
+from fastapi import APIRouter, Request
+from pydantic import ValidationError
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from app.config import settings
+from app.services.change_feed import change_notifier, change_tail
+from app.schemas.change import ChangeViewRequest, change_action_adapter
+from app.schemas.common import action_openapi
+from app.utils.responses import APIResponse
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.post("/", openapi_extra=action_openapi(change_action_adapter))
+async def handle_change_action(request: Request):
+    """
+    Handle change feed actions: view
+    All responses return either 200 (success/error) or 500 (server error)
+    """
+    try:
+        try:
+            action_request = change_action_adapter.validate_json(await request.body())
+        except ValidationError as e:
+            return APIResponse.validation_error(e)
+
+        logger.info(f"Processing change feed action: {action_request.action}")
+        return await view_changes(action_request.data or ChangeViewRequest())
+
+    except Exception as e:
+        logger.error(f"Error processing change feed action: {e}")
+        return APIResponse.server_error("Failed to process change feed action")
+
+
+async def view_changes(data: ChangeViewRequest) -> APIResponse:
+    """
+    View changes after a sequence number.
+    With `wait` > 0 the request long-polls until new events arrive or the wait expires.
+    """
+    try:
+        since, limit = data.since, data.limit
+        wait = min(data.wait, settings.change_feed_max_wait_seconds)
+
+        feed = await change_tail.read(since, limit)
+        if not feed["events"] and not feed["reset"] and wait > 0:
+            if await change_notifier.wait(since, wait):
+                feed = await change_tail.read(since, limit)
+
+        return APIResponse.success(
+            data=feed,
+            message="Changes retrieved successfully"
+        )
+
+    except Exception as e:
+        logger.error(f"Error viewing changes: {e}")
+        return APIResponse.server_error("Failed to retrieve changes")
+
+
+@router.get("/stream")
+async def stream_changes(request: Request, since: int = 0, limit: int = 100):
+    """Stream changes as Server-Sent Events, resuming from `Last-Event-ID` when present."""
+    last_event_id: Optional[str] = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    cursor = ChangeViewRequest(since=since, limit=limit)
+    since, limit = cursor.since, cursor.limit
+
+    async def event_stream():
+        cursor = since
+        try:
+            while not await request.is_disconnected():
+                feed = await change_tail.read(cursor, limit)
+
+                if feed["reset"]:
+                    yield f"event: reset\ndata: {json.dumps({'since': cursor})}\n\n"
+
+                for change in feed["events"]:
+                    payload = json.dumps(jsonable_encoder(change))
+                    yield f"id: {change['seq']}\nevent: change\ndata: {payload}\n\n"
+                cursor = feed["last_seq"]
+
+                # A full page means more events are already waiting
+                if len(feed["events"]) == limit:
+                    continue
+
+                if not await change_notifier.wait(cursor, settings.change_feed_max_wait_seconds):
+                    yield ": keep-alive\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming changes: {e}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
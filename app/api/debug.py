@@ -0,0 +1,122 @@
+import hmac
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.profiling import collapsed, request_profiler, slow_requests, stack_sampler
+from app.schemas.common import action_openapi
+from app.schemas.debug import (
+    ProfileSampleRequest, ProfileCaptureRequest, ProfileViewRequest, SlowRequestsRequest,
+    profile_action_adapter
+)
+from app.utils.responses import APIResponse
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+def _authorized(request: Request) -> bool:
+    """Debug endpoints are off unless DEBUG_TOKEN is set and sent as X-Debug-Token."""
+    token = request.headers.get("x-debug-token", "")
+    return bool(settings.debug_token) and hmac.compare_digest(token.encode(), settings.debug_token.encode())
+
+
+async def sample_stacks(data: ProfileSampleRequest):
+    """Sample every thread for a while and return collapsed stacks."""
+    try:
+        stacks = await run_in_threadpool(
+            stack_sampler.sample, data.seconds, data.interval_ms / 1000, data.include_idle
+        )
+        if data.format == "collapsed":
+            return PlainTextResponse(collapsed(stacks))
+        
+        return APIResponse.success(
+            data={
+                "samples": sum(stacks.values()),
+                "stacks": len(stacks),
+                "collapsed": collapsed(stacks)
+            },
+            message="Stacks sampled successfully"
+        )
+        
+    except ValueError as e:
+        return APIResponse.error(str(e))
+    except Exception as e:
+        logger.error(f"Error sampling stacks: {e}")
+        return APIResponse.server_error("Failed to sample stacks")
+
+
+async def capture_requests(data: ProfileCaptureRequest) -> APIResponse:
+    """Arm cProfile for the next matching requests."""
+    request_profiler.arm(data.router, data.action, data.requests)
+    return APIResponse.success(
+        data={"router": data.router, "action": data.action, "requests": data.requests},
+        message="Profiling armed"
+    )
+
+
+async def view_profile(data: ProfileViewRequest) -> APIResponse:
+    """Report the cProfile capture: progress and the merged statistics."""
+    try:
+        return APIResponse.success(
+            data={
+                "router": request_profiler.router,
+                "action": request_profiler.action,
+                "remaining": request_profiler.remaining,
+                "captured": request_profiler.captured,
+                "sampling": stack_sampler.running,
+                "stats": request_profiler.report(data.sort, data.limit)
+            },
+            message="Profile retrieved successfully"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error viewing profile: {e}")
+        return APIResponse.server_error("Failed to retrieve profile")
+
+
+async def view_slow_requests(data: SlowRequestsRequest) -> APIResponse:
+    """The most recent slow requests with their SQL statements and timings."""
+    return APIResponse.success(
+        data={
+            "threshold_ms": settings.slow_request_ms,
+            "requests": slow_requests.recent(data.limit)
+        },
+        message="Slow requests retrieved successfully"
+    )
+
+
+# Action dispatch table: action -> (handler, default payload)
+PROFILE_ACTIONS = {
+    "sample": (sample_stacks, ProfileSampleRequest),
+    "cprofile": (capture_requests, ProfileCaptureRequest),
+    "view": (view_profile, ProfileViewRequest),
+    "slow": (view_slow_requests, SlowRequestsRequest),
+}
+
+
+@router.post("/profile", openapi_extra=action_openapi(profile_action_adapter))
+async def handle_profile_action(request: Request):
+    """
+    Handle profiling actions: sample, cprofile, view, slow
+    Requires the X-Debug-Token header to match DEBUG_TOKEN.
+    """
+    try:
+        if not _authorized(request):
+            return APIResponse.error("Not authorized")
+        
+        try:
+            action_request = profile_action_adapter.validate_json(await request.body())
+        except ValidationError as e:
+            return APIResponse.validation_error(e)
+        
+        logger.info(f"Processing profile action: {action_request.action}")
+        handler, default = PROFILE_ACTIONS[action_request.action]
+        return await handler(action_request.data or default())
+        
+    except Exception as e:
+        logger.error(f"Error processing profile action: {e}")
+        return APIResponse.server_error("Failed to process profile action")
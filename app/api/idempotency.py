@@ -0,0 +1,64 @@
+import base64
+from typing import Awaitable, Callable
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from app.services.idempotency_service import IdempotencyService
+from app.utils.content import JSON, MSGPACK
+from app.utils.metrics import metrics
+from app.utils.responses import APIResponse
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+async def run_idempotent(
+    request: Request,
+    db: Session,
+    scope: str,
+    data: BaseModel,
+    handler: Callable[[BaseModel, Session], Awaitable[Response]]
+) -> Response:
+    """
+    Run a create handler at most once per idempotency key.
+    The key comes from the Idempotency-Key header or `data.idempotency_key`.
+    A retry with the same key and payload gets the stored response back
+    without reaching the service layer; 500 responses are not stored, so a
+    failed request can be retried. The replay keeps the media type of the
+    first response.
+    """
+    key = request.headers.get("idempotency-key") or getattr(data, "idempotency_key", None)
+    if not key:
+        return await handler(data, db)
+    if len(key) > 255:
+        return APIResponse.error("Idempotency key must be at most 255 characters")
+    
+    try:
+        record = IdempotencyService.claim(db, scope, key, IdempotencyService.fingerprint(data))
+    except ValueError as e:
+        return APIResponse.error(str(e))
+    
+    if record is not None:
+        metrics.increment("idempotency.replayed")
+        logger.info(f"Replaying stored response for idempotency key {scope}/{key}")
+        media_type = record.media_type or JSON
+        body = record.response_body
+        return Response(
+            content=base64.b64decode(body) if media_type == MSGPACK else body,
+            status_code=record.status_code,
+            media_type=media_type,
+            headers={"Idempotent-Replayed": "true"}
+        )
+    
+    response = await handler(data, db)
+    if response.status_code == 200:
+        if response.media_type == MSGPACK:
+            # Stored in the text column as base64
+            body = base64.b64encode(response.body).decode()
+        else:
+            body = response.body.decode()
+        IdempotencyService.complete(db, scope, key, response.status_code, body, response.media_type)
+    else:
+        IdempotencyService.release(db, scope, key)
+    return response
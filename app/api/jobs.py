@@ -0,0 +1,79 @@
+import json
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from app.database import get_db
+from app.models.job import Job
+from app.services.job_queue import JobService
+from app.schemas.job import JobViewRequest, job_action_adapter
+from app.schemas.common import action_openapi
+from app.utils.responses import APIResponse
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+def _job_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "payload": json.loads(job.payload),
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_at": job.run_at,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "finished_at": job.finished_at
+    }
+
+
+@router.post("/", openapi_extra=action_openapi(job_action_adapter))
+async def handle_job_action(request: Request, db: Session = Depends(get_db)):
+    """
+    Handle background job actions: view
+    All responses return either 200 (success/error) or 500 (server error)
+    Job state is read from the primary; replicas may lag behind the workers.
+    """
+    try:
+        try:
+            action_request = job_action_adapter.validate_json(await request.body())
+        except ValidationError as e:
+            return APIResponse.validation_error(e)
+        
+        logger.info(f"Processing job action: {action_request.action}")
+        return await view_jobs(action_request.data or JobViewRequest(), db)
+        
+    except Exception as e:
+        logger.error(f"Error processing job action: {e}")
+        return APIResponse.server_error("Failed to process job action")
+
+
+async def view_jobs(data: JobViewRequest, db: Session) -> APIResponse:
+    """View one job by ID, or a page of jobs in a status."""
+    try:
+        if data.id is not None:
+            job = JobService.get_job(db, data.id)
+            if not job:
+                return APIResponse.error("Job not found")
+            return APIResponse.success(data=_job_dict(job), message="Job retrieved successfully")
+        
+        jobs = JobService.get_jobs(db, data.status, skip=data.skip, limit=data.size)
+        return APIResponse.success(
+            data={
+                "jobs": [_job_dict(job) for job in jobs],
+                "pagination": {
+                    "page": data.page,
+                    "size": data.size,
+                    "total": len(jobs)
+                }
+            },
+            message="Jobs retrieved successfully"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error viewing jobs: {e}")
+        return APIResponse.server_error("Failed to retrieve jobs")
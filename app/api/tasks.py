@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from pydantic import ValidationError
+from typing import Any, Callable, Dict, List
 from datetime import datetime
-from app.database import get_db
+from app.config import settings
+from app.api.idempotency import run_idempotent
+from app.auth import require_auth
+from app.database import get_db, run_read, session_router, client_key_for
+from app.services.analytics import task_analytics
+from app.services.group_commit import task_writer
 from app.services.task_service import TaskService
-from app.services.user_service import UserService
-from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
-from app.schemas.common import TaskActionRequest
-from app.models.task import TaskStatus, TaskPriority
+from app.schemas.task import (
+    TaskCreate, TaskEditRequest, TaskViewRequest, TaskBulkEditRequest, task_action_adapter
+)
+from app.schemas.common import action_openapi
+from app.utils.content import negotiate, response_type, validate_action
+from app.utils.fragments import serialize, serialize_rows
 from app.utils.responses import APIResponse
+from app.profiling import profiled
+from app.utils.single_flight import view_flights, flight_key
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -16,64 +28,12 @@ logger = get_logger(__name__)
 router = APIRouter()
 
 
-@router.post("/")
-async def handle_task_action(request: TaskActionRequest, db: Session = Depends(get_db)):
-    """
-    Handle task actions: create, edit, view
-    All responses return either 200 (success/error) or 500 (server error)
-    """
-    try:
-        action = request.action
-        data = request.data or {}
-        
-        logger.info(f"Processing task action: {action}")
-        
-        if action == "create":
-            return await create_task(data, db)
-        elif action == "edit":
-            return await edit_task(data, db)
-        elif action == "view":
-            return await view_task(data, db)
-        else:
-            return APIResponse.error(f"Invalid action: {action}")
-            
-    except Exception as e:
-        logger.error(f"Error processing task action: {e}")
-        return APIResponse.server_error("Failed to process task action")
-
-
-async def create_task(data: Dict[str, Any], db: Session) -> APIResponse:
+async def create_task(data: TaskCreate, db: Session) -> APIResponse:
     """Create a new task."""
     try:
-        # Validate required fields
-        required_fields = ["title", "owner_id"]
-        for field in required_fields:
-            if field not in data:
-                return APIResponse.error(f"Missing required field: {field}")
-        
-        # Validate owner exists
-        owner = UserService.get_user_by_id(db, data["owner_id"])
-        if not owner:
-            return APIResponse.error("Owner user not found")
-        
-        # Prepare task data
-        task_data = TaskCreate(
-            title=data["title"],
-            description=data.get("description"),
-            status=data.get("status", TaskStatus.PENDING),
-            priority=data.get("priority", TaskPriority.MEDIUM),
-            due_date=data.get("due_date"),
-            owner_id=data["owner_id"]
-        )
-        
-        # Validate status and priority
-        if task_data.status not in TaskStatus:
-            return APIResponse.error(f"Invalid status: {task_data.status}")
-        if task_data.priority not in TaskPriority:
-            return APIResponse.error(f"Invalid priority: {task_data.priority}")
-        
-        # Create task
-        task = TaskService.create_task(db, task_data)
+        # The payload was fully validated by task_action_adapter; the service
+        # checks that the owner exists. The write joins the next group commit.
+        task = await task_writer.submit(db, TaskService.create_task, data)
         
         # Return success response
         return APIResponse.success(
@@ -85,6 +45,8 @@ async def create_task(data: Dict[str, Any], db: Session) -> APIResponse:
                 "priority": task.priority,
                 "due_date": task.due_date,
                 "owner_id": task.owner_id,
+                "parent_id": task.parent_id,
+                "tags": data.tags or [],
                 "created_at": task.created_at
             },
             message="Task created successfully"
@@ -97,53 +59,34 @@ async def create_task(data: Dict[str, Any], db: Session) -> APIResponse:
         return APIResponse.server_error("Failed to create task")
 
 
-async def edit_task(data: Dict[str, Any], db: Session) -> APIResponse:
+async def edit_task(data: TaskEditRequest, db: Session) -> APIResponse:
     """Edit an existing task."""
     try:
-        # Validate required fields
-        if "id" not in data:
-            return APIResponse.error("Missing required field: id")
-        
-        task_id = data["id"]
-        
-        # Get existing task
-        existing_task = TaskService.get_task_by_id(db, task_id)
-        if not existing_task:
-            return APIResponse.error("Task not found")
-        
-        # Prepare update data
-        update_data = {}
-        allowed_fields = ["title", "description", "status", "priority", "due_date"]
-        
-        for field in allowed_fields:
-            if field in data:
-                update_data[field] = data[field]
-        
-        if not update_data:
+        task_update = data.to_update()
+        if not task_update.model_fields_set:
             return APIResponse.error("No valid fields to update")
         
-        # Validate status and priority if provided
-        if "status" in update_data and update_data["status"] not in TaskStatus:
-            return APIResponse.error(f"Invalid status: {update_data['status']}")
-        if "priority" in update_data and update_data["priority"] not in TaskPriority:
-            return APIResponse.error(f"Invalid priority: {update_data['priority']}")
-        
-        # Update task
-        task_update = TaskUpdate(**update_data)
-        updated_task = TaskService.update_task(db, task_id, task_update)
+        # Update task; the service reports a missing task
+        updated_task = await task_writer.submit(db, TaskService.update_task, data.id, task_update, data.version)
         
         # Return success response
+        task_data = {
+            "id": updated_task.id,
+            "title": updated_task.title,
+            "description": updated_task.description,
+            "status": updated_task.status,
+            "priority": updated_task.priority,
+            "due_date": updated_task.due_date,
+            "completed_at": updated_task.completed_at,
+            "updated_at": updated_task.updated_at,
+            "parent_id": updated_task.parent_id,
+            "version": updated_task.version
+        }
+        if task_update.tags is not None:
+            task_data["tags"] = task_update.tags
+        
         return APIResponse.success(
-            data={
-                "id": updated_task.id,
-                "title": updated_task.title,
-                "description": updated_task.description,
-                "status": updated_task.status,
-                "priority": updated_task.priority,
-                "due_date": updated_task.due_date,
-                "completed_at": updated_task.completed_at,
-                "updated_at": updated_task.updated_at
-            },
+            data=task_data,
             message="Task updated successfully"
         )
         
@@ -154,17 +97,208 @@ async def edit_task(data: Dict[str, Any], db: Session) -> APIResponse:
         return APIResponse.server_error("Failed to update task")
 
 
-async def view_task(data: Dict[str, Any], db: Session) -> APIResponse:
-    """View task(s) based on criteria."""
+async def bulk_edit_task(data: TaskBulkEditRequest, db: Session) -> APIResponse:
+    """Update every task matching a filter."""
+    try:
+        changes = data.patch.model_dump(exclude_none=True)
+        if not changes:
+            return APIResponse.error("No valid fields to update")
+        
+        # Chunked set-based UPDATEs, each chunk in its own transaction
+        counts = await run_in_threadpool(
+            profiled(TaskService.bulk_update_tasks), db, data.filter.model_dump(exclude_none=True), changes
+        )
+        
+        return APIResponse.success(
+            data=counts,
+            message=f"{counts['updated']} tasks updated successfully"
+        )
+        
+    except ValueError as e:
+        return APIResponse.error(str(e))
+    except Exception as e:
+        logger.error(f"Error bulk updating tasks: {e}")
+        return APIResponse.server_error("Failed to update tasks")
+
+
+# Row shapes of the task views. Each is also part of the key of its rows'
+# cached JSON fragments, so a shape must only depend on the task's version.
+def _task_row(task) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "status": task.status,
+        "priority": task.priority,
+        "due_date": task.due_date,
+        "owner_id": task.owner_id,
+        "created_at": task.created_at
+    }
+
+
+def _owned_task_row(task) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "status": task.status,
+        "priority": task.priority,
+        "due_date": task.due_date,
+        "completed_at": task.completed_at,
+        "created_at": task.created_at
+    }
+
+
+def _tagged_task_row(task, tags: List[str]) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "status": task.status,
+        "priority": task.priority,
+        "due_date": task.due_date,
+        "owner_id": task.owner_id,
+        "tags": tags,
+        "created_at": task.created_at
+    }
+
+
+def _task_detail(task, tags: Callable[[], List[str]]) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "title": task.title,
+        "description": task.description,
+        "status": task.status,
+        "priority": task.priority,
+        "due_date": task.due_date,
+        "completed_at": task.completed_at,
+        "owner_id": task.owner_id,
+        "parent_id": task.parent_id,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at,
+        # Archived tasks are read-only and carry no version
+        "version": getattr(task, "version", None),
+        "tags": tags()
+    }
+
+
+def view_task(data: TaskViewRequest, db: Session) -> APIResponse:
+    """
+    View task(s) based on criteria.
+    Synchronous: runs in the threadpool so identical concurrent views can
+    coalesce while the query is in flight.
+    """
     try:
+        data = data or TaskViewRequest()
+        
         # Handle different view scenarios
-        if "id" in data:
+        if data.analytics:
+            # Aggregates of the latest columnar snapshot; no task rows are read
+            report = task_analytics.report
+            if data.owner_id is not None:
+                owner = report.owner(data.owner_id)
+                owners = [owner] if owner else []
+                total = len(owners)
+            else:
+                owners = report.owners_page(data.skip, data.size)
+                total = len(report.owners)
+            
+            return APIResponse.success(
+                data={
+                    "as_of": report.as_of,
+                    "weeks": report.week_starts,
+                    "summary": report.summary,
+                    "owners": owners,
+                    "pagination": {
+                        "page": data.page,
+                        "size": data.size,
+                        "total": total
+                    }
+                },
+                message="Task analytics retrieved successfully"
+            )
+        
+        elif data.id is not None:
             # View specific task by ID
-            task_id = data["id"]
-            include_owner = data.get("include_owner", False)
+            task_id = data.id
+            
+            if data.as_of is not None:
+                # Latest snapshot before as_of plus the changes after it
+                state = TaskService.get_task_state_at(db, task_id, data.as_of)
+                if state is None:
+                    return APIResponse.error("Task did not exist at that time")
+                return APIResponse.success(
+                    data={"id": task_id, "as_of": data.as_of, "state": state},
+                    message="Task state retrieved successfully"
+                )
+            
+            if data.history:
+                entries = TaskService.get_task_history(db, task_id, skip=data.skip, limit=data.size)
+                return APIResponse.success(
+                    data={
+                        "id": task_id,
+                        "history": entries,
+                        "pagination": {
+                            "page": data.page,
+                            "size": data.size,
+                            "total": len(entries)
+                        }
+                    },
+                    message="Task history retrieved successfully"
+                )
+            
+            if data.hierarchy is not None:
+                # Subtree, ancestor path or rollup, each one query on the closure table
+                if not TaskService.get_task_by_id(db, task_id, data.include_archived):
+                    return APIResponse.error("Task not found")
+                
+                if data.hierarchy == "rollup":
+                    counts = TaskService.get_task_rollup(db, task_id, data.include_archived)
+                    return APIResponse.success(
+                        data={"id": task_id, "subtasks": sum(counts.values()), "by_status": counts},
+                        message="Subtask counts retrieved successfully"
+                    )
+                
+                if data.hierarchy == "ancestors":
+                    rows = TaskService.get_task_ancestors(db, task_id, data.include_archived)
+                else:
+                    rows = TaskService.get_task_subtree(
+                        db, task_id, skip=data.skip, limit=data.size, include_archived=data.include_archived
+                    )
+                
+                task_list = []
+                for task, depth in rows:
+                    task_list.append({
+                        "id": task.id,
+                        "title": task.title,
+                        "status": task.status,
+                        "priority": task.priority,
+                        "due_date": task.due_date,
+                        "completed_at": task.completed_at,
+                        "parent_id": task.parent_id,
+                        "depth": depth
+                    })
+                
+                if data.hierarchy == "ancestors":
+                    return APIResponse.success(
+                        data={"id": task_id, "ancestors": task_list},
+                        message="Ancestors retrieved successfully"
+                    )
+                return APIResponse.success(
+                    data={
+                        "id": task_id,
+                        "subtasks": task_list,
+                        "pagination": {
+                            "page": data.page,
+                            "size": data.size,
+                            "total": len(task_list)
+                        }
+                    },
+                    message="Subtasks retrieved successfully"
+                )
             
-            if include_owner:
-                task = TaskService.get_task_with_owner(db, task_id)
+            if data.include_owner:
+                task = TaskService.get_task_with_owner(db, task_id, data.include_archived)
                 if not task:
                     return APIResponse.error("Task not found")
                 
@@ -173,52 +307,47 @@ async def view_task(data: Dict[str, Any], db: Session) -> APIResponse:
                     message="Task retrieved successfully"
                 )
             else:
-                task = TaskService.get_task_by_id(db, task_id)
+                task = TaskService.get_task_by_id(db, task_id, data.include_archived)
                 if not task:
                     return APIResponse.error("Task not found")
                 
+                # Tags are only read to render a fragment that is not cached
                 return APIResponse.success(
-                    data={
-                        "id": task.id,
-                        "title": task.title,
-                        "description": task.description,
-                        "status": task.status,
-                        "priority": task.priority,
-                        "due_date": task.due_date,
-                        "completed_at": task.completed_at,
-                        "owner_id": task.owner_id,
-                        "created_at": task.created_at,
-                        "updated_at": task.updated_at
-                    },
+                    data=serialize(_task_detail, task, partial(TaskService.get_task_tags, db, task_id)),
                     message="Task retrieved successfully"
                 )
                 
-        elif "owner_id" in data:
-            # View tasks by owner
-            owner_id = data["owner_id"]
-            page = data.get("page", 1)
-            size = data.get("size", 10)
+        elif data.tag_query:
+            # View tasks by tags, answered by the tag index
+            page, size, skip = data.page, data.size, data.skip
+            total, tasks = TaskService.get_tasks_by_tags(
+                db, data.tags_all or [], data.tags_any or [], data.tags_none or [],
+                status=data.status, priority=data.priority, skip=skip, limit=size
+            )
+            
+            task_list = serialize_rows(_tagged_task_row, [task for task, _ in tasks], [tags for _, tags in tasks])
             
-            if page < 1:
-                page = 1
-            if size < 1 or size > 100:
-                size = 10
+            return APIResponse.success(
+                data={
+                    "tasks": task_list,
+                    "pagination": {
+                        "page": page,
+                        "size": size,
+                        "total": total
+                    }
+                },
+                message="Tasks retrieved successfully"
+            )
             
-            skip = (page - 1) * size
-            tasks = TaskService.get_tasks_by_owner(db, owner_id, skip=skip, limit=size)
+        elif data.owner_id is not None:
+            # View tasks by owner
+            owner_id = data.owner_id
+            page, size, skip = data.page, data.size, data.skip
+            tasks = TaskService.get_tasks_by_owner(
+                db, owner_id, skip=skip, limit=size, include_archived=data.include_archived
+            )
             
-            task_list = []
-            for task in tasks:
-                task_list.append({
-                    "id": task.id,
-                    "title": task.title,
-                    "description": task.description,
-                    "status": task.status,
-                    "priority": task.priority,
-                    "due_date": task.due_date,
-                    "completed_at": task.completed_at,
-                    "created_at": task.created_at
-                })
+            task_list = serialize_rows(_owned_task_row, tasks)
             
             return APIResponse.success(
                 data={
@@ -232,35 +361,15 @@ async def view_task(data: Dict[str, Any], db: Session) -> APIResponse:
                 message="Tasks retrieved successfully"
             )
             
-        elif "status" in data:
+        elif data.status is not None:
             # View tasks by status
-            status = data["status"]
-            if status not in TaskStatus:
-                return APIResponse.error(f"Invalid status: {status}")
-            
-            page = data.get("page", 1)
-            size = data.get("size", 10)
-            
-            if page < 1:
-                page = 1
-            if size < 1 or size > 100:
-                size = 10
-            
-            skip = (page - 1) * size
-            tasks = TaskService.get_tasks_by_status(db, status, skip=skip, limit=size)
+            status = data.status
+            page, size, skip = data.page, data.size, data.skip
+            tasks = TaskService.get_tasks_by_status(
+                db, status, skip=skip, limit=size, include_archived=data.include_archived
+            )
             
-            task_list = []
-            for task in tasks:
-                task_list.append({
-                    "id": task.id,
-                    "title": task.title,
-                    "description": task.description,
-                    "status": task.status,
-                    "priority": task.priority,
-                    "due_date": task.due_date,
-                    "owner_id": task.owner_id,
-                    "created_at": task.created_at
-                })
+            task_list = serialize_rows(_task_row, tasks)
             
             return APIResponse.success(
                 data={
@@ -274,32 +383,15 @@ async def view_task(data: Dict[str, Any], db: Session) -> APIResponse:
                 message="Tasks retrieved successfully"
             )
             
-        elif "search" in data:
+        elif data.search is not None:
             # Search tasks
-            search_term = data["search"]
-            page = data.get("page", 1)
-            size = data.get("size", 10)
-            
-            if page < 1:
-                page = 1
-            if size < 1 or size > 100:
-                size = 10
-            
-            skip = (page - 1) * size
-            tasks = TaskService.search_tasks(db, search_term, skip=skip, limit=size)
+            search_term = data.search
+            page, size, skip = data.page, data.size, data.skip
+            tasks = TaskService.search_tasks(
+                db, search_term, skip=skip, limit=size, include_archived=data.include_archived
+            )
             
-            task_list = []
-            for task in tasks:
-                task_list.append({
-                    "id": task.id,
-                    "title": task.title,
-                    "description": task.description,
-                    "status": task.status,
-                    "priority": task.priority,
-                    "due_date": task.due_date,
-                    "owner_id": task.owner_id,
-                    "created_at": task.created_at
-                })
+            task_list = serialize_rows(_task_row, tasks)
             
             return APIResponse.success(
                 data={
@@ -315,29 +407,12 @@ async def view_task(data: Dict[str, Any], db: Session) -> APIResponse:
             
         else:
             # View all tasks with pagination
-            page = data.get("page", 1)
-            size = data.get("size", 10)
-            
-            if page < 1:
-                page = 1
-            if size < 1 or size > 100:
-                size = 10
-            
-            skip = (page - 1) * size
-            tasks = TaskService.get_all_tasks(db, skip=skip, limit=size)
+            page, size, skip = data.page, data.size, data.skip
+            tasks = TaskService.get_all_tasks(
+                db, skip=skip, limit=size, include_archived=data.include_archived
+            )
             
-            task_list = []
-            for task in tasks:
-                task_list.append({
-                    "id": task.id,
-                    "title": task.title,
-                    "description": task.description,
-                    "status": task.status,
-                    "priority": task.priority,
-                    "due_date": task.due_date,
-                    "owner_id": task.owner_id,
-                    "created_at": task.created_at
-                })
+            task_list = serialize_rows(_task_row, tasks)
             
             return APIResponse.success(
                 data={
@@ -351,6 +426,64 @@ async def view_task(data: Dict[str, Any], db: Session) -> APIResponse:
                 message="Tasks retrieved successfully"
             )
             
+    except ValueError as e:
+        return APIResponse.error(str(e))
     except Exception as e:
         logger.error(f"Error viewing task: {e}")
         return APIResponse.server_error("Failed to retrieve task information")
+
+
+# Action dispatch table: action -> (handler, reads from a replica session, idempotent)
+# Read handlers are synchronous and coalesced across identical requests;
+# idempotent handlers honour the Idempotency-Key header.
+TASK_ACTIONS = {
+    "create": (create_task, False, True),
+    "edit": (edit_task, False, False),
+    "view": (view_task, True, False),
+    "bulk_edit": (bulk_edit_task, False, False),
+}
+
+
+@router.post("/", openapi_extra=action_openapi(task_action_adapter))
+async def handle_task_action(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Handle task actions: create, edit, view, bulk_edit
+    All responses return either 200 (success/error) or 500 (server error)
+    Bodies are JSON, or MessagePack per the Content-Type and Accept headers.
+    "view" opens a replica session for the read; the write actions use the primary.
+    """
+    try:
+        negotiate(request)
+        try:
+            action_request = validate_action(task_action_adapter, request, await request.body())
+        except ValidationError as e:
+            return APIResponse.validation_error(e)
+        except ValueError as e:
+            return APIResponse.error(str(e))
+        
+        action = action_request.action
+        unauthenticated = require_auth(request, "tasks", action)
+        if unauthenticated is not None:
+            return unauthenticated
+        logger.info(f"Processing task action: {action}")
+        
+        handler, reads, idempotent = TASK_ACTIONS[action]
+        if idempotent:
+            return await run_idempotent(request, db, f"tasks.{action}", action_request.data, handler)
+        if not reads:
+            return await handler(action_request.data, db)
+        
+        client_key = client_key_for(request)
+        compute = partial(run_in_threadpool, profiled(run_read), client_key, handler, action_request.data)
+        # Clients inside their read-your-writes window must not share a result
+        # computed before their write committed
+        if not settings.coalesce_views or session_router.is_sticky(client_key):
+            return await compute()
+        return await view_flights.do(flight_key("tasks", action, action_request.data, response_type()), compute)
+        
+    except Exception as e:
+        logger.error(f"Error processing task action: {e}")
+        return APIResponse.server_error("Failed to process task action")
@@ -1,11 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
 from typing import Dict, Any
-from app.database import get_db
+from app.config import settings
+from app.api.idempotency import run_idempotent
+from app.auth import require_auth, token_signer
+from app.database import get_db, run_read, session_router, client_key_for
 from app.services.user_service import UserService
-from app.schemas.user import UserCreate, UserUpdate, UserResponse, UserResponseSerialized
-from app.schemas.common import UserActionRequest
+from app.services.user_deletion_service import UserDeletionService
+from app.schemas.user import (
+    UserCreate, UserEditRequest, UserViewRequest, UserDeleteRequest, UserLoginRequest, user_action_adapter
+)
+from app.schemas.common import action_openapi
+from app.utils.content import negotiate, response_type, validate_action
+from app.utils.fragments import serialize, serialize_rows
 from app.utils.responses import APIResponse
+from app.profiling import profiled
+from app.utils.single_flight import view_flights, flight_key
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
@@ -13,52 +26,12 @@ logger = get_logger(__name__)
 router = APIRouter()
 
 
-@router.post("/")
-async def handle_user_action(request: UserActionRequest, db: Session = Depends(get_db)):
-    """
-    Handle user actions: create, edit, view
-    All responses return either 200 (success/error) or 500 (server error)
-    """
-    try:
-        action = request.action
-        data = request.data or {}
-        
-        logger.info(f"Processing user action: {action}")
-        
-        if action == "create":
-            return await create_user(data, db)
-        elif action == "edit":
-            return await edit_user(data, db)
-        elif action == "view":
-            return await view_user(data, db)
-        else:
-            return APIResponse.error(f"Invalid action: {action}")
-            
-    except Exception as e:
-        logger.error(f"Error processing user action: {e}")
-        return APIResponse.server_error("Failed to process user action")
-
-
-async def create_user(data: Dict[str, Any], db: Session) -> APIResponse:
+async def create_user(data: UserCreate, db: Session) -> APIResponse:
     """Create a new user."""
     try:
-        # Validate required fields
-        required_fields = ["username", "email", "full_name", "password"]
-        for field in required_fields:
-            if field not in data:
-                return APIResponse.error(f"Missing required field: {field}")
-        
-        # Create user data object
-        user_data = UserCreate(
-            username=data["username"],
-            email=data["email"],
-            full_name=data["full_name"],
-            password=data["password"],
-            is_active=data.get("is_active", True)
-        )
-        
-        # Create user
-        user = UserService.create_user(db, user_data)
+        # Create user from the payload validated by user_action_adapter;
+        # bcrypt hashing runs in the threadpool, off the event loop
+        user = await run_in_threadpool(profiled(UserService.create_user), db, data)
         
         # Return success response without datetime fields
         return APIResponse.success(
@@ -79,34 +52,15 @@ async def create_user(data: Dict[str, Any], db: Session) -> APIResponse:
         return APIResponse.server_error("Failed to create user")
 
 
-async def edit_user(data: Dict[str, Any], db: Session) -> APIResponse:
+async def edit_user(data: UserEditRequest, db: Session) -> APIResponse:
     """Edit an existing user."""
     try:
-        # Validate required fields
-        if "id" not in data:
-            return APIResponse.error("Missing required field: id")
-        
-        user_id = data["id"]
-        
-        # Get existing user
-        existing_user = UserService.get_user_by_id(db, user_id)
-        if not existing_user:
-            return APIResponse.error("User not found")
-        
-        # Prepare update data
-        update_data = {}
-        allowed_fields = ["username", "email", "full_name", "is_active"]
-        
-        for field in allowed_fields:
-            if field in data:
-                update_data[field] = data[field]
-        
-        if not update_data:
+        user_update = data.to_update()
+        if not user_update.model_fields_set:
             return APIResponse.error("No valid fields to update")
         
-        # Update user
-        user_update = UserUpdate(**update_data)
-        updated_user = UserService.update_user(db, user_id, user_update)
+        # Update user; the service reports a missing user
+        updated_user = UserService.update_user(db, data.id, user_update, data.version)
         
         # Return success response without datetime fields
         return APIResponse.success(
@@ -115,7 +69,8 @@ async def edit_user(data: Dict[str, Any], db: Session) -> APIResponse:
                 "username": updated_user.username,
                 "email": updated_user.email,
                 "full_name": updated_user.full_name,
-                "is_active": updated_user.is_active
+                "is_active": updated_user.is_active,
+                "version": updated_user.version
             },
             message="User updated successfully"
         )
@@ -127,70 +82,63 @@ async def edit_user(data: Dict[str, Any], db: Session) -> APIResponse:
         return APIResponse.server_error("Failed to update user")
 
 
-async def view_user(data: Dict[str, Any], db: Session) -> APIResponse:
-    """View user(s) based on criteria."""
+# Row shapes of the user views, also keys of their cached JSON fragments
+def _user_row(user) -> Dict[str, Any]:
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "full_name": user.full_name,
+        "is_active": user.is_active
+    }
+
+
+def _user_detail(user) -> Dict[str, Any]:
+    return {**_user_row(user), "version": user.version}
+
+
+def view_user(data: UserViewRequest, db: Session) -> APIResponse:
+    """
+    View user(s) based on criteria.
+    Synchronous: runs in the threadpool so identical concurrent views can
+    coalesce while the query is in flight.
+    """
     try:
+        data = data or UserViewRequest()
+        
         # Handle different view scenarios
-        if "id" in data:
+        if data.id is not None:
             # View specific user by ID
-            user_id = data["id"]
+            user_id = data.id
             user = UserService.get_user_by_id(db, user_id)
             
             if not user:
                 return APIResponse.error("User not found")
             
             return APIResponse.success(
-                data={
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "full_name": user.full_name,
-                    "is_active": user.is_active
-                },
+                data=serialize(_user_detail, user),
                 message="User retrieved successfully"
             )
             
-        elif "username" in data:
+        elif data.username is not None:
             # View user by username
-            username = data["username"]
+            username = data.username
             user = UserService.get_user_by_username(db, username)
             
             if not user:
                 return APIResponse.error("User not found")
             
             return APIResponse.success(
-                data={
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "full_name": user.full_name,
-                    "is_active": user.is_active
-                },
+                data=serialize(_user_detail, user),
                 message="User retrieved successfully"
             )
             
         else:
             # View all users with pagination
-            page = data.get("page", 1)
-            size = data.get("size", 10)
-            
-            if page < 1:
-                page = 1
-            if size < 1 or size > 100:
-                size = 10
-            
-            skip = (page - 1) * size
+            page, size, skip = data.page, data.size, data.skip
             users = UserService.get_users(db, skip=skip, limit=size)
             
-            user_list = []
-            for user in users:
-                user_list.append({
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "full_name": user.full_name,
-                    "is_active": user.is_active
-                })
+            user_list = serialize_rows(_user_row, users)
             
             return APIResponse.success(
                 data={
@@ -207,3 +155,110 @@ async def view_user(data: Dict[str, Any], db: Session) -> APIResponse:
     except Exception as e:
         logger.error(f"Error viewing user: {e}")
         return APIResponse.server_error("Failed to retrieve user information")
+
+
+async def delete_user(data: UserDeleteRequest, db: Session) -> APIResponse:
+    """
+    Delete a user without waiting for their tasks to be removed.
+    The user disappears from reads at once; repeating the action reports
+    the progress of the background deletion.
+    """
+    try:
+        deletion = UserDeletionService.request_deletion(db, data.id)
+        
+        return APIResponse.success(
+            data={
+                "id": deletion.user_id,
+                "status": deletion.status,
+                "tasks_deleted": deletion.tasks_deleted,
+                "error": deletion.error
+            },
+            message="User deletion completed" if deletion.status == "completed" else "User deletion in progress"
+        )
+        
+    except ValueError as e:
+        return APIResponse.error(str(e))
+    except Exception as e:
+        logger.error(f"Error deleting user: {e}")
+        return APIResponse.server_error("Failed to delete user")
+
+
+async def login_user(data: UserLoginRequest, db: Session) -> APIResponse:
+    """Verify a user's password once and issue an access token for later requests."""
+    try:
+        # bcrypt verification runs in the threadpool, off the event loop
+        user = await run_in_threadpool(profiled(UserService.authenticate_user), db, data.username, data.password)
+        if not user:
+            return APIResponse.error("Incorrect username or password")
+        
+        token, expires_in = token_signer.issue(user)
+        return APIResponse.success(
+            data={
+                "access_token": token,
+                "token_type": "bearer",
+                "expires_in": expires_in,
+                "user_id": user.id
+            },
+            message="Login successful"
+        )
+        
+    except Exception as e:
+        logger.error(f"Error logging in user: {e}")
+        return APIResponse.server_error("Failed to log in")
+
+
+# Action dispatch table: action -> (handler, reads from a replica session, idempotent)
+# Read handlers are synchronous and coalesced across identical requests;
+# idempotent handlers honour the Idempotency-Key header.
+USER_ACTIONS = {
+    "create": (create_user, False, True),
+    "edit": (edit_user, False, False),
+    "view": (view_user, True, False),
+    "delete": (delete_user, False, False),
+    "login": (login_user, False, False),
+}
+
+
+@router.post("/", openapi_extra=action_openapi(user_action_adapter))
+async def handle_user_action(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Handle user actions: create, edit, view, delete, login
+    All responses return either 200 (success/error) or 500 (server error)
+    Bodies are JSON, or MessagePack per the Content-Type and Accept headers.
+    "view" opens a replica session for the read; the other actions use the primary.
+    """
+    try:
+        negotiate(request)
+        try:
+            action_request = validate_action(user_action_adapter, request, await request.body())
+        except ValidationError as e:
+            return APIResponse.validation_error(e)
+        except ValueError as e:
+            return APIResponse.error(str(e))
+        
+        action = action_request.action
+        unauthenticated = require_auth(request, "users", action)
+        if unauthenticated is not None:
+            return unauthenticated
+        logger.info(f"Processing user action: {action}")
+        
+        handler, reads, idempotent = USER_ACTIONS[action]
+        if idempotent:
+            return await run_idempotent(request, db, f"users.{action}", action_request.data, handler)
+        if not reads:
+            return await handler(action_request.data, db)
+        
+        client_key = client_key_for(request)
+        compute = partial(run_in_threadpool, profiled(run_read), client_key, handler, action_request.data)
+        # Clients inside their read-your-writes window must not share a result
+        # computed before their write committed
+        if not settings.coalesce_views or session_router.is_sticky(client_key):
+            return await compute()
+        return await view_flights.do(flight_key("users", action, action_request.data, response_type()), compute)
+        
+    except Exception as e:
+        logger.error(f"Error processing user action: {e}")
+        return APIResponse.server_error("Failed to process user action")
@@ -0,0 +1,185 @@
+"""
+Token authentication for the action endpoints.
+
+The "login" user action checks the password once (bcrypt, in the
+threadpool) and issues a signed JWT. AuthMiddleware then authenticates
+each request from its `Authorization: Bearer` token:
+
+- verified tokens are kept in an LRU keyed by the token string until they
+  expire, so a repeat request costs a dict lookup instead of an HMAC check
+  and JSON decode;
+- tokens carry the ID of their signing key ("kid"). New tokens are signed
+  with SECRET_KEY; keys listed in PREVIOUS_SECRET_KEYS are still accepted,
+  so the secret can be rotated without logging every client out.
+
+Tokens are not re-checked against the database, so a deactivated or
+deleted user keeps access until the token expires
+(ACCESS_TOKEN_EXPIRE_MINUTES). With AUTH_REQUIRED, requests without a
+valid token are rejected except for user "create" and "login". Whether
+an action is public is decided by its router from the validated request,
+never from the raw body.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from jose import JWTError, jwt
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.responses import APIResponse
+
+# (resource, action) pairs served without a token
+PUBLIC_ACTIONS = {("users", "create"), ("users", "login")}
+
+# Routers serving public actions; they check the token themselves with require_auth
+PUBLIC_RESOURCES = {resource for resource, _ in PUBLIC_ACTIONS}
+
+
+class TokenSigner:
+    """Issues and verifies access tokens, with a cache of verified tokens."""
+    
+    def __init__(self, secret_key: str, previous_keys: str, algorithm: str,
+                 expire_minutes: int, cache_size: int):
+        self.algorithm = algorithm
+        self.expire_seconds = expire_minutes * 60
+        self.cache_size = max(cache_size, 0)
+        self.current_kid: Optional[str] = None
+        self._keys: Dict[str, str] = {}
+        # token -> (expires at, kid, claims); only touched from the event loop
+        self._cache: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        for key in previous_keys.split(","):
+            if key.strip():
+                self._keys[self.key_id(key.strip())] = key.strip()
+        self.rotate(secret_key)
+    
+    @staticmethod
+    def key_id(secret: str) -> str:
+        """Public identifier of a signing key."""
+        return hashlib.sha256(secret.encode()).hexdigest()[:12]
+    
+    def rotate(self, secret: str) -> str:
+        """Sign new tokens with `secret`; tokens signed with earlier keys stay valid."""
+        kid = self.key_id(secret)
+        self._keys[kid] = secret
+        self.current_kid = kid
+        return kid
+    
+    def retire(self, kid: str) -> None:
+        """Stop accepting tokens signed with a key, including cached ones."""
+        if kid == self.current_kid:
+            raise ValueError("Cannot retire the current signing key")
+        self._keys.pop(kid, None)
+        self._cache = OrderedDict(
+            (token, entry) for token, entry in self._cache.items() if entry[1] != kid
+        )
+    
+    def issue(self, user) -> Tuple[str, int]:
+        """Return a signed token for `user` and its lifetime in seconds."""
+        now = int(time.time())
+        claims = {
+            "sub": str(user.id),
+            "username": user.username,
+            "iat": now,
+            "exp": now + self.expire_seconds
+        }
+        token = jwt.encode(
+            claims,
+            self._keys[self.current_kid],
+            algorithm=self.algorithm,
+            headers={"kid": self.current_kid}
+        )
+        metrics.increment("auth.tokens_issued")
+        return token, self.expire_seconds
+    
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a valid, unexpired token, else None."""
+        now = time.time()
+        cached = self._cache.get(token)
+        if cached is not None:
+            if cached[0] > now:
+                self._cache.move_to_end(token)
+                metrics.increment("auth.cache.hits")
+                return cached[2]
+            del self._cache[token]
+        metrics.increment("auth.cache.misses")
+        
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+            secret = self._keys.get(kid)
+            if secret is None:
+                return None
+            claims = jwt.decode(token, secret, algorithms=[self.algorithm])
+        except JWTError:
+            metrics.increment("auth.rejected")
+            return None
+        
+        if self.cache_size:
+            self._cache[token] = (claims.get("exp", now), kid, claims)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+
+# Global signer used by the login action and the middleware
+token_signer = TokenSigner(
+    settings.secret_key,
+    settings.previous_secret_keys,
+    settings.algorithm,
+    settings.access_token_expire_minutes,
+    settings.auth_token_cache_size
+)
+
+metrics.register_gauge("auth.cache.hit_ratio", lambda: metrics.ratio("auth.cache.hits", "auth.cache.misses"))
+
+
+def require_auth(request: Request, resource: str, action: str) -> Optional[APIResponse]:
+    """
+    The error response for an unauthenticated request to a non-public
+    action, else None. Called by the routers once the body is validated.
+    """
+    if (
+        not settings.auth_required
+        or getattr(request.state, "user", None) is not None
+        or (resource, action) in PUBLIC_ACTIONS
+    ):
+        return None
+    return APIResponse.error("Not authenticated")
+
+
+class AuthMiddleware:
+    """
+    ASGI middleware authenticating API requests from their bearer token.
+    The token's claims (or None) are stored as `request.state.user`.
+    Without a token, requests to routers serving public actions are passed
+    on for the router to decide; all others are rejected here.
+    """
+    
+    def __init__(self, app, signer: TokenSigner = token_signer):
+        self.app = app
+        self.signer = signer
+        self.prefix = f"{settings.api_prefix}/"
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        
+        claims = None
+        authorization = Headers(scope=scope).get("authorization")
+        if authorization and authorization[:7].lower() == "bearer ":
+            claims = self.signer.verify(authorization[7:].strip())
+        scope.setdefault("state", {})["user"] = claims
+        
+        resource = scope["path"][len(self.prefix):].split("/", 1)[0]
+        if (
+            claims is not None
+            or not settings.auth_required
+            or (scope["method"] == "POST" and resource in PUBLIC_RESOURCES)
+        ):
+            await self.app(scope, receive, send)
+            return
+        
+        response = APIResponse.error("Not authenticated")
+        await response(scope, receive, send)
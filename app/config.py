@@ -1,11 +1,62 @@
 import os
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     # Database
     database_url: str = "sqlite:///./app.db"
+    database_replica_urls: str = ""  # Comma-separated read replica URLs
+    replica_sticky_seconds: float = 5.0
+    replica_retry_seconds: float = 30.0
+    task_shard_urls: str = ""  # Comma-separated extra task shards; shard 0 is database_url
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0  # Seconds a checkout waits for a free connection
+    
+    # Readiness (/ready fails above these, so load balancers route away early)
+    ready_max_pool_wait_ms: float = 250.0
+    ready_max_loop_lag_ms: float = 100.0
+    
+    # Startup
+    startup_warmup: bool = False  # Pre-open pool connections and prime caches before serving
+    warmup_connections: int = 4
+    
+    # Archival of finished tasks
+    archive_enabled: bool = True
+    archive_after_days: int = 30
+    archive_interval_seconds: int = 3600
+    archive_batch_size: int = 500
+    
+    # Bulk task edits
+    bulk_edit_chunk_size: int = 500  # Tasks updated per transaction
+    
+    # Subtasks
+    task_max_depth: int = 32  # Deepest nesting level of a subtask (top-level tasks are 0)
+    
+    # Task analytics
+    analytics_enabled: bool = True
+    analytics_refresh_seconds: int = 300  # Age limit of the columnar snapshot behind "analytics" views
+    analytics_weeks: int = 12  # Weeks of completed-task throughput reported
+    
+    # Task history
+    history_flush_ms: int = 200  # Buffered history entries are inserted in batches at this interval
+    history_max_buffer: int = 10000  # A commit that fills the buffer flushes it inline
+    history_snapshot_every: int = 20  # Full-state snapshot every N task versions, bounding replays
+    
+    # User deletion
+    user_delete_chunk_size: int = 1000  # Tasks removed per transaction by the background job
+    
+    # Background job queue
+    jobs_enabled: bool = True
+    job_workers: int = 2
+    job_poll_seconds: float = 1.0  # Idle workers also wake at once when a job is enqueued
+    job_lease_seconds: float = 60.0  # Renewed while running; expired jobs are queued again
+    job_max_attempts: int = 5
+    job_retry_base_seconds: float = 2.0  # Doubles per attempt, with jitter
+    job_retry_max_seconds: float = 300.0
+    job_retention_seconds: int = 604800  # Finished jobs are kept this long for the status API
+    job_shutdown_timeout_seconds: float = 10.0
     
     # Logging
     log_level: str = "INFO"
@@ -15,6 +66,9 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-change-in-production"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    previous_secret_keys: str = ""  # Comma-separated retired keys whose tokens are still accepted
+    auth_required: bool = False  # Reject API requests without a valid token (except user create/login)
+    auth_token_cache_size: int = 10000  # Verified tokens remembered until they expire
     
     # API
     api_prefix: str = "/api"
@@ -22,6 +76,53 @@ class Settings(BaseSettings):
     version: str = "1.0.0"
     description: str = "API for managing user accounts and tasks"
     
+    # Change feed
+    change_feed_retention_seconds: int = 86400
+    change_feed_compact_interval_seconds: int = 300
+    change_feed_max_wait_seconds: int = 30
+    change_feed_tail_size: int = 1000  # Newest events kept in memory for subscribers; 0 disables
+    
+    # Admission control
+    admission_enabled: bool = True
+    admission_max_loop_lag_ms: float = 200.0
+    admission_target_latency_ms: float = 500.0
+    admission_max_in_flight: int = 64  # Per action
+    admission_min_in_flight: int = 2
+    admission_retry_after_seconds: float = 1.0
+    client_rate_limit: float = 0.0  # Requests per second per client; 0 disables
+    client_burst: int = 20
+    
+    # Coalescing of identical concurrent view requests
+    coalesce_views: bool = True
+    coalesce_grace_ms: float = 0.0  # Also serve a finished result for this long
+    
+    # Serialized JSON of task and user rows reused across view responses
+    fragment_cache_size: int = 50000  # Rows kept (LRU); 0 disables
+    
+    # Idempotency keys for create actions
+    idempotency_ttl_seconds: int = 86400
+    idempotency_purge_interval_seconds: int = 600
+    
+    # Group commit of task creates and edits
+    group_commit_enabled: bool = True
+    group_commit_window_ms: float = 2.0
+    group_commit_max_batch: int = 64
+    
+    # Profiling
+    slow_request_ms: float = 1000.0  # Requests slower than this are logged with their SQL; 0 disables
+    slow_request_log_size: int = 100
+    debug_token: str = ""  # Enables /debug/profile for requests sending it as X-Debug-Token
+    
+    @property
+    def replica_urls(self) -> List[str]:
+        """Parsed list of read replica URLs."""
+        return [url.strip() for url in self.database_replica_urls.split(",") if url.strip()]
+    
+    @property
+    def shard_urls(self) -> List[str]:
+        """Parsed list of additional task shard URLs."""
+        return [url.strip() for url in self.task_shard_urls.split(",") if url.strip()]
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
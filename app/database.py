@@ -1,17 +1,194 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import Column, Integer, Table, create_engine, event, insert, delete, inspect, select, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError, ProgrammingError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.schema import CreateColumn, CreateTable
 from app.config import settings
 from app.utils.logging import get_logger
+from app.utils.metrics import metrics
 
 logger = get_logger(__name__)
 
+
+class PoolStats:
+    """
+    Connection pool statistics of one engine.
+    Checkouts, hold times and invalidations come from pool events; the wait
+    for a free connection and checkout timeouts are measured by
+    InstrumentedQueuePool, since no pool event fires before a checkout waits.
+    Recent maxima cover the current and previous WINDOW seconds.
+    """
+    
+    WINDOW = 5.0
+    
+    def __init__(self):
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.lock_errors = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        # [current window, previous window] maxima
+        self._recent_wait = [0.0, 0.0]
+        self._recent_hold = [0.0, 0.0]
+        self._recent_locked = [0, 0]
+    
+    def _rotate(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed < self.WINDOW:
+            return
+        # After two idle windows nothing recent is left
+        keep = elapsed < 2 * self.WINDOW
+        for recent in (self._recent_wait, self._recent_hold, self._recent_locked):
+            recent[1] = recent[0] if keep else type(recent[0])()
+            recent[0] = type(recent[0])()
+        self._window_start = now
+    
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self._rotate(time.monotonic())
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self._recent_wait[0] = max(self._recent_wait[0], seconds)
+    
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+    
+    def record_lock_error(self) -> None:
+        with self._lock:
+            self._rotate(time.monotonic())
+            self.lock_errors += 1
+            self._recent_locked[0] += 1
+    
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        connection_record.info["checked_out_at"] = time.monotonic()
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+    
+    def on_checkin(self, dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._rotate(now)
+            self.checked_out -= 1
+            self._recent_hold[0] = max(self._recent_hold[0], now - checked_out_at)
+    
+    def on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+    
+    def on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+    
+    def recent(self) -> Dict[str, float]:
+        """Maxima over the last one or two windows: wait and hold seconds, lock errors."""
+        with self._lock:
+            self._rotate(time.monotonic())
+            return {
+                "wait": max(self._recent_wait),
+                "hold": max(self._recent_hold),
+                "lock_errors": sum(self._recent_locked)
+            }
+    
+    def snapshot(self) -> Dict[str, float]:
+        recent = self.recent()
+        return {
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "lock_errors": self.lock_errors,
+            "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self.wait_max * 1000, 3),
+            "recent_wait_max_ms": round(recent["wait"] * 1000, 3),
+            "recent_hold_max_ms": round(recent["hold"] * 1000, 3),
+            "recent_lock_errors": recent["lock_errors"]
+        }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a connection."""
+    
+    def __init__(self, *args, stats: Optional[PoolStats] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = stats or PoolStats()
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_timeout()
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - start)
+    
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def create_db_engine(url: str):
+    """
+    Create an engine, applying the SQLite-specific connection arguments.
+    Pooled engines get an InstrumentedQueuePool; its statistics are at
+    `engine.pool_stats`.
+    """
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    parsed = make_url(url)
+    # In-memory SQLite keeps its single-connection pool
+    pooled = not (parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"))
+    engine = create_engine(
+        url,
+        connect_args=connect_args,  # Required for SQLite
+        echo=False,  # Set to True for SQL query logging
+        **(dict(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout
+        ) if pooled else {})
+    )
+    
+    stats = engine.pool.stats if pooled else PoolStats()
+    event.listen(engine, "checkout", stats.on_checkout)
+    event.listen(engine, "checkin", stats.on_checkin)
+    event.listen(engine, "connect", stats.on_connect)
+    event.listen(engine, "invalidate", stats.on_invalidate)
+    
+    @event.listens_for(engine, "handle_error")
+    def _count_lock_errors(context):
+        if "locked" in str(context.original_exception):
+            stats.record_lock_error()
+    
+    engine.pool_stats = stats
+    return engine
+
+
 # Create SQLite engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False},  # Required for SQLite
-    echo=False  # Set to True for SQL query logging
-)
+engine = create_db_engine(settings.database_url)
+
+for _name in ("checked_out", "timeouts", "lock_errors", "wait_max_ms", "recent_wait_max_ms", "recent_hold_max_ms"):
+    metrics.register_gauge(f"db.pool.{_name}", lambda name=_name: engine.pool_stats.snapshot()[name])
+metrics.register_gauge("db.pool.checkouts", lambda: engine.pool_stats.checkouts)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -19,10 +196,158 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Create base class for models
 Base = declarative_base()
 
+# Bump whenever a model adds a table, column or index, so the next boot runs
+# create_all. Columns added to existing tables need a server default.
+# SQLite tables switched to AUTOINCREMENT are rebuilt on that boot.
+SCHEMA_VERSION = 11
+
+# Single-row table recording the schema version the database was created with
+schema_version = Table(
+    "schema_version",
+    Base.metadata,
+    Column("version", Integer, nullable=False)
+)
+
+
+class Replica:
+    """A read replica with its own engine and health state."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_db_engine(url)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.ejected_until = 0.0
+        event.listen(self.engine, "handle_error", self._on_error)
+
+    @property
+    def healthy(self) -> bool:
+        return self.ejected_until <= time.monotonic()
+
+    def eject(self, seconds: float) -> None:
+        """Take the replica out of rotation for `seconds`."""
+        self.ejected_until = time.monotonic() + seconds
+        logger.warning(f"Ejected read replica {self.url} for {seconds}s")
+
+    def probe(self) -> bool:
+        """Run a trivial query to check that the replica answers."""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return True
+        except Exception as e:
+            logger.warning(f"Read replica {self.url} failed health probe: {e}")
+            return False
+
+    def _on_error(self, context):
+        # Connection-level failures (unreachable, locked, missing file) eject
+        # the replica; statement errors such as constraint violations do not.
+        if isinstance(context.sqlalchemy_exception, OperationalError) or context.is_disconnect:
+            self.eject(settings.replica_retry_seconds)
+
+
+class SessionRouter:
+    """
+    Route sessions between the primary and read replicas.
+    Reads go to a healthy replica round-robin, except for clients that wrote
+    within the stickiness window, which read from the primary so they always
+    see their own writes.
+    """
+
+    MAX_STICKY_CLIENTS = 10000
+
+    def __init__(self, replica_urls: List[str], sticky_seconds: float, retry_seconds: float):
+        self.replicas = [Replica(url) for url in replica_urls]
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._recent_writers: Dict[str, float] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def record_write(self, client_key: str) -> None:
+        """Pin a client's reads to the primary for the stickiness window."""
+        now = time.monotonic()
+        with self._lock:
+            if len(self._recent_writers) >= self.MAX_STICKY_CLIENTS:
+                self._recent_writers = {
+                    key: until for key, until in self._recent_writers.items() if until > now
+                }
+            self._recent_writers[client_key] = now + self.sticky_seconds
+
+    def is_sticky(self, client_key: Optional[str]) -> bool:
+        if client_key is None:
+            return False
+        until = self._recent_writers.get(client_key)
+        return until is not None and until > time.monotonic()
+
+    def pick_replica(self) -> Optional[Replica]:
+        """Pick the next healthy replica, re-probing ejected ones whose retry time passed."""
+        with self._lock:
+            count = len(self.replicas)
+            start = self._next
+            self._next = (self._next + 1) % count if count else 0
+
+        for offset in range(count):
+            replica = self.replicas[(start + offset) % count]
+            if replica.healthy:
+                if replica.ejected_until and not replica.probe():
+                    replica.eject(self.retry_seconds)
+                    continue
+                replica.ejected_until = 0.0
+                return replica
+        return None
+
+    def check_health(self) -> int:
+        """Probe every replica, ejecting the ones that fail. Returns the healthy count."""
+        healthy = 0
+        for replica in self.replicas:
+            if replica.probe():
+                replica.ejected_until = 0.0
+                healthy += 1
+            else:
+                replica.eject(self.retry_seconds)
+        return healthy
 
-def get_db():
-    """Dependency to get database session."""
-    db = SessionLocal()
+    def primary_session(self, client_key: Optional[str] = None) -> Session:
+        """Open a session on the primary database."""
+        db = SessionLocal()
+        if client_key is not None:
+            db.info["client_key"] = client_key
+        return db
+
+    def read_session(self, client_key: Optional[str] = None) -> Session:
+        """Open a session for read-only work, preferring a replica."""
+        if self.replicas and not self.is_sticky(client_key):
+            replica = self.pick_replica()
+            if replica is not None:
+                return replica.session_factory()
+        return self.primary_session(client_key)
+
+
+# Global session router
+session_router = SessionRouter(
+    settings.replica_urls,
+    sticky_seconds=settings.replica_sticky_seconds,
+    retry_seconds=settings.replica_retry_seconds
+)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _remember_client_write(session):
+    """Start read-your-writes stickiness as soon as a client's write commits."""
+    client_key = session.info.get("client_key")
+    if client_key is not None:
+        session_router.record_write(client_key)
+
+
+def client_key_for(request: Request) -> str:
+    """Identify the client for read-your-writes stickiness."""
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+def _session_scope(db: Session):
     try:
         yield db
     except Exception as e:
@@ -33,11 +358,121 @@ def get_db():
         db.close()
 
 
-def create_tables():
-    """Create all database tables."""
+def get_db(request: Request):
+    """Dependency to get a primary database session."""
+    yield from _session_scope(session_router.primary_session(client_key_for(request)))
+
+
+def run_read(client_key: str, handler: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run `handler(*args, session)` on a session for read-only actions, routed to
+    a replica when possible. Only read actions open it, so writes never pick
+    (or probe) a replica.
+    """
+    read_db = session_router.read_session(client_key)
+    try:
+        return handler(*args, read_db)
+    except Exception as e:
+        logger.error(f"Database session error: {e}")
+        read_db.rollback()
+        raise
+    finally:
+        read_db.close()
+
+
+def schema_is_current(bind) -> bool:
+    """Check with a single query whether the database is at SCHEMA_VERSION."""
+    try:
+        with bind.connect() as connection:
+            return connection.execute(select(schema_version.c.version)).scalar() == SCHEMA_VERSION
+    except (OperationalError, ProgrammingError):
+        # No schema_version table yet
+        return False
+
+
+def _add_missing_columns(bind, tables: List[Table]) -> None:
+    """ALTER TABLE ... ADD COLUMN for model columns missing from existing tables."""
+    inspector = inspect(bind)
+    with bind.begin() as connection:
+        for table in tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                    logger.info(f"Added column {table.name}.{column.name}")
+
+
+def _rebuild_for_autoincrement(bind, tables: List[Table]) -> None:
+    """
+    Rebuild existing SQLite tables whose model now asks for AUTOINCREMENT
+    (CREATE TABLE cannot be altered), then raise their sequence above the
+    IDs listed in the table's info["reserved_ids"] ("table.column").
+    Indexes are dropped with the old table and recreated by create_tables.
+    """
+    if bind.dialect.name != "sqlite":
+        return
+    inspector = inspect(bind)
+    for table in tables:
+        if not table.dialect_options["sqlite"].get("autoincrement"):
+            continue
+        with bind.begin() as connection:
+            sql = connection.execute(
+                text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+            ).scalar()
+            if sql is None or "AUTOINCREMENT" in sql.upper():
+                continue
+            
+            rebuild = f"{table.name}_rebuild"
+            ddl = str(CreateTable(table).compile(dialect=bind.dialect))
+            connection.exec_driver_sql(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {rebuild} ", 1))
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            columns = ", ".join(column.name for column in table.columns if column.name in existing)
+            connection.exec_driver_sql(f"INSERT INTO {rebuild} ({columns}) SELECT {columns} FROM {table.name}")
+            connection.exec_driver_sql(f"DROP TABLE {table.name}")
+            connection.exec_driver_sql(f"ALTER TABLE {rebuild} RENAME TO {table.name}")
+            
+            floor = 0
+            for reserved in table.info.get("reserved_ids", []):
+                reserved_table, column = reserved.split(".")
+                if inspector.has_table(reserved_table):
+                    floor = max(floor, connection.exec_driver_sql(
+                        f"SELECT COALESCE(MAX({column}), 0) FROM {reserved_table}"
+                    ).scalar())
+            if floor:
+                connection.execute(text("DELETE FROM sqlite_sequence WHERE name = :name AND seq < :floor"),
+                                   {"name": table.name, "floor": floor})
+                connection.execute(text(
+                    "INSERT INTO sqlite_sequence (name, seq) SELECT :name, :floor "
+                    "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)"
+                ), {"name": table.name, "floor": floor})
+            logger.info(f"Rebuilt table {table.name} with AUTOINCREMENT")
+
+
+def create_tables(bind=None, tables: Optional[List[Table]] = None):
+    """
+    Create the database tables unless the schema is already current.
+    `tables` limits creation to a subset (e.g. the tasks table on a shard).
+    """
+    bind = bind if bind is not None else engine
     try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        if schema_is_current(bind):
+            logger.info(f"Database schema is current (version {SCHEMA_VERSION})")
+            return
+        
+        if tables is not None:
+            tables = list(tables) + [schema_version]
+        Base.metadata.create_all(bind=bind, tables=tables)
+        _rebuild_for_autoincrement(bind, tables if tables is not None else Base.metadata.sorted_tables)
+        _add_missing_columns(bind, tables if tables is not None else Base.metadata.sorted_tables)
+        # create_all only indexes the tables it creates; add new indexes to existing ones
+        for table in tables if tables is not None else Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind, checkfirst=True)
+        with bind.begin() as connection:
+            connection.execute(delete(schema_version))
+            connection.execute(insert(schema_version).values(version=SCHEMA_VERSION))
+        logger.info(f"Database tables created successfully (schema version {SCHEMA_VERSION})")
     except Exception as e:
         logger.error(f"Error creating database tables: {e}")
         raise
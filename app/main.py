@@ -2,15 +2,63 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import time
+from starlette.concurrency import run_in_threadpool
+from app.admission import AdmissionMiddleware, admission
+from app.auth import AuthMiddleware
+from app.profiling import ProfilingMiddleware
 from app.config import settings
-from app.database import init_db
-from app.api import users_router, tasks_router
-from app.utils.logging import get_logger
+from app.database import InstrumentedQueuePool, SessionLocal, engine, init_db, session_router
+from app.api import users_router, tasks_router, changes_router, debug_router, jobs_router
+from app.api.tasks import TASK_ACTIONS
+from app.api.users import USER_ACTIONS
+from app.schemas.common import ACTION_SCHEMA_DEFS
+from app.services.analytics import run_analytics_refresh
+from app.services.archive_service import run_archival
+from app.services.change_feed import ChangeFeedService, run_compaction
+from app.services.group_commit import task_writer
+from app.services.idempotency_service import run_idempotency_purge
+from app.services.job_queue import job_queue
+from app.services.tag_index import run_tag_index_load
+from app.services.task_history import run_history_flusher, task_history
+from app.sharding import task_shards
+from app.services.statements import warm_statements
+from app.services.user_service import get_pwd_context
+from app.utils.logging import get_logger, setup_logging
+from app.utils.metrics import metrics
 from app.utils.responses import APIResponse
 
+setup_logging()
 logger = get_logger(__name__)
 
 
+def warm_up() -> None:
+    """
+    Prepare the process for traffic before it reports ready: open pool
+    connections, compile the registered statements and build the password
+    hashing context, so the first requests do not pay for them.
+    """
+    start = time.perf_counter()
+    engines = [engine] + [replica.engine for replica in session_router.replicas if replica.healthy]
+    for warm_engine in engines:
+        connections = [warm_engine.connect() for _ in range(settings.warmup_connections)]
+        for connection in connections:
+            connection.close()
+    
+    db = SessionLocal()
+    try:
+        statement_count = warm_statements(db)
+    finally:
+        db.close()
+    
+    get_pwd_context()
+    logger.info(
+        f"Warm-up done in {(time.perf_counter() - start) * 1000:.1f} ms "
+        f"({len(engines)} engines, {statement_count} statements)"
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
@@ -18,15 +66,50 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up User Account and Tasks API...")
     try:
         init_db()
+        task_shards.create_tables()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
     
+    if session_router.replicas:
+        healthy = session_router.check_health()
+        logger.info(f"Read replicas healthy: {healthy}/{len(session_router.replicas)}")
+    
+    if settings.startup_warmup:
+        warm_up()
+    
+    ChangeFeedService.initialize()
+    compaction_task = asyncio.create_task(run_compaction())
+    lag_monitor_task = asyncio.create_task(admission.monitor.run())
+    idempotency_purge_task = asyncio.create_task(run_idempotency_purge())
+    task_writer.start()
+    archival_task = asyncio.create_task(run_archival()) if settings.archive_enabled else None
+    job_queue.start()
+    tag_index_task = asyncio.create_task(run_tag_index_load())
+    analytics_task = asyncio.create_task(run_analytics_refresh()) if settings.analytics_enabled else None
+    history_task = asyncio.create_task(run_history_flusher())
+    
     yield
     
     # Shutdown
     logger.info("Shutting down User Account and Tasks API...")
+    await task_writer.stop()
+    await job_queue.stop()
+    compaction_task.cancel()
+    lag_monitor_task.cancel()
+    idempotency_purge_task.cancel()
+    tag_index_task.cancel()
+    if archival_task:
+        archival_task.cancel()
+    if analytics_task:
+        analytics_task.cancel()
+    # After the writers stopped: the last committed changes are in the buffer
+    history_task.cancel()
+    try:
+        await run_in_threadpool(task_history.flush)
+    except Exception:
+        logger.error("Task history entries were lost on shutdown")
 
 
 # Create FastAPI application
@@ -39,12 +122,25 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Time requests for the slow-request log and armed cProfile captures
+app.add_middleware(ProfilingMiddleware)
+
+# Authenticate bearer tokens (inside admission, so shed requests skip it)
+app.add_middleware(AuthMiddleware)
+
+# Shed excess action requests before they queue on the event loop
+admission.register_actions("users", USER_ACTIONS)
+admission.register_actions("tasks", TASK_ACTIONS)
+admission.register_actions("jobs", ["view"])
+# (added first so CORS headers still wrap shed responses)
+app.add_middleware(AdmissionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Configure appropriately for production
     allow_credentials=True,
-    allow_methods=["POST"],  # Only POST methods allowed
+    allow_methods=["POST", "GET"],  # POST actions plus the GET change stream
     allow_headers=["*"],
 )
 
@@ -69,6 +165,39 @@ app.include_router(
     tags=["tasks"]
 )
 
+app.include_router(
+    changes_router,
+    prefix=f"{settings.api_prefix}/changes",
+    tags=["changes"]
+)
+
+app.include_router(
+    jobs_router,
+    prefix=f"{settings.api_prefix}/jobs",
+    tags=["jobs"]
+)
+
+# Profiling endpoints, outside the API prefix and its middleware
+app.include_router(
+    debug_router,
+    prefix="/debug",
+    tags=["debug"]
+)
+
+_default_openapi = app.openapi
+
+
+def openapi():
+    """The generated schema plus the payload models of the action request bodies."""
+    if app.openapi_schema is None:
+        components = _default_openapi().setdefault("components", {}).setdefault("schemas", {})
+        for name, schema in ACTION_SCHEMA_DEFS.items():
+            components.setdefault(name, schema)
+    return app.openapi_schema
+
+
+app.openapi = openapi
+
 
 @app.get("/")
 async def root():
@@ -87,6 +216,46 @@ async def health_check():
     return {"status": "healthy", "message": "API is running"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness for load balancers: fails (500) while the primary's pool is
+    exhausted or slow to hand out connections, SQLite reported lock errors
+    recently, or the event loop lags, so traffic moves elsewhere before
+    latency collapses.
+    """
+    stats = engine.pool_stats
+    recent = stats.recent()
+    loop_lag = admission.monitor.lag
+    problems = []
+    if recent["wait"] * 1000 > settings.ready_max_pool_wait_ms:
+        problems.append(f"Connection pool wait {recent['wait'] * 1000:.0f} ms")
+    if isinstance(engine.pool, InstrumentedQueuePool) and (
+        stats.checked_out >= settings.db_pool_size + settings.db_max_overflow
+    ):
+        problems.append("Connection pool exhausted")
+    if recent["lock_errors"]:
+        problems.append(f"Database locked ({recent['lock_errors']} recent errors)")
+    if loop_lag * 1000 > settings.ready_max_loop_lag_ms:
+        problems.append(f"Event loop lag {loop_lag * 1000:.0f} ms")
+    
+    return JSONResponse(
+        content={
+            "status": "not ready" if problems else "ready",
+            "problems": problems,
+            "loop_lag_ms": round(loop_lag * 1000, 2),
+            "pool": stats.snapshot()
+        },
+        status_code=500 if problems else 200
+    )
+
+
+@app.get("/metrics")
+async def metrics_snapshot():
+    """Process metrics such as the compiled statement cache hit rate."""
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,4 +1,17 @@
 from .user import User
 from .task import Task, TaskStatus, TaskPriority
+from .archived_task import ArchivedTask
+from .change_event import ChangeEvent
+from .task_shard import TaskShardOwner, TaskShardForward, TaskIdCounter
+from .idempotency_key import IdempotencyKey
+from .user_deletion import UserDeletion
+from .job import Job
+from .task_tag import TaskTag
+from .task_closure import TaskClosure
+from .task_history import TaskHistory, HISTORY_CREATE, HISTORY_UPDATE, HISTORY_DELETE, HISTORY_SNAPSHOT
 
-__all__ = ["User", "Task", "TaskStatus", "TaskPriority"]
+__all__ = [
+    "User", "Task", "TaskStatus", "TaskPriority", "ArchivedTask", "ChangeEvent",
+    "TaskShardOwner", "TaskShardForward", "TaskIdCounter", "IdempotencyKey", "UserDeletion", "Job", "TaskTag",
+    "TaskClosure", "TaskHistory", "HISTORY_CREATE", "HISTORY_UPDATE", "HISTORY_DELETE", "HISTORY_SNAPSHOT"
+]
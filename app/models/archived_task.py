@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Enum
+from sqlalchemy.sql import func
+from app.database import Base
+from app.models.task import TaskStatus, TaskPriority
+
+
+class ArchivedTask(Base):
+    """
+    Cold storage for finished tasks.
+    Mirrors the tasks table; rows keep their task IDs and are moved here in
+    background batches once completed or cancelled for ARCHIVE_AFTER_DAYS.
+    """
+    __tablename__ = "archived_tasks"
+    
+    id = Column(Integer, primary_key=True)
+    title = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    status = Column(Enum(TaskStatus), nullable=False)
+    priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
+    due_date = Column(DateTime(timezone=True), nullable=True)
+    is_completed = Column(Boolean, default=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    owner_id = Column(Integer, nullable=False, index=True)
+    parent_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<ArchivedTask(id={self.id}, title='{self.title}', status='{self.status}')>"
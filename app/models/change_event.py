@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class ChangeEvent(Base):
+    __tablename__ = "change_events"
+    # AUTOINCREMENT keeps sequence numbers monotonic even after compaction
+    # deletes the newest rows, so clients never see a sequence reused.
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    operation = Column(String(20), nullable=False)
+    payload = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+    def __repr__(self):
+        return f"<ChangeEvent(seq={self.id}, entity='{self.entity}', operation='{self.operation}')>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """A client-supplied idempotency key with the response of its first request."""
+    __tablename__ = "idempotency_keys"
+    
+    scope = Column(String(50), primary_key=True)  # e.g. "tasks.create"
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)  # NULL while the first request is in progress
+    response_body = Column(Text, nullable=True)  # MessagePack bodies are stored base64-encoded
+    media_type = Column(String(50), nullable=True)  # Of the stored body; NULL means JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(scope='{self.scope}', key='{self.key}', status={self.status_code})>"
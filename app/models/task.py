@@ -21,6 +21,14 @@ class TaskPriority(str, enum.Enum):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # AUTOINCREMENT so archiving or deleting the newest tasks never frees
+    # their IDs for new tasks; their archived rows, tags and history keep
+    # pointing at the old task. Existing databases are rebuilt once and
+    # skip IDs already used by those tables.
+    __table_args__ = {
+        "sqlite_autoincrement": True,
+        "info": {"reserved_ids": ["archived_tasks.id", "task_history.task_id"]}
+    }
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
@@ -29,12 +37,18 @@ class Task(Base):
     priority = Column(Enum(TaskPriority), default=TaskPriority.MEDIUM)
     due_date = Column(DateTime(timezone=True), nullable=True)
     is_completed = Column(Boolean, default=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped by every edit; edits may require the version they were based on
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    
+    # Parent in the subtask hierarchy (same owner); see TaskClosure
+    parent_id = Column(Integer, nullable=True, index=True)
     
     # Foreign key to user
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    user = relationship("User", back_populates="tasks")
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    owner = relationship("User", back_populates="tasks")
     
     def __repr__(self):
         return f"<Task(id={self.id}, title='{self.title}', status='{self.status}')>"
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer
+from app.database import Base
+
+
+class TaskClosure(Base):
+    """
+    Closure table of the subtask hierarchy: one row per (ancestor, descendant)
+    pair at any depth (1 = parent). Tasks without a parent or subtasks have
+    no rows. Lives next to the tasks table on every shard; like task_tags it
+    has no foreign keys, so rows of archived tasks stay in place.
+    """
+    __tablename__ = "task_closure"
+    
+    ancestor_id = Column(Integer, primary_key=True)
+    descendant_id = Column(Integer, primary_key=True, index=True)
+    depth = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<TaskClosure(ancestor_id={self.ancestor_id}, descendant_id={self.descendant_id}, depth={self.depth})>"
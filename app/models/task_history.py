@@ -0,0 +1,31 @@
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, SmallInteger
+from app.database import Base
+
+# Entry kinds
+HISTORY_CREATE = 0
+HISTORY_UPDATE = 1
+HISTORY_DELETE = 2
+HISTORY_SNAPSHOT = 3
+
+
+class TaskHistory(Base):
+    """
+    Append-only log of task changes: one row per create, edit and delete,
+    plus a full-state snapshot every HISTORY_SNAPSHOT_EVERY versions.
+    `data` holds the compact field encoding of app.services.task_history.
+    Rows are inserted in batches by the history writer, on the primary.
+    """
+    __tablename__ = "task_history"
+    
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, nullable=False)
+    at = Column(DateTime, nullable=False)  # Commit time (UTC) of the change
+    kind = Column(SmallInteger, nullable=False)  # create, update, delete or snapshot
+    data = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_task_history_task_at", "task_id", "at"),
+    )
+    
+    def __repr__(self):
+        return f"<TaskHistory(id={self.id}, task_id={self.task_id}, kind={self.kind})>"
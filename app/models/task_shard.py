@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, Boolean, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class TaskShardOwner(Base):
+    """Owner placement that overrides hash routing (pinned or resharded owners)."""
+    __tablename__ = "task_shard_owners"
+    
+    owner_id = Column(Integer, primary_key=True)
+    shard_index = Column(Integer, nullable=False)
+    moving = Column(Boolean, default=False, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<TaskShardOwner(owner_id={self.owner_id}, shard={self.shard_index}, moving={self.moving})>"
+
+
+class TaskShardForward(Base):
+    """Location of a task that was moved away from the shard encoded in its ID."""
+    __tablename__ = "task_shard_forwards"
+    
+    task_id = Column(Integer, primary_key=True)
+    shard_index = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<TaskShardForward(task_id={self.task_id}, shard={self.shard_index})>"
+
+
+class TaskIdCounter(Base):
+    """Last task ID handed out from a shard's ID range; one row per shard, on that shard."""
+    __tablename__ = "task_id_counters"
+    
+    shard_index = Column(Integer, primary_key=True)
+    last_id = Column(Integer, nullable=False)
+    
+    def __repr__(self):
+        return f"<TaskIdCounter(shard={self.shard_index}, last_id={self.last_id})>"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class TaskTag(Base):
+    """
+    Tags of a task (the task <-> tag many-to-many table).
+    Lives next to the tasks table on every shard. There is no foreign key:
+    rows keep their task ID when the task is archived, and are deleted
+    with the task.
+    """
+    __tablename__ = "task_tags"
+    
+    task_id = Column(Integer, primary_key=True)
+    tag = Column(String(50), primary_key=True, index=True)
+    
+    def __repr__(self):
+        return f"<TaskTag(task_id={self.task_id}, tag='{self.tag}')>"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class UserDeletion(Base):
+    """
+    A requested user deletion and its progress.
+    The row hides the user from reads at once; the background job then
+    removes the user's tasks in chunks and finally the user row itself.
+    """
+    __tablename__ = "user_deletions"
+    
+    # No foreign key: the record outlives the user row it describes
+    user_id = Column(Integer, primary_key=True)
+    username = Column(String(50), nullable=False)
+    status = Column(String(20), nullable=False, default="pending", index=True)  # pending, running, completed, failed
+    tasks_deleted = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    requested_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<UserDeletion(user_id={self.user_id}, status='{self.status}', tasks_deleted={self.tasks_deleted})>"
@@ -0,0 +1,317 @@
+"""
+Request profiling for the action endpoints.
+
+- Slow-request capture (always on): statements executed for a request are
+  timed through engine events into a per-request list held in a
+  ContextVar, which follows the request into the threadpool. Requests
+  slower than SLOW_REQUEST_MS are kept with their SQL in a bounded log.
+  Group commit batches run outside any request, so their SQL is not
+  attributed.
+- Stack sampler (on demand): a thread snapshots the stacks of all other
+  threads every few milliseconds and counts them as collapsed stacks
+  ("outer;inner;leaf count"), the input of flamegraph.pl and speedscope.
+- cProfile (on demand): the next N requests matching a router/action run
+  under cProfile, one at a time. The event loop thread is profiled while
+  the request is in flight (including whatever else the loop runs), plus
+  the request's threadpool work wrapped with `profiled`.
+
+Both on-demand modes are driven from /debug/profile.
+"""
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import Headers
+from app.admission import read_body, replay_body, sniff_action
+from app.config import settings
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Long-polls are slow by design and hold no database work
+_UNPROFILED_RESOURCES = {"changes"}
+
+# Statements kept per slow request, and characters kept per statement
+_MAX_STATEMENTS = 100
+_MAX_SQL_LENGTH = 500
+
+# Innermost frames of threads that are only waiting (idle pool workers, the
+# loop in select); dropped from samples unless idle stacks are requested
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+# (statement, seconds) of the current request, or None outside requests
+_request_sql: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_sql", default=None)
+
+# cProfile capture of the current request, or None when it is not profiled
+_request_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if _request_sql.get() is not None:
+        context._profiling_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    statements = _request_sql.get()
+    start = getattr(context, "_profiling_start", None)
+    if statements is not None and start is not None:
+        statements.append((statement, time.perf_counter() - start))
+
+
+class SlowRequestLog:
+    """The most recent requests slower than the threshold, with their SQL."""
+    
+    def __init__(self, threshold_ms: float, size: int):
+        self.threshold = threshold_ms / 1000
+        self.entries: deque = deque(maxlen=max(size, 1))
+    
+    def record(self, scope, action: str, status: Optional[int], elapsed: float,
+               statements: List[Tuple[str, float]]) -> None:
+        sql_seconds = sum(seconds for _, seconds in statements)
+        self.entries.append({
+            "at": datetime.utcnow().isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "action": action,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "sql_count": len(statements),
+            "sql_ms": round(sql_seconds * 1000, 2),
+            "statements": [
+                {"sql": sql[:_MAX_SQL_LENGTH], "ms": round(seconds * 1000, 3)}
+                for sql, seconds in statements[:_MAX_STATEMENTS]
+            ]
+        })
+        metrics.increment("profiling.slow_requests")
+        logger.warning(
+            f"Slow request: {scope['path']} {action} took {elapsed * 1000:.1f} ms "
+            f"({len(statements)} statements, {sql_seconds * 1000:.1f} ms SQL)"
+        )
+    
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """Newest entries first."""
+        return list(self.entries)[::-1][:limit]
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and path.startswith(prefix):
+            path = path[len(prefix):].lstrip(os.sep)
+            break
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Statistical profiler sampling the stacks of every thread."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+    
+    def sample(self, seconds: float, interval: float, include_idle: bool = False) -> Counter:
+        """
+        Sample all other threads for `seconds`; blocks, so run it in the threadpool.
+        Returns collapsed stacks (root first, rooted at the thread name) with counts.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ValueError("A stack sample is already running")
+        try:
+            own = threading.get_ident()
+            labels: Dict[Any, str] = {}
+            stacks: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    if not include_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        label = labels.get(code)
+                        if label is None:
+                            label = labels[code] = _frame_label(code)
+                        stack.append(label)
+                        frame = frame.f_back
+                    stack.append(names.get(ident, str(ident)))
+                    stacks[";".join(reversed(stack))] += 1
+                time.sleep(interval)
+            metrics.increment("profiling.samples", sum(stacks.values()))
+            return stacks
+        finally:
+            self._lock.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    """Collapsed-stack text: one "frame;frame;frame count" line per stack."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class RequestProfile:
+    """cProfile data of one request, across the threads it ran on."""
+    
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+    
+    def add(self, profile: cProfile.Profile) -> None:
+        with self._lock:
+            self.profiles.append(profile)
+
+
+class RequestProfiler:
+    """Runs the next N requests matching a router/action under cProfile."""
+    
+    def __init__(self):
+        self.router: Optional[str] = None
+        self.action: Optional[str] = None
+        self.remaining = 0
+        self.captured = 0
+        self.stats: Optional[pstats.Stats] = None
+        self._active = False
+    
+    @property
+    def armed(self) -> bool:
+        return self.remaining > 0
+    
+    def arm(self, router: Optional[str], action: Optional[str], count: int) -> None:
+        """Profile the next `count` matching requests, discarding earlier results."""
+        self.router, self.action = router, action
+        self.remaining = count
+        self.captured = 0
+        self.stats = None
+    
+    def begin(self, router: str, action: str) -> Optional[RequestProfile]:
+        """Start profiling a request if it matches and no other one is being profiled."""
+        if (
+            not self.armed
+            or self._active
+            or (self.router and router != self.router)
+            or (self.action and action != self.action)
+        ):
+            return None
+        self._active = True
+        self.remaining -= 1
+        return RequestProfile()
+    
+    def finish(self, request_profile: RequestProfile) -> None:
+        for profile in request_profile.profiles:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+        self.captured += 1
+        self._active = False
+    
+    def report(self, sort: str, limit: int) -> str:
+        """pstats listing of the captured requests."""
+        if self.stats is None:
+            return ""
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def profiled(func: Callable) -> Callable:
+    """Wrap a threadpool callable so its work is included when its request is profiled."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        request_profile = _request_profile.get()
+        if request_profile is None:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            request_profile.add(profile)
+    return wrapper
+
+
+# Global profilers used by the middleware and /debug/profile
+slow_requests = SlowRequestLog(settings.slow_request_ms, settings.slow_request_log_size)
+stack_sampler = StackSampler()
+request_profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware timing API requests and running armed cProfile captures."""
+    
+    def __init__(self, app):
+        self.app = app
+        self.prefix = f"{settings.api_prefix}/"
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        resource = scope["path"][len(self.prefix):].split("/", 1)[0]
+        if resource in _UNPROFILED_RESOURCES:
+            await self.app(scope, receive, send)
+            return
+        
+        body = b""
+        request_profile = None
+        if request_profiler.armed and scope["method"] == "POST":
+            body = await read_body(receive)
+            receive = replay_body(body, receive)
+            request_profile = request_profiler.begin(resource, sniff_action(body, Headers(scope=scope).get("content-type")))
+        
+        first_chunk = None
+        status = None
+        
+        async def tee_receive():
+            nonlocal first_chunk
+            message = await receive()
+            if first_chunk is None and message["type"] == "http.request":
+                first_chunk = message.get("body", b"")
+            return message
+        
+        async def tee_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        statements: List[Tuple[str, float]] = []
+        sql_token = _request_sql.set(statements)
+        profile_token = _request_profile.set(request_profile)
+        profile = None
+        if request_profile is not None:
+            profile = cProfile.Profile()
+            profile.enable()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, tee_receive, tee_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+                request_profile.add(profile)
+                request_profiler.finish(request_profile)
+            _request_profile.reset(profile_token)
+            _request_sql.reset(sql_token)
+            if slow_requests.threshold and elapsed >= slow_requests.threshold:
+                action = sniff_action(body or first_chunk or b"", Headers(scope=scope).get("content-type"))
+                slow_requests.record(scope, action, status, elapsed, statements)
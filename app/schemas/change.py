@@ -0,0 +1,28 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+
+
+class ChangeViewRequest(BaseModel):
+    """Payload of the change feed "view" action."""
+    since: int = Field(0, description="Return events with a greater sequence number")
+    limit: int = Field(100, description="Maximum number of events (1-1000)")
+    wait: float = Field(0, description="Seconds to long-poll when no events are available")
+    
+    @field_validator("since")
+    @classmethod
+    def clamp_since(cls, value: int) -> int:
+        return max(value, 0)
+    
+    @field_validator("limit")
+    @classmethod
+    def clamp_limit(cls, value: int) -> int:
+        return value if 1 <= value <= 1000 else 100
+
+
+class ChangeViewAction(BaseModel):
+    action: Literal["view"]
+    data: Optional[ChangeViewRequest] = None
+
+
+# Built once at import; validates raw JSON bodies in a single pydantic-core pass
+change_action_adapter = TypeAdapter(ChangeViewAction)
@@ -1,41 +1,41 @@
-from pydantic import BaseModel, Field
-from typing import Any, Optional, Literal
-from enum import Enum
-
-
-class ActionType(str, Enum):
-    CREATE = "create"
-    EDIT = "edit"
-    VIEW = "view"
-
-
-class BaseActionRequest(BaseModel):
-    """Base request schema for all endpoints."""
-    action: ActionType = Field(..., description="Action to perform: create, edit, or view")
-    data: Optional[dict] = Field(None, description="Data for the action")
-
-
-class UserActionRequest(BaseActionRequest):
-    """Request schema for user endpoints."""
-    data: Optional[dict] = Field(None, description="User data for the action")
-
-
-class TaskActionRequest(BaseActionRequest):
-    """Request schema for task endpoints."""
-    data: Optional[dict] = Field(None, description="Task data for the action")
-
-
-class PaginationParams(BaseModel):
-    """Pagination parameters for list operations."""
-    page: int = Field(1, ge=1, description="Page number")
-    size: int = Field(10, ge=1, le=100, description="Page size")
-    sort_by: Optional[str] = Field(None, description="Field to sort by")
-    sort_order: Literal["asc", "desc"] = Field("asc", description="Sort order")
-
-
-class FilterParams(BaseModel):
-    """Filter parameters for search operations."""
-    search: Optional[str] = Field(None, description="Search term")
-    status: Optional[str] = Field(None, description="Filter by status")
-    priority: Optional[str] = Field(None, description="Filter by priority")
-    owner_id: Optional[int] = Field(None, description="Filter by owner ID")
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
+from typing import Any, Dict
+
+
+class PageRequest(BaseModel):
+    """Page parameters of "view" actions; out-of-range values fall back to defaults."""
+    page: int = Field(1, description="Page number")
+    size: int = Field(10, description="Page size (1-100)")
+    
+    @field_validator("page")
+    @classmethod
+    def clamp_page(cls, value: int) -> int:
+        return value if value >= 1 else 1
+    
+    @field_validator("size")
+    @classmethod
+    def clamp_size(cls, value: int) -> int:
+        return value if 1 <= value <= 100 else 10
+    
+    @property
+    def skip(self) -> int:
+        return (self.page - 1) * self.size
+
+
+# Models referenced by action request bodies; the app adds them to the OpenAPI components
+ACTION_SCHEMA_DEFS: Dict[str, Any] = {}
+
+
+def action_openapi(adapter: TypeAdapter) -> Dict[str, Any]:
+    """OpenAPI request body for action endpoints that validate the raw body with `adapter`."""
+    schema = adapter.json_schema(ref_template="#/components/schemas/{model}")
+    ACTION_SCHEMA_DEFS.update(schema.pop("$defs", {}))
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                "application/msgpack": {"schema": schema}
+            }
+        }
+    }
@@ -0,0 +1,57 @@
+from typing import Annotated, Literal, Optional, Union
+from pydantic import BaseModel, Field, TypeAdapter
+
+
+class ProfileSampleRequest(BaseModel):
+    """Payload of the profile "sample" action."""
+    seconds: float = Field(5.0, gt=0, le=60, description="How long to sample")
+    interval_ms: float = Field(5.0, ge=1, le=1000, description="Time between samples")
+    include_idle: bool = Field(False, description="Keep stacks of threads that are only waiting")
+    format: Literal["json", "collapsed"] = Field("json", description="\"collapsed\" returns plain text for flamegraph.pl")
+
+
+class ProfileCaptureRequest(BaseModel):
+    """Payload of the profile "cprofile" action; omitted filters match any request."""
+    router: Optional[str] = Field(None, description="Router to match, e.g. \"tasks\"")
+    action: Optional[str] = Field(None, description="Action to match, e.g. \"view\"")
+    requests: int = Field(10, ge=1, le=1000, description="Number of matching requests to profile")
+
+
+class ProfileViewRequest(BaseModel):
+    """Payload of the profile "view" action."""
+    sort: Literal["cumulative", "tottime", "calls"] = Field("cumulative", description="pstats sort key")
+    limit: int = Field(40, ge=1, le=500, description="Functions to list")
+
+
+class SlowRequestsRequest(BaseModel):
+    """Payload of the profile "slow" action."""
+    limit: int = Field(20, ge=1, le=1000, description="Most recent slow requests to return")
+
+
+class ProfileSampleAction(BaseModel):
+    action: Literal["sample"]
+    data: Optional[ProfileSampleRequest] = None
+
+
+class ProfileCaptureAction(BaseModel):
+    action: Literal["cprofile"]
+    data: Optional[ProfileCaptureRequest] = None
+
+
+class ProfileViewAction(BaseModel):
+    action: Literal["view"]
+    data: Optional[ProfileViewRequest] = None
+
+
+class SlowRequestsAction(BaseModel):
+    action: Literal["slow"]
+    data: Optional[SlowRequestsRequest] = None
+
+
+ProfileActionRequest = Annotated[
+    Union[ProfileSampleAction, ProfileCaptureAction, ProfileViewAction, SlowRequestsAction],
+    Field(discriminator="action")
+]
+
+# Built once at import; validates raw JSON bodies in a single pydantic-core pass
+profile_action_adapter = TypeAdapter(ProfileActionRequest)
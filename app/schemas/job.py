@@ -0,0 +1,20 @@
+from typing import Literal, Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from app.schemas.common import PageRequest
+
+
+class JobViewRequest(PageRequest):
+    """Payload of the job "view" action: one job by ID, else a page of jobs in a status."""
+    id: Optional[int] = Field(None, description="View a single job by ID")
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(
+        "queued", description="Status of the jobs to list"
+    )
+
+
+class JobViewAction(BaseModel):
+    action: Literal["view"]
+    data: Optional[JobViewRequest] = None
+
+
+# Built once at import; validates raw JSON bodies in a single pydantic-core pass
+job_action_adapter = TypeAdapter(JobViewAction)
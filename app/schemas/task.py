@@ -1,21 +1,23 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, Field, computed_field
-from enum import Enum
+from typing import Annotated, List, Literal, Optional, Union
+from pydantic import AfterValidator, BaseModel, Field, TypeAdapter, computed_field
+from app.models.task import TaskStatus, TaskPriority
+from app.schemas.common import PageRequest
 
+MAX_TAGS = 20
 
-class TaskStatus(str, Enum):
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    COMPLETED = "completed"
-    CANCELLED = "cancelled"
 
+def _normalize_tags(tags: List[str]) -> List[str]:
+    """Trimmed, lowercase and de-duplicated, in the given order."""
+    tags = list(dict.fromkeys(tag.strip().lower() for tag in tags))
+    if any(not tag or len(tag) > 50 for tag in tags):
+        raise ValueError("Tags must be 1-50 characters")
+    if len(tags) > MAX_TAGS:
+        raise ValueError(f"At most {MAX_TAGS} tags are allowed")
+    return tags
 
-class TaskPriority(str, Enum):
-    LOW = "low"
-    MEDIUM = "medium"
-    HIGH = "high"
-    URGENT = "urgent"
+
+Tags = Annotated[List[str], AfterValidator(_normalize_tags)]
 
 
 class TaskBase(BaseModel):
@@ -28,7 +30,13 @@ class TaskBase(BaseModel):
 
 
 class TaskCreate(TaskBase):
-    user_id: int = Field(..., description="ID of the user who owns this task")
+    owner_id: int = Field(..., description="ID of the user who owns this task")
+    tags: Optional[Tags] = Field(None, description="Task tags")
+    parent_id: Optional[int] = Field(None, description="Create the task as a subtask of this task")
+    idempotency_key: Optional[str] = Field(
+        None, min_length=1, max_length=255,
+        description="Deduplicates retries; same as the Idempotency-Key header"
+    )
 
 
 class TaskUpdate(BaseModel):
@@ -38,11 +46,13 @@ class TaskUpdate(BaseModel):
     priority: Optional[TaskPriority] = Field(None, description="Task priority level")
     due_date: Optional[datetime] = Field(None, description="Task due date")
     is_completed: Optional[bool] = Field(None, description="Whether the task is completed")
+    tags: Optional[Tags] = Field(None, description="Replaces the task's tags")
+    parent_id: Optional[int] = Field(None, description="New parent task; null makes it a top-level task")
 
 
 class TaskResponse(TaskBase):
     id: int = Field(..., description="Unique task ID")
-    user_id: int = Field(..., description="ID of the user who owns this task")
+    owner_id: int = Field(..., description="ID of the user who owns this task")
     created_at: datetime = Field(..., description="Task creation timestamp")
     updated_at: datetime = Field(..., description="Task last update timestamp")
     
@@ -69,6 +79,106 @@ class TaskInDB(TaskResponse):
     pass
 
 
-class TaskActionRequest(BaseModel):
-    action: str = Field(..., description="Action to perform: create, edit, or view")
-    data: Optional[dict] = Field(None, description="Data for the action")
+class TaskEditRequest(BaseModel):
+    """Payload of the task "edit" action."""
+    id: int = Field(..., description="ID of the task to edit")
+    title: Optional[str] = Field(None, min_length=1, max_length=200, description="Task title")
+    description: Optional[str] = Field(None, max_length=1000, description="Task description")
+    status: Optional[TaskStatus] = Field(None, description="Current task status")
+    priority: Optional[TaskPriority] = Field(None, description="Task priority level")
+    due_date: Optional[datetime] = Field(None, description="Task due date")
+    tags: Optional[Tags] = Field(None, description="Replaces the task's tags")
+    parent_id: Optional[int] = Field(
+        None, description="Move the task and its subtasks under this task; null makes it a top-level task"
+    )
+    version: Optional[int] = Field(None, ge=1, description="Expected current version; the edit fails on a mismatch")
+    
+    def to_update(self) -> TaskUpdate:
+        """The provided fields as a TaskUpdate, without validating them a second time."""
+        changes = self.model_dump(exclude_unset=True, exclude={"id", "version"})
+        return TaskUpdate.model_construct(_fields_set=set(changes), **changes)
+
+
+class TaskViewRequest(PageRequest):
+    """
+    Payload of the task "view" action; the first present selector wins.
+    A tag query (tags_all, tags_any, tags_none) comes second and is combined
+    with status and priority. With an id, `hierarchy` returns the task's
+    subtasks (paginated), its ancestor path or its subtask counts by status;
+    `history` returns its changes and `as_of` its fields at a past time.
+    `analytics` takes precedence and returns aggregates instead of tasks.
+    """
+    analytics: bool = Field(
+        False, description="Lead time, weekly throughput and overdue ratio per owner (one owner with owner_id)"
+    )
+    id: Optional[int] = Field(None, description="View a single task")
+    include_owner: bool = Field(False, description="Include the owner with a single task")
+    hierarchy: Optional[Literal["subtree", "ancestors", "rollup"]] = Field(
+        None, description="With id: all subtasks, the ancestor path, or subtask counts by status"
+    )
+    history: bool = Field(False, description="With id: the task's change history (paginated)")
+    as_of: Optional[datetime] = Field(None, description="With id: the task's fields at this time, from its history")
+    owner_id: Optional[int] = Field(None, description="List tasks of an owner")
+    status: Optional[TaskStatus] = Field(None, description="List tasks with a status")
+    search: Optional[str] = Field(None, description="Search titles and descriptions")
+    include_archived: bool = Field(False, description="Also return archived (finished) tasks")
+    tags_all: Optional[Tags] = Field(None, description="List tasks having all of these tags")
+    tags_any: Optional[Tags] = Field(None, description="List tasks having at least one of these tags")
+    tags_none: Optional[Tags] = Field(None, description="List tasks having none of these tags")
+    priority: Optional[TaskPriority] = Field(None, description="With a tag query, only tasks with this priority")
+    
+    @property
+    def tag_query(self) -> bool:
+        return bool(self.tags_all or self.tags_any or self.tags_none)
+
+
+class TaskBulkFilter(BaseModel):
+    """Tasks selected by a "bulk_edit" action; all given conditions must match."""
+    owner_id: Optional[int] = Field(None, description="Tasks of an owner")
+    status: Optional[TaskStatus] = Field(None, description="Tasks with a status")
+    priority: Optional[TaskPriority] = Field(None, description="Tasks with a priority")
+    due_after: Optional[datetime] = Field(None, description="Tasks due at or after this time")
+    due_before: Optional[datetime] = Field(None, description="Tasks due before this time")
+
+
+class TaskBulkPatch(BaseModel):
+    """Fields set on every selected task by a "bulk_edit" action."""
+    status: Optional[TaskStatus] = Field(None, description="New status")
+    priority: Optional[TaskPriority] = Field(None, description="New priority")
+    due_date: Optional[datetime] = Field(None, description="New due date")
+    owner_id: Optional[int] = Field(None, description="Reassign the tasks to this user")
+
+
+class TaskBulkEditRequest(BaseModel):
+    """Payload of the task "bulk_edit" action."""
+    filter: TaskBulkFilter = Field(..., description="Which tasks to update (at least one condition)")
+    patch: TaskBulkPatch = Field(..., description="Fields to set")
+
+
+class TaskCreateAction(BaseModel):
+    action: Literal["create"]
+    data: TaskCreate
+
+
+class TaskEditAction(BaseModel):
+    action: Literal["edit"]
+    data: TaskEditRequest
+
+
+class TaskViewAction(BaseModel):
+    action: Literal["view"]
+    data: Optional[TaskViewRequest] = None
+
+
+class TaskBulkEditAction(BaseModel):
+    action: Literal["bulk_edit"]
+    data: TaskBulkEditRequest
+
+
+TaskActionRequest = Annotated[
+    Union[TaskCreateAction, TaskEditAction, TaskViewAction, TaskBulkEditAction],
+    Field(discriminator="action")
+]
+
+# Built once at import; validates raw JSON bodies in a single pydantic-core pass
+task_action_adapter = TypeAdapter(TaskActionRequest)
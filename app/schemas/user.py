@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel, EmailStr, Field, computed_field
+from typing import Annotated, Literal, Optional, Union
+from pydantic import BaseModel, EmailStr, Field, TypeAdapter, computed_field
+from app.schemas.common import PageRequest
 
 
 class UserBase(BaseModel):
@@ -12,6 +13,10 @@ class UserBase(BaseModel):
 
 class UserCreate(UserBase):
     password: str = Field(..., min_length=8, description="User password (min 8 characters)")
+    idempotency_key: Optional[str] = Field(
+        None, min_length=1, max_length=255,
+        description="Deduplicates retries; same as the Idempotency-Key header"
+    )
 
 
 class UserUpdate(BaseModel):
@@ -59,6 +64,67 @@ class UserInDB(UserResponse):
     hashed_password: str = Field(..., description="Hashed password")
 
 
-class UserActionRequest(BaseModel):
-    action: str = Field(..., description="Action to perform: create, edit, or view")
-    data: Optional[dict] = Field(None, description="Data for the action")
+class UserEditRequest(BaseModel):
+    """Payload of the user "edit" action."""
+    id: int = Field(..., description="ID of the user to edit")
+    username: Optional[str] = Field(None, min_length=3, max_length=50, description="Unique username")
+    email: Optional[EmailStr] = Field(None, description="Valid email address")
+    full_name: Optional[str] = Field(None, min_length=1, max_length=100, description="User's full name")
+    is_active: Optional[bool] = Field(None, description="Whether the user account is active")
+    version: Optional[int] = Field(None, ge=1, description="Expected current version; the edit fails on a mismatch")
+    
+    def to_update(self) -> UserUpdate:
+        """The provided fields as a UserUpdate, without validating them a second time."""
+        changes = self.model_dump(exclude_unset=True, exclude={"id", "version"})
+        return UserUpdate.model_construct(_fields_set=set(changes), **changes)
+
+
+class UserViewRequest(PageRequest):
+    """Payload of the user "view" action; the first present selector wins."""
+    id: Optional[int] = Field(None, description="View a single user by ID")
+    username: Optional[str] = Field(None, description="View a single user by username")
+
+
+class UserDeleteRequest(BaseModel):
+    """Payload of the user "delete" action."""
+    id: int = Field(..., description="ID of the user to delete")
+
+
+class UserLoginRequest(BaseModel):
+    """Payload of the user "login" action."""
+    username: str = Field(..., description="Username")
+    password: str = Field(..., description="Password")
+
+
+class UserCreateAction(BaseModel):
+    action: Literal["create"]
+    data: UserCreate
+
+
+class UserEditAction(BaseModel):
+    action: Literal["edit"]
+    data: UserEditRequest
+
+
+class UserViewAction(BaseModel):
+    action: Literal["view"]
+    data: Optional[UserViewRequest] = None
+
+
+class UserDeleteAction(BaseModel):
+    action: Literal["delete"]
+    data: UserDeleteRequest
+
+
+class UserLoginAction(BaseModel):
+    action: Literal["login"]
+    data: UserLoginRequest
+
+
+UserActionRequest = Annotated[
+    Union[UserCreateAction, UserEditAction, UserViewAction, UserDeleteAction, UserLoginAction],
+    Field(discriminator="action")
+]
+
+# Built once at import; validates raw JSON bodies in a single pydantic-core pass
+user_action_adapter = TypeAdapter(UserActionRequest)
@@ -1,4 +1,8 @@
 from .user_service import UserService
 from .task_service import TaskService
+from .change_feed import ChangeFeedService
+from .idempotency_service import IdempotencyService
+from .archive_service import ArchiveService
 
-__all__ = ["UserService", "TaskService"]
+__all__ = ["UserService", "TaskService", "ChangeFeedService", "IdempotencyService",
+           "ArchiveService"]
@@ -0,0 +1,268 @@
+"""
+Task analytics over a columnar snapshot.
+
+A background loop periodically copies the analytics fields of every hot
+and archived task into NumPy arrays (owner, status and priority codes,
+created / due / completed epoch seconds) and aggregates them per owner
+with vectorized group-bys. Requests only slice the precomputed report, so
+their latency does not depend on the number of tasks; the numbers are at
+most ANALYTICS_REFRESH_SECONDS old. The report is per process.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models.task import TaskStatus, TaskPriority
+from app.services.statements import ANALYTICS_SNAPSHOT, HIDDEN_OWNERS
+from app.sharding import task_shards
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Codes of the snapshot's status and priority columns, as in ANALYTICS_SNAPSHOT
+STATUSES = list(TaskStatus)
+PRIORITIES = list(TaskPriority)
+_COMPLETED = STATUSES.index(TaskStatus.COMPLETED)
+_OPEN = [STATUSES.index(TaskStatus.PENDING), STATUSES.index(TaskStatus.IN_PROGRESS)]
+
+WEEK_SECONDS = 7 * 86400
+# Weeks start on Monday; 1970-01-01 was a Thursday
+_MONDAY_OFFSET = 4 * 86400
+
+# Rows fetched per round trip while loading
+_LOAD_BATCH = 50000
+
+
+class TaskSnapshot:
+    """Columnar copy of the analytics fields of every task; missing timestamps are NaN."""
+    
+    def __init__(self, owner_id: np.ndarray, status: np.ndarray, priority: np.ndarray,
+                 created: np.ndarray, due: np.ndarray, completed: np.ndarray, taken_at: float):
+        self.owner_id = owner_id
+        self.status = status
+        self.priority = priority
+        self.created = created
+        self.due = due
+        self.completed = completed
+        self.taken_at = taken_at
+    
+    def __len__(self) -> int:
+        return len(self.owner_id)
+    
+    @classmethod
+    def load(cls, db: Session) -> "TaskSnapshot":
+        """
+        Read every shard's hot and archived tasks in batches of rows converted to arrays,
+        leaving out the tasks of owners being deleted.
+        """
+        taken_at = time.time()
+        hidden = np.array(db.execute(HIDDEN_OWNERS).scalars().all(), dtype=np.int64)
+        columns: List[List[np.ndarray]] = [[] for _ in range(6)]
+        for shard in task_shards.shards:
+            with task_shards.session(db, shard.index) as shard_db:
+                for stmt in ANALYTICS_SNAPSHOT:
+                    # Core rows from the session's connection, without the ORM result layer
+                    result = shard_db.connection().execute(stmt, execution_options={"yield_per": _LOAD_BATCH})
+                    for rows in result.partitions():
+                        # Plain tuples: NumPy probes Row objects for array interfaces.
+                        # None becomes NaN in a float array.
+                        batch = np.array([tuple(row) for row in rows], dtype=np.float64).reshape(-1, 6)
+                        for index, column in enumerate(columns):
+                            column.append(batch[:, index])
+        
+        def joined(index: int, dtype) -> np.ndarray:
+            return np.concatenate(columns[index]).astype(dtype) if columns[index] else np.empty(0, dtype)
+        
+        owner_id = joined(0, np.int64)
+        keep = ~np.isin(owner_id, hidden) if len(hidden) else slice(None)
+        return cls(
+            owner_id=owner_id[keep],
+            status=joined(1, np.int8)[keep],
+            priority=joined(2, np.int8)[keep],
+            created=joined(3, np.float64)[keep],
+            due=joined(4, np.float64)[keep],
+            completed=joined(5, np.float64)[keep],
+            taken_at=taken_at
+        )
+
+
+def _group_by_owner(owner_id: np.ndarray):
+    """Sorted distinct owners and each task's owner index, like np.unique(return_inverse=True)."""
+    if len(owner_id) and owner_id.min() >= 0 and owner_id.max() < 4 * len(owner_id) + 1_000_000:
+        # User IDs are dense: a lookup table avoids sorting every task
+        present = np.bincount(owner_id) > 0
+        owners = np.flatnonzero(present)
+        index = np.cumsum(present) - 1
+        return owners, index[owner_id]
+    return np.unique(owner_id, return_inverse=True)
+
+
+def _group_median(values: np.ndarray, groups: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Median of `values` per group (NaN for empty groups)."""
+    # Sorted by value, then stably by group: each group's values end up contiguous and in order
+    by_value = np.argsort(values)
+    ordered = values[by_value[np.argsort(groups[by_value], kind="stable")]]
+    starts = np.cumsum(counts) - counts
+    medians = np.full(len(counts), np.nan)
+    present = counts > 0
+    low = starts[present] + (counts[present] - 1) // 2
+    high = starts[present] + counts[present] // 2
+    medians[present] = (ordered[low] + ordered[high]) / 2
+    return medians
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+def _hours(seconds: float) -> Optional[float]:
+    return None if np.isnan(seconds) else round(float(seconds) / 3600, 2)
+
+
+class AnalyticsReport:
+    """
+    Per-owner aggregates of one snapshot:
+    - task, open, overdue and completed counts;
+    - overdue ratio (overdue / open);
+    - lead time from creation to completion (mean and median);
+    - completions per week over the last `weeks` weeks.
+    Owners are sorted by ID for lookups and pages.
+    """
+    
+    def __init__(self, snapshot: TaskSnapshot, weeks: int):
+        now = snapshot.taken_at
+        self.as_of = datetime.fromtimestamp(now, timezone.utc)
+        self.weeks = weeks
+        
+        self.owners, group = _group_by_owner(snapshot.owner_id)
+        size = len(self.owners)
+        self.tasks = np.bincount(group, minlength=size)
+        
+        is_open = np.isin(snapshot.status, _OPEN)
+        # NaN due dates compare False: tasks without a due date are never overdue
+        is_overdue = is_open & (snapshot.due < now)
+        self.open = np.bincount(group[is_open], minlength=size)
+        self.overdue = np.bincount(group[is_overdue], minlength=size)
+        self.overdue_ratio = _ratio(self.overdue, self.open)
+        
+        done = (snapshot.status == _COMPLETED) & ~np.isnan(snapshot.completed)
+        done_group = group[done]
+        lead = snapshot.completed[done] - snapshot.created[done]
+        self.completed = np.bincount(done_group, minlength=size)
+        lead_sum = np.bincount(done_group, weights=lead, minlength=size)
+        self.lead_mean = np.divide(lead_sum, self.completed, out=np.full(size, np.nan), where=self.completed > 0)
+        self.lead_median = _group_median(lead, done_group, self.completed)
+        self.total_lead_mean = float(lead.mean()) if len(lead) else np.nan
+        self.total_lead_median = float(np.median(lead)) if len(lead) else np.nan
+        
+        # Completions bucketed by week, the current (partial) week last
+        current_week = (now - _MONDAY_OFFSET) // WEEK_SECONDS * WEEK_SECONDS + _MONDAY_OFFSET
+        self.first_week = current_week - (weeks - 1) * WEEK_SECONDS
+        completed_at = snapshot.completed[done]
+        in_window = (completed_at >= self.first_week) & (completed_at < current_week + WEEK_SECONDS)
+        week = ((completed_at[in_window] - self.first_week) // WEEK_SECONDS).astype(np.int64)
+        self.throughput = np.bincount(
+            done_group[in_window] * weeks + week, minlength=size * weeks
+        ).reshape(size, weeks)
+        
+        self.open_by_priority = np.bincount(snapshot.priority[is_open], minlength=len(PRIORITIES))
+        self.summary = self._summarize()
+    
+    @property
+    def week_starts(self) -> List[str]:
+        return [
+            datetime.fromtimestamp(self.first_week + week * WEEK_SECONDS, timezone.utc).date().isoformat()
+            for week in range(self.weeks)
+        ]
+    
+    def _summarize(self) -> Dict[str, Any]:
+        """Totals over all owners."""
+        open_count = int(self.open.sum())
+        overdue = int(self.overdue.sum())
+        return {
+            "tasks": int(self.tasks.sum()),
+            "owners": len(self.owners),
+            "open": open_count,
+            "overdue": overdue,
+            "overdue_ratio": round(overdue / open_count, 4) if open_count else 0.0,
+            "completed": int(self.completed.sum()),
+            "lead_time_hours": {"mean": _hours(self.total_lead_mean), "median": _hours(self.total_lead_median)},
+            "throughput": self.throughput.sum(axis=0).tolist(),
+            "open_by_priority": {
+                priority.value: int(count) for priority, count in zip(PRIORITIES, self.open_by_priority)
+            }
+        }
+    
+    def _owner_row(self, index: int) -> Dict[str, Any]:
+        return {
+            "owner_id": int(self.owners[index]),
+            "tasks": int(self.tasks[index]),
+            "open": int(self.open[index]),
+            "overdue": int(self.overdue[index]),
+            "overdue_ratio": round(float(self.overdue_ratio[index]), 4),
+            "completed": int(self.completed[index]),
+            "lead_time_hours": {"mean": _hours(self.lead_mean[index]), "median": _hours(self.lead_median[index])},
+            "throughput": self.throughput[index].tolist()
+        }
+    
+    def owner(self, owner_id: int) -> Optional[Dict[str, Any]]:
+        """One owner's aggregates, or None if they have no tasks."""
+        index = int(np.searchsorted(self.owners, owner_id))
+        if index < len(self.owners) and self.owners[index] == owner_id:
+            return self._owner_row(index)
+        return None
+    
+    def owners_page(self, skip: int, limit: int) -> List[Dict[str, Any]]:
+        """Aggregates of a page of owners in ID order."""
+        return [self._owner_row(index) for index in range(skip, min(skip + limit, len(self.owners)))]
+
+
+class TaskAnalytics:
+    """Holder of the latest report, replaced whole by each refresh."""
+    
+    def __init__(self):
+        self._report: Optional[AnalyticsReport] = None
+        self.refresh_seconds = 0.0
+    
+    @property
+    def report(self) -> AnalyticsReport:
+        if self._report is None:
+            raise ValueError("Analytics are being computed, please retry shortly")
+        return self._report
+    
+    def refresh(self, weeks: Optional[int] = None) -> AnalyticsReport:
+        """Load a snapshot and aggregate it; blocks, so run it in the threadpool."""
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            snapshot = TaskSnapshot.load(db)
+        finally:
+            db.close()
+        self._report = AnalyticsReport(snapshot, weeks or settings.analytics_weeks)
+        self.refresh_seconds = time.perf_counter() - start
+        metrics.increment("analytics.refreshes")
+        logger.info(f"Analytics refreshed: {len(snapshot)} tasks in {self.refresh_seconds:.2f}s")
+        return self._report
+
+
+# Global analytics holder, refreshed by the application lifespan
+task_analytics = TaskAnalytics()
+
+metrics.register_gauge("analytics.refresh_seconds", lambda: round(task_analytics.refresh_seconds, 3))
+
+
+async def run_analytics_refresh(interval_seconds: Optional[int] = None) -> None:
+    """Refresh the analytics at once, then periodically in the threadpool until cancelled."""
+    interval = interval_seconds or settings.analytics_refresh_seconds
+    while True:
+        try:
+            await run_in_threadpool(task_analytics.refresh)
+        except Exception as e:
+            logger.error(f"Analytics refresh failed: {e}")
+        await asyncio.sleep(interval)
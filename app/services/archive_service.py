@@ -0,0 +1,93 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.services.change_feed import ChangeFeedService
+from app.services.statements import ARCHIVE_CANDIDATES, ARCHIVE_COPY, ARCHIVE_DELETE, TASKS_TAGS
+from app.services.tag_index import tag_index
+from app.sharding import task_shards
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class ArchiveService:
+    """
+    Service class for moving finished tasks out of the hot tasks table.
+    Each shard keeps its own archived_tasks table next to its tasks table,
+    so a batch is copied and deleted in one local transaction.
+    """
+    
+    @staticmethod
+    def archive_batch(db: Session, shard_index: int, cutoff: datetime, batch_size: int) -> int:
+        """Move one batch of tasks finished before `cutoff` on a shard; returns the count."""
+        try:
+            with task_shards.session(db, shard_index) as shard_db:
+                ids = shard_db.execute(ARCHIVE_CANDIDATES, {"cutoff": cutoff, "limit": batch_size}).scalars().all()
+                if not ids:
+                    return 0
+                
+                shard_db.execute(ARCHIVE_COPY, {"ids": ids})
+                shard_db.execute(ARCHIVE_DELETE, {"ids": ids})
+                # Tag rows stay with the archived tasks; only the index forgets them
+                tags = {task_id: [] for task_id in ids}
+                for task_id, tag in shard_db.execute(TASKS_TAGS, {"ids": ids}):
+                    tags[task_id].append(tag)
+                for task_id in ids:
+                    ChangeFeedService.record(db, "task", task_id, "archive")
+                    tag_index.record(db, "remove", task_id, tags[task_id])
+                
+                shard_db.commit()
+                if shard_db is not db:
+                    db.commit()
+            
+            metrics.increment("archive.tasks", len(ids))
+            return len(ids)
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error archiving tasks on shard {shard_index}: {e}")
+            raise
+    
+    @staticmethod
+    def archive_finished_tasks(db: Session, older_than_days: Optional[int] = None,
+                               batch_size: Optional[int] = None) -> int:
+        """Archive every task completed or cancelled more than `older_than_days` ago."""
+        days = settings.archive_after_days if older_than_days is None else older_than_days
+        batch_size = batch_size or settings.archive_batch_size
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        
+        total = 0
+        for shard in task_shards.shards:
+            while True:
+                moved = ArchiveService.archive_batch(db, shard.index, cutoff, batch_size)
+                total += moved
+                if moved < batch_size:
+                    break
+        
+        if total:
+            logger.info(f"Archived {total} tasks finished before {cutoff.isoformat()}")
+        return total
+
+
+def _archive_once() -> int:
+    db = SessionLocal()
+    try:
+        return ArchiveService.archive_finished_tasks(db)
+    finally:
+        db.close()
+
+
+async def run_archival(interval_seconds: Optional[int] = None) -> None:
+    """Periodically archive finished tasks in the threadpool until cancelled."""
+    interval = interval_seconds or settings.archive_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(_archive_once)
+        except Exception as e:
+            logger.error(f"Task archival failed: {e}")
@@ -0,0 +1,313 @@
+import asyncio
+import bisect
+import threading
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models.change_event import ChangeEvent
+from app.services.statements import CHANGES_SINCE, CHANGES_OLDEST_SEQ, CHANGES_NEWEST_SEQ
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class ChangeNotifier:
+    """
+    In-process fan-out for new change events.
+    All idle subscribers on a loop await one shared future, so a waiting
+    client costs a single callback instead of a polling query.
+    """
+
+    def __init__(self):
+        self.latest_seq = 0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    def publish(self, seq: int) -> None:
+        """Record a committed sequence number and wake every waiter."""
+        with self._lock:
+            if seq > self.latest_seq:
+                self.latest_seq = seq
+            waiter, loop = self._waiter, self._loop
+            self._waiter = None
+
+        if waiter is None or loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            _resolve(waiter, seq)
+        else:
+            loop.call_soon_threadsafe(_resolve, waiter, seq)
+
+    async def wait(self, since: int, timeout: float) -> bool:
+        """Wait until an event newer than `since` is published or timeout expires."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.latest_seq > since:
+                return True
+            if self._waiter is None or self._waiter.done() or self._loop is not loop:
+                self._waiter = loop.create_future()
+                self._loop = loop
+            waiter = self._waiter
+
+        try:
+            # Shield so a timed-out subscriber never cancels the shared future
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.latest_seq > since
+
+
+def _resolve(waiter: asyncio.Future, seq: int) -> None:
+    if not waiter.done():
+        waiter.set_result(seq)
+
+
+# Global notifier shared by the services and the changes router
+change_notifier = ChangeNotifier()
+
+
+def _encode_value(value: Any) -> Any:
+    """Convert a column value into something the JSON payload can store."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_change_seq(session, flush_context):
+    """Remember the newest change sequence written by this transaction."""
+    seqs = [obj.id for obj in session.new if isinstance(obj, ChangeEvent)]
+    if seqs:
+        session.info["change_feed_seq"] = max(seqs + [session.info.get("change_feed_seq", 0)])
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_change_seq(session):
+    """Wake subscribers once the change events are durable."""
+    if session.in_nested_transaction():
+        # Released savepoint of a group commit batch; the batch is not committed yet
+        return
+    seq = session.info.pop("change_feed_seq", None)
+    if seq:
+        change_notifier.publish(seq)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_change_seq(session):
+    session.info.pop("change_feed_seq", None)
+
+
+class ChangeFeedService:
+    """Service class for the sequenced change log."""
+
+    @staticmethod
+    def record(db: Session, entity: str, entity_id: int, operation: str,
+               payload: Optional[Dict[str, Any]] = None) -> ChangeEvent:
+        """
+        Add a change event to the caller's transaction.
+        The event commits (or rolls back) together with the mutation itself.
+        """
+        if payload is not None:
+            payload = {key: _encode_value(value) for key, value in payload.items()}
+
+        change = ChangeEvent(
+            entity=entity,
+            entity_id=entity_id,
+            operation=operation,
+            payload=payload
+        )
+        db.add(change)
+        return change
+
+    @staticmethod
+    def get_changes(db: Session, since: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Get change events with a sequence number greater than `since`."""
+        try:
+            events = db.execute(CHANGES_SINCE, {"since": since, "limit": limit}).scalars().all()
+
+            # Events older than the oldest retained one were compacted away;
+            # such clients have to reload their views before following the feed.
+            oldest_seq = db.execute(CHANGES_OLDEST_SEQ).scalar()
+            reset = oldest_seq is not None and since < oldest_seq - 1
+
+            event_list = []
+            for change in events:
+                event_list.append({
+                    "seq": change.id,
+                    "entity": change.entity,
+                    "entity_id": change.entity_id,
+                    "operation": change.operation,
+                    "payload": change.payload,
+                    "created_at": change.created_at
+                })
+
+            return {
+                "events": event_list,
+                "last_seq": event_list[-1]["seq"] if event_list else since,
+                "reset": reset
+            }
+        except Exception as e:
+            logger.error(f"Error getting changes since {since}: {e}")
+            raise
+
+    @staticmethod
+    def get_latest_seq(db: Session) -> int:
+        """Get the newest sequence number in the change log."""
+        return db.execute(CHANGES_NEWEST_SEQ).scalar() or 0
+
+    @staticmethod
+    def compact(db: Session, retention_seconds: Optional[int] = None) -> int:
+        """Delete change events older than the retention window."""
+        if retention_seconds is None:
+            retention_seconds = settings.change_feed_retention_seconds
+
+        try:
+            newest_seq = ChangeFeedService.get_latest_seq(db)
+            if not newest_seq:
+                return 0
+
+            cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+            # The newest event is always kept so a lagging client can still detect the gap
+            deleted = db.query(ChangeEvent).filter(
+                ChangeEvent.created_at < cutoff,
+                ChangeEvent.id < newest_seq
+            ).delete(synchronize_session=False)
+            db.commit()
+
+            if deleted:
+                logger.info(f"Compacted {deleted} change events older than {cutoff.isoformat()}")
+            return deleted
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error compacting change events: {e}")
+            raise
+
+    @staticmethod
+    def initialize() -> None:
+        """Seed the notifier with the newest sequence number on startup."""
+        db = SessionLocal()
+        try:
+            change_notifier.publish(ChangeFeedService.get_latest_seq(db))
+        finally:
+            db.close()
+
+
+def _fetch_changes(since: int, limit: int) -> Dict[str, Any]:
+    """Read a page of changes with a short-lived session."""
+    # Sessions are opened per fetch so idle long-poll and stream
+    # subscribers never hold a pooled connection while they wait.
+    db = SessionLocal()
+    try:
+        return ChangeFeedService.get_changes(db, since=since, limit=limit)
+    finally:
+        db.close()
+
+
+class ChangeTail:
+    """
+    The newest change events, shared by the long-poll and stream subscribers.
+    A publish wakes every subscriber at once; the first to read fetches the
+    new events in the threadpool, the others await that same fetch, and each
+    cuts its page from memory. A write so costs one query however many
+    subscribers follow the feed, and no query runs on the event loop.
+    Cursors older than the tail are read from the database.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._events: List[Dict[str, Any]] = []
+        self._seqs: List[int] = []
+        # The tail holds every event with start < seq <= end
+        self._start: Optional[int] = None
+        self._end = 0
+        self._refresh: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    async def read(self, since: int, limit: int) -> Dict[str, Any]:
+        """A page of changes after `since`, like ChangeFeedService.get_changes."""
+        if not self.size:
+            return await run_in_threadpool(_fetch_changes, since, limit)
+        if self._start is None:
+            # Start empty at the newest sequence; older cursors go to the database
+            self._start = self._end = change_notifier.latest_seq
+        if change_notifier.latest_seq > self._end:
+            await self._catch_up()
+        if since < self._start:
+            metrics.increment("changes.tail.misses")
+            return await run_in_threadpool(_fetch_changes, since, limit)
+
+        metrics.increment("changes.tail.hits")
+        index = bisect.bisect_right(self._seqs, since)
+        events = self._events[index:index + limit]
+        return {
+            "events": events,
+            "last_seq": events[-1]["seq"] if events else since,
+            "reset": False
+        }
+
+    async def _catch_up(self) -> None:
+        """Join the fetch of the newly published events, starting it if none is running."""
+        loop = asyncio.get_running_loop()
+        if self._refresh is None or self._refresh.get_loop() is not loop:
+            self._refresh = loop.create_task(self._fetch_new())
+        # Shield so a disconnecting subscriber never cancels the shared fetch
+        await asyncio.shield(self._refresh)
+
+    async def _fetch_new(self) -> None:
+        try:
+            while change_notifier.latest_seq > self._end:
+                feed = await run_in_threadpool(_fetch_changes, self._end, self.size)
+                metrics.increment("changes.tail.fetches")
+                if not feed["events"]:
+                    break
+                self._append(feed["events"])
+        finally:
+            self._refresh = None
+
+    def _append(self, events: List[Dict[str, Any]]) -> None:
+        self._events.extend(events)
+        self._seqs.extend(change["seq"] for change in events)
+        self._end = self._seqs[-1]
+        excess = len(self._events) - self.size
+        if excess > 0:
+            self._start = self._seqs[excess - 1]
+            del self._events[:excess]
+            del self._seqs[:excess]
+
+
+# Global tail of the change feed read by the changes router
+change_tail = ChangeTail(settings.change_feed_tail_size)
+
+metrics.register_gauge("changes.tail.events", lambda: len(change_tail))
+
+
+async def run_compaction(interval_seconds: Optional[int] = None) -> None:
+    """Periodically compact the change log until cancelled."""
+    interval = interval_seconds or settings.change_feed_compact_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        db = SessionLocal()
+        try:
+            ChangeFeedService.compact(db)
+        except Exception as e:
+            logger.error(f"Change feed compaction failed: {e}")
+        finally:
+            db.close()
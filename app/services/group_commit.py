@@ -0,0 +1,176 @@
+"""
+Group commit for task writes.
+
+Every standalone commit on SQLite is an fsync, which caps write throughput
+at a few hundred transactions per second regardless of concurrency. The
+GroupCommitWriter collects write operations submitted concurrently within
+GROUP_COMMIT_WINDOW_MS (or until GROUP_COMMIT_MAX_BATCH operations are
+queued) and applies them in one transaction on the primary. Each operation
+runs inside its own SAVEPOINT, so a failing operation is rolled back alone
+and its caller gets its own error while the rest of the batch commits.
+
+Services cooperate through `in_group_commit`: inside a batch they flush
+instead of committing and roll back only their savepoint (see
+task_service._commit/_rollback). With task shards configured, writes
+run on their own: a shard commit cannot join the batch transaction, and
+committing it before the batch would leave shard rows behind when the
+batch fails.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal, session_router
+from app.sharding import task_shards
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Session.info key holding the savepoint of the operation being applied
+GROUP_SAVEPOINT = "group_commit_savepoint"
+
+
+def in_group_commit(db: Session) -> bool:
+    """Whether `db` is applying an operation of a group commit batch."""
+    return GROUP_SAVEPOINT in db.info
+
+
+@dataclass
+class _Write:
+    op: Callable[..., Any]
+    args: Tuple[Any, ...]
+    client_key: Optional[str]
+    future: asyncio.Future = field(repr=False)
+
+
+class GroupCommitWriter:
+    """Batches concurrently submitted write operations into shared transactions."""
+    
+    def __init__(self, window_seconds: float, max_batch: int):
+        self.window = window_seconds
+        self.max_batch = max(max_batch, 1)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def start(self) -> None:
+        """Start the writer loop on the running event loop."""
+        if settings.group_commit_enabled and not self.running:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Apply the queued writes and the batch in flight, then stop the writer loop."""
+        if not self.running:
+            return
+        # Every write is marked done once its caller has its result
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+    
+    async def submit(self, db: Session, op: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run `op(session, *args)` as part of the next batch and return its result.
+        Without a running writer (group commit disabled, scripts) or with
+        task shards the operation runs directly on the caller's session.
+        """
+        if not self.running or task_shards.enabled:
+            return await run_in_threadpool(op, db, *args)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Write(op, args, db.info.get("client_key"), future))
+        return await future
+    
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            try:
+                results = await run_in_threadpool(self._apply, batch)
+            except Exception as e:
+                results = [(None, e)] * len(batch)
+            
+            for write, (result, error) in zip(batch, results):
+                if not write.future.done():
+                    if error is not None:
+                        write.future.set_exception(error)
+                    else:
+                        write.future.set_result(result)
+                self._queue.task_done()
+    
+    def _apply(self, batch: List[_Write]) -> List[Tuple[Any, Optional[Exception]]]:
+        """Apply a batch in one transaction; runs in the threadpool."""
+        # Results are read after the session closes, so keep their state loaded
+        db = SessionLocal(expire_on_commit=False)
+        results: List[Tuple[Any, Optional[Exception]]] = []
+        try:
+            if db.get_bind().dialect.name == "sqlite":
+                # pysqlite defers BEGIN until the first write; without an explicit
+                # one, releasing the first savepoint would commit on its own.
+                db.connection().exec_driver_sql("BEGIN IMMEDIATE")
+            
+            for write in batch:
+                savepoint = db.begin_nested()
+                db.info[GROUP_SAVEPOINT] = savepoint
+                try:
+                    result = write.op(db, *write.args)
+                    if savepoint.is_active:
+                        savepoint.commit()
+                    results.append((result, None))
+                except Exception as e:
+                    if savepoint.is_active:
+                        savepoint.rollback()
+                    results.append((None, e))
+                finally:
+                    del db.info[GROUP_SAVEPOINT]
+            
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+            return [(None, error or e) for _, error in results] + [(None, e)] * (len(batch) - len(results))
+        finally:
+            db.close()
+        
+        metrics.increment("group_commit.batches")
+        metrics.increment("group_commit.writes", len(batch))
+        for write, (_, error) in zip(batch, results):
+            if error is None and write.client_key:
+                # The batch session has no client; keep read-your-writes per caller
+                session_router.record_write(write.client_key)
+        return results
+
+
+# Global writer for task creates and edits
+task_writer = GroupCommitWriter(
+    settings.group_commit_window_ms / 1000,
+    settings.group_commit_max_batch
+)
+
+metrics.register_gauge(
+    "group_commit.writes_per_batch",
+    lambda: round(metrics.get("group_commit.writes") / max(metrics.get("group_commit.batches"), 1), 2)
+)
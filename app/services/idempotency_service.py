@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+from app.services.statements import IDEMPOTENCY_KEY
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# How long a claimed key stays locked if its first request never completes
+# (e.g. the process died); after that a retry may run the request again.
+CLAIM_LEASE_SECONDS = 60
+
+
+class IdempotencyService:
+    """Service class for idempotency keys of create actions."""
+    
+    @staticmethod
+    def fingerprint(payload: BaseModel) -> str:
+        """Hash of the validated request payload, without the key itself."""
+        body = payload.model_dump_json(exclude={"idempotency_key"})
+        return hashlib.sha256(body.encode()).hexdigest()
+    
+    @staticmethod
+    def claim(db: Session, scope: str, key: str, fingerprint: str) -> Optional[IdempotencyKey]:
+        """
+        Claim a key for a new request.
+        Returns None when the caller should run the request, or the stored
+        record whose response should be replayed.
+        """
+        try:
+            now = datetime.utcnow()
+            record = db.execute(IDEMPOTENCY_KEY, {"scope": scope, "key": key}).scalars().first()
+            if record and record.expires_at > now:
+                if record.fingerprint != fingerprint:
+                    raise ValueError("Idempotency key was already used for a different request")
+                if record.status_code is None:
+                    raise ValueError("A request with this idempotency key is still in progress")
+                return record
+            
+            if record:
+                db.delete(record)
+                db.flush()
+            
+            db.add(IdempotencyKey(
+                scope=scope,
+                key=key,
+                fingerprint=fingerprint,
+                expires_at=now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+            ))
+            db.commit()
+            return None
+            
+        except IntegrityError:
+            # A concurrent request claimed the key first
+            db.rollback()
+            raise ValueError("A request with this idempotency key is still in progress")
+        except ValueError:
+            raise
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error claiming idempotency key {scope}/{key}: {e}")
+            raise
+    
+    @staticmethod
+    def complete(db: Session, scope: str, key: str, status_code: int, response_body: str,
+                 media_type: Optional[str] = None) -> None:
+        """Store the response of a claimed key for the retention window."""
+        try:
+            record = db.execute(IDEMPOTENCY_KEY, {"scope": scope, "key": key}).scalars().first()
+            if not record:
+                return
+            record.status_code = status_code
+            record.response_body = response_body
+            record.media_type = media_type
+            record.expires_at = datetime.utcnow() + timedelta(seconds=settings.idempotency_ttl_seconds)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error completing idempotency key {scope}/{key}: {e}")
+            raise
+    
+    @staticmethod
+    def release(db: Session, scope: str, key: str) -> None:
+        """Drop a claim whose request failed so a retry can run it again."""
+        try:
+            record = db.execute(IDEMPOTENCY_KEY, {"scope": scope, "key": key}).scalars().first()
+            if record:
+                db.delete(record)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error releasing idempotency key {scope}/{key}: {e}")
+            raise
+    
+    @staticmethod
+    def purge_expired(db: Session) -> int:
+        """Delete expired keys."""
+        try:
+            deleted = db.query(IdempotencyKey).filter(
+                IdempotencyKey.expires_at <= datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.commit()
+            if deleted:
+                logger.info(f"Purged {deleted} expired idempotency keys")
+            return deleted
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error purging idempotency keys: {e}")
+            raise
+
+
+async def run_idempotency_purge(interval_seconds: Optional[int] = None) -> None:
+    """Periodically purge expired idempotency keys until cancelled."""
+    interval = interval_seconds or settings.idempotency_purge_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        db = SessionLocal()
+        try:
+            IdempotencyService.purge_expired(db)
+        except Exception as e:
+            logger.error(f"Idempotency key purge failed: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,339 @@
+"""
+Durable background job queue.
+
+Handlers enqueue deferred work with `JobService.enqueue`, usually in the
+same transaction as the write that needs it, and return without waiting.
+Jobs are rows in the `jobs` table, so queued work survives restarts. The
+JobQueue started from the lifespan hook runs JOB_WORKERS asyncio workers
+that claim jobs in priority order and run their handlers in the
+threadpool, each with its own session.
+
+- Claiming is a conditional UPDATE, so several processes can share one queue.
+- A running job holds a lease that its worker renews; jobs whose worker
+  died are queued again once the lease expires.
+- A failing job is retried with exponential backoff and jitter until it
+  has used its attempts, then marked failed with its last error.
+
+Handlers register with `@job_handler("kind")` and take (db, payload).
+"""
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event, update, delete
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models.job import Job
+from app.services.statements import JOB_BY_ID, JOB_CANDIDATES, JOB_PAGE
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Session.info flag set by enqueue; workers are woken once the session commits
+_ENQUEUED = "jobs_enqueued"
+
+# Candidates fetched per claim attempt; several workers may race for the first
+_CLAIM_CANDIDATES = 4
+
+_handlers: Dict[str, Callable[[Session, Dict[str, Any]], Any]] = {}
+
+
+def job_handler(kind: str):
+    """Register the function run for jobs of `kind`."""
+    def register(func: Callable[[Session, Dict[str, Any]], Any]):
+        _handlers[kind] = func
+        return func
+    return register
+
+
+class JobService:
+    """Service class for the rows of the background job queue."""
+    
+    @staticmethod
+    def enqueue(db: Session, kind: str, payload: Optional[Dict[str, Any]] = None, priority: int = 0,
+                delay_seconds: float = 0, max_attempts: Optional[int] = None, commit: bool = True) -> Job:
+        """
+        Queue a job. With commit=False it is only added to the session, so it
+        is queued atomically with the caller's own write.
+        """
+        try:
+            if kind not in _handlers:
+                raise ValueError(f"Unknown job kind: {kind}")
+            
+            job = Job(
+                kind=kind,
+                payload=json.dumps(payload or {}),
+                status="queued",
+                priority=priority,
+                attempts=0,
+                max_attempts=max_attempts or settings.job_max_attempts,
+                run_at=datetime.utcnow() + timedelta(seconds=delay_seconds)
+            )
+            db.add(job)
+            db.info[_ENQUEUED] = True
+            if commit:
+                db.commit()
+                db.refresh(job)
+            
+            metrics.increment("jobs.enqueued")
+            return job
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error enqueueing {kind} job: {e}")
+            raise
+    
+    @staticmethod
+    def get_job(db: Session, job_id: int) -> Optional[Job]:
+        """Get a job by ID."""
+        return db.execute(JOB_BY_ID, {"job_id": job_id}).scalars().first()
+    
+    @staticmethod
+    def get_jobs(db: Session, status: str, skip: int = 0, limit: int = 100) -> List[Job]:
+        """Jobs in a status, newest first."""
+        return db.execute(JOB_PAGE, {"status": status, "skip": skip, "limit": limit}).scalars().all()
+    
+    @staticmethod
+    def claim(db: Session, lease_seconds: float) -> Optional[Tuple[int, str, Dict[str, Any], int]]:
+        """Claim the next runnable job; returns (id, kind, payload, attempt) or None."""
+        try:
+            now = datetime.utcnow()
+            for job_id in db.execute(JOB_CANDIDATES, {"now": now, "limit": _CLAIM_CANDIDATES}).scalars().all():
+                claimed = db.execute(
+                    update(Job.__table__)
+                    .where(Job.__table__.c.id == job_id, Job.__table__.c.status == "queued")
+                    .values(
+                        status="running",
+                        attempts=Job.__table__.c.attempts + 1,
+                        locked_until=now + timedelta(seconds=lease_seconds)
+                    )
+                ).rowcount
+                if claimed:
+                    db.commit()
+                    job = JobService.get_job(db, job_id)
+                    return job.id, job.kind, json.loads(job.payload), job.attempts
+            db.commit()
+            return None
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error claiming a job: {e}")
+            raise
+    
+    @staticmethod
+    def renew(db: Session, job_id: int, lease_seconds: float) -> None:
+        """Extend the lease of a running job."""
+        db.execute(
+            update(Job.__table__)
+            .where(Job.__table__.c.id == job_id, Job.__table__.c.status == "running")
+            .values(locked_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        )
+        db.commit()
+    
+    @staticmethod
+    def complete(db: Session, job_id: int) -> None:
+        """Mark a job succeeded."""
+        job = JobService.get_job(db, job_id)
+        job.status = "succeeded"
+        job.locked_until = None
+        job.last_error = None
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        metrics.increment("jobs.succeeded")
+    
+    @staticmethod
+    def fail(db: Session, job_id: int, error: str) -> bool:
+        """Record a failed attempt; returns True if the job will be retried."""
+        job = JobService.get_job(db, job_id)
+        job.last_error = error
+        job.locked_until = None
+        retry = job.attempts < job.max_attempts
+        if retry:
+            backoff = min(
+                settings.job_retry_base_seconds * 2 ** (job.attempts - 1),
+                settings.job_retry_max_seconds
+            )
+            job.status = "queued"
+            job.run_at = datetime.utcnow() + timedelta(seconds=backoff * random.uniform(0.5, 1.0))
+            metrics.increment("jobs.retried")
+        else:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+            metrics.increment("jobs.failed")
+        db.commit()
+        return retry
+    
+    @staticmethod
+    def recover_expired(db: Session) -> int:
+        """Queue again the running jobs whose worker stopped renewing the lease."""
+        try:
+            jobs = Job.__table__
+            now = datetime.utcnow()
+            expired = (jobs.c.status == "running", jobs.c.locked_until < now)
+            # A job that keeps taking its worker down must not be retried forever
+            db.execute(
+                update(jobs)
+                .where(*expired, jobs.c.attempts >= jobs.c.max_attempts)
+                .values(status="failed", locked_until=None, finished_at=now, last_error="Lease expired")
+            )
+            recovered = db.execute(
+                update(jobs).where(*expired).values(status="queued", locked_until=None)
+            ).rowcount
+            db.commit()
+            if recovered:
+                logger.warning(f"Re-queued {recovered} jobs with expired leases")
+            return recovered
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error recovering expired jobs: {e}")
+            raise
+    
+    @staticmethod
+    def purge_finished(db: Session, older_than_seconds: Optional[int] = None) -> int:
+        """Delete succeeded and failed jobs finished before the retention window."""
+        try:
+            retention = older_than_seconds or settings.job_retention_seconds
+            cutoff = datetime.utcnow() - timedelta(seconds=retention)
+            deleted = db.execute(
+                delete(Job.__table__).where(
+                    Job.__table__.c.status.in_(["succeeded", "failed"]),
+                    Job.__table__.c.finished_at < cutoff
+                )
+            ).rowcount
+            db.commit()
+            return deleted
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error purging finished jobs: {e}")
+            raise
+
+
+def _with_session(func: Callable, *args: Any) -> Any:
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+class JobQueue:
+    """Pool of asyncio workers running queued jobs."""
+    
+    def __init__(self, workers: int, poll_seconds: float, lease_seconds: float):
+        self.workers = max(workers, 1)
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.running_jobs = 0
+        self._tasks: List[asyncio.Task] = []
+        self._maintenance: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopping = False
+    
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+    
+    def start(self) -> None:
+        """Start the workers and lease maintenance on the running event loop."""
+        if not settings.jobs_enabled or self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._maintenance = asyncio.create_task(self._maintain())
+    
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """Let running jobs finish (up to `timeout`), then stop the workers."""
+        if not self.running:
+            return
+        self._stopping = True
+        self._wake.set()
+        self._maintenance.cancel()
+        timeout = settings.job_shutdown_timeout_seconds if timeout is None else timeout
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            # Interrupted jobs keep their lease and are re-queued once it expires
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+    
+    def notify(self) -> None:
+        """Wake idle workers; safe to call from any thread."""
+        if self._loop is not None and self.running and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+    
+    async def _worker(self) -> None:
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                claimed = await run_in_threadpool(_with_session, JobService.claim, self.lease_seconds)
+            except Exception:
+                claimed = None
+            
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            await self._run(*claimed)
+    
+    async def _run(self, job_id: int, kind: str, payload: Dict[str, Any], attempt: int) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        self.running_jobs += 1
+        try:
+            handler = _handlers.get(kind)
+            if handler is None:
+                raise ValueError(f"No handler registered for job kind: {kind}")
+            await run_in_threadpool(_with_session, handler, payload)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) attempt {attempt} failed: {e}")
+            try:
+                await run_in_threadpool(_with_session, JobService.fail, job_id, str(e))
+            except Exception as record_error:
+                logger.error(f"Error recording failure of job {job_id}: {record_error}")
+        else:
+            try:
+                await run_in_threadpool(_with_session, JobService.complete, job_id)
+            except Exception as e:
+                logger.error(f"Error completing job {job_id}: {e}")
+        finally:
+            self.running_jobs -= 1
+            heartbeat.cancel()
+    
+    async def _heartbeat(self, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await run_in_threadpool(_with_session, JobService.renew, job_id, self.lease_seconds)
+            except Exception as e:
+                logger.error(f"Error renewing lease of job {job_id}: {e}")
+    
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(_with_session, JobService.recover_expired)
+                await run_in_threadpool(_with_session, JobService.purge_finished)
+            except Exception as e:
+                logger.error(f"Job queue maintenance failed: {e}")
+            await asyncio.sleep(self.lease_seconds)
+
+
+# Global job queue started and stopped by the application lifespan
+job_queue = JobQueue(settings.job_workers, settings.job_poll_seconds, settings.job_lease_seconds)
+
+metrics.register_gauge("jobs.running", lambda: job_queue.running_jobs)
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_workers(session: Session) -> None:
+    """Wake the workers once the jobs enqueued in a session are committed."""
+    if session.info.pop(_ENQUEUED, False):
+        job_queue.notify()
@@ -0,0 +1,384 @@
+"""
+Registry of pre-built statements for the fixed-shape service queries.
+
+Each statement is constructed once at import time with bind parameters
+instead of rebuilding a Query per call. Executing the same statement object
+with new parameters skips ORM query construction in Python, and SQLAlchemy's
+compiled cache then serves the SQL string without recompiling it.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import FrozenSet, Optional
+from sqlalchemy import (
+    Integer, and_, bindparam, case, delete, event, extract, func, insert, literal, select, true, union_all, update, or_
+)
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from app.models.archived_task import ArchivedTask
+from app.models.change_event import ChangeEvent
+from app.models.idempotency_key import IdempotencyKey
+from app.models.job import Job
+from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.task_closure import TaskClosure
+from app.models.task_history import TaskHistory, HISTORY_CREATE, HISTORY_SNAPSHOT
+from app.models.task_tag import TaskTag
+from app.models.user import User
+from app.models.user_deletion import UserDeletion
+from app.sharding import SHARD_ORDER
+from app.utils.metrics import metrics
+
+
+def _page(stmt):
+    return stmt.offset(bindparam("skip")).limit(bindparam("limit"))
+
+
+# Users; a user with an unfinished deletion is hidden from reads at once.
+# Completed deletions are ignored: SQLite may reuse the ID for a new user.
+_USER_VISIBLE = ~select(UserDeletion.user_id).where(
+    UserDeletion.user_id == User.id, UserDeletion.status != "completed"
+).exists()
+USER_BY_ID = select(User).where(User.id == bindparam("user_id"), _USER_VISIBLE)
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"), _USER_VISIBLE)
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"), _USER_VISIBLE)
+# Uniqueness check: rows being deleted still hold their username and email
+USER_BY_USERNAME_OR_EMAIL = select(User).where(
+    or_(User.username == bindparam("username"), User.email == bindparam("email"))
+)
+USER_PAGE = _page(select(User).where(_USER_VISIBLE))
+
+# Edits depend on the fields sent, so they are built once per field set.
+# No pre-check reads: uniqueness is left to the constraints.
+
+
+def _edit(table, key, fields: FrozenSet[str], versioned: bool, *criteria):
+    """
+    Single-round-trip edit: UPDATE ... WHERE id [AND version] RETURNING the row.
+    New values bind as "new_<field>"; the version is bumped on every edit.
+    """
+    stmt = update(table).where(table.c.id == bindparam(key), *criteria)
+    if versioned:
+        stmt = stmt.where(table.c.version == bindparam("version"))
+    values = {field: bindparam(f"new_{field}") for field in fields}
+    values["version"] = table.c.version + 1
+    return stmt, values
+
+
+@lru_cache(maxsize=64)
+def user_edit(fields: FrozenSet[str], versioned: bool):
+    """Edit of the given user columns; rows being deleted are not matched."""
+    stmt, values = _edit(User.__table__, "user_id", fields, versioned, _USER_VISIBLE)
+    return stmt.values(values).returning(*User.__table__.c)
+
+
+# User deletion: set-based chunks by owner, so no task rows are loaded into
+# the ORM. Core tables, like the archival statements below.
+USER_DELETION = select(UserDeletion).where(UserDeletion.user_id == bindparam("user_id"))
+# Owners with an unfinished deletion: their tasks are hidden from task reads
+# until the purge removes them. Shards have no user_deletions table, so the
+# IDs are read from the primary and bound into the task queries.
+HIDDEN_OWNERS = select(UserDeletion.user_id).where(UserDeletion.status != "completed")
+
+
+def _owner_chunk(entity):
+    return select(entity.id).where(
+        entity.owner_id == bindparam("owner_id")
+    ).order_by(entity.id).limit(bindparam("limit")).scalar_subquery()
+
+
+def _owner_chunk_delete(entity):
+    return delete(entity.__table__).where(
+        entity.__table__.c.id.in_(_owner_chunk(entity))
+    ).returning(entity.__table__.c.id)
+
+
+def _owner_chunk_tags_delete(entity):
+    # Runs before the chunk delete, so it selects the same (first by ID) tasks
+    task_tags = TaskTag.__table__
+    return delete(task_tags).where(
+        task_tags.c.task_id.in_(_owner_chunk(entity))
+    ).returning(task_tags.c.task_id, task_tags.c.tag)
+
+
+def _owner_chunk_closure_delete(entity):
+    # Every closure row has a descendant of the same owner
+    closure = TaskClosure.__table__
+    return delete(closure).where(closure.c.descendant_id.in_(_owner_chunk(entity)))
+
+
+OWNER_TASKS_DELETE_CHUNK = _owner_chunk_delete(Task)
+OWNER_ARCHIVED_TASKS_DELETE_CHUNK = _owner_chunk_delete(ArchivedTask)
+OWNER_TASK_TAGS_DELETE_CHUNK = _owner_chunk_tags_delete(Task)
+OWNER_ARCHIVED_TASK_TAGS_DELETE_CHUNK = _owner_chunk_tags_delete(ArchivedTask)
+OWNER_TASK_CLOSURE_DELETE_CHUNK = _owner_chunk_closure_delete(Task)
+OWNER_ARCHIVED_TASK_CLOSURE_DELETE_CHUNK = _owner_chunk_closure_delete(ArchivedTask)
+USER_DELETE = delete(User.__table__).where(User.__table__.c.id == bindparam("user_id"))
+
+# Tasks
+TASK_BY_ID = select(Task).where(Task.id == bindparam("task_id"))
+
+
+@lru_cache(maxsize=64)
+def task_edit(fields: FrozenSet[str], versioned: bool, completed: Optional[bool] = None):
+    """
+    Edit of the given task columns. `completed` is set when the status
+    changes: True stamps completed_at (kept for tasks already completed),
+    False clears it.
+    """
+    tasks = Task.__table__
+    stmt, values = _edit(tasks, "task_id", fields, versioned)
+    if completed:
+        # SET expressions see the old row
+        values["completed_at"] = case(
+            (tasks.c.status == TaskStatus.COMPLETED, tasks.c.completed_at),
+            else_=bindparam("now")
+        )
+    elif completed is not None:
+        values["completed_at"] = None
+    return stmt.values(values).returning(*tasks.c)
+
+
+def _not_hidden(entity):
+    return entity.owner_id.not_in(bindparam("hidden_owners", expanding=True))
+
+
+def _listing_criteria(entity):
+    """Criteria of the paginated task listings, keyed by listing name; all skip hidden owners."""
+    listings = {
+        "all": [],
+        "owner": [entity.owner_id == bindparam("owner_id")],
+        "status": [entity.status == bindparam("status")],
+        "priority": [entity.priority == bindparam("priority")],
+        "search": [
+            entity.title.contains(bindparam("search_term")) |
+            entity.description.contains(bindparam("search_term"))
+        ],
+        "overdue": [entity.due_date < bindparam("now"), entity.status != TaskStatus.COMPLETED],
+    }
+    return {name: [_not_hidden(entity), *criteria] for name, criteria in listings.items()}
+
+
+TASK_LISTINGS = _listing_criteria(Task)
+
+# Offset/limit pages on a single database
+TASK_PAGES = {
+    name: _page(select(Task).where(*criteria)) for name, criteria in TASK_LISTINGS.items()
+}
+
+# Per-shard prefixes in merge order for scatter-gather listings
+TASK_SHARD_PAGES = {
+    name: select(Task).where(*criteria).order_by(*SHARD_ORDER).limit(bindparam("limit"))
+    for name, criteria in TASK_LISTINGS.items()
+}
+
+# Task tags, and tasks by ID for tag index queries
+TASK_TAGS = select(TaskTag.tag).where(TaskTag.task_id == bindparam("task_id")).order_by(TaskTag.tag)
+TASKS_TAGS = select(TaskTag.task_id, TaskTag.tag).where(TaskTag.task_id.in_(bindparam("ids", expanding=True)))
+TASK_TAGS_INSERT = insert(TaskTag.__table__)
+TASK_TAGS_DELETE = delete(TaskTag.__table__).where(
+    TaskTag.__table__.c.task_id == bindparam("task_id")
+).returning(TaskTag.__table__.c.tag)
+TASKS_BY_IDS = select(Task).where(
+    Task.id.in_(bindparam("ids", expanding=True)), _not_hidden(Task)
+).order_by(Task.id)
+TAG_INDEX_TASKS = select(Task.id, Task.status, Task.priority)
+TAG_INDEX_TAGS = select(TaskTag.task_id, TaskTag.tag).join(Task, Task.id == TaskTag.task_id)
+
+# Subtask hierarchy: every read is one indexed lookup on the closure table,
+# and a move rewrites the subtree's rows with two set-based statements.
+_closure = TaskClosure.__table__
+TASK_OWNER = select(Task.owner_id).where(Task.id == bindparam("task_id"))
+TASK_DEPTH = select(func.coalesce(func.max(_closure.c.depth), 0)).where(
+    _closure.c.descendant_id == bindparam("task_id")
+)
+TASK_HEIGHT = select(func.coalesce(func.max(_closure.c.depth), 0)).where(
+    _closure.c.ancestor_id == bindparam("task_id")
+)
+TASK_IS_DESCENDANT = select(_closure.c.depth).where(
+    _closure.c.ancestor_id == bindparam("task_id"), _closure.c.descendant_id == bindparam("parent_id")
+)
+_SUBTREE_IDS = union_all(
+    select(_closure.c.descendant_id).where(_closure.c.ancestor_id == bindparam("task_id")),
+    select(bindparam("task_id", type_=Integer))
+)
+# Cut a subtree from its ancestors (the rows inside the subtree stay)
+TASK_CLOSURE_DETACH = delete(_closure).where(
+    _closure.c.ancestor_id.in_(select(_closure.c.ancestor_id).where(_closure.c.descendant_id == bindparam("task_id"))),
+    _closure.c.descendant_id.in_(_SUBTREE_IDS)
+)
+# Link a (detached or new) subtree under parent_id: every ancestor of the
+# new parent, and the parent itself, times every member of the subtree
+_new_ancestors = union_all(
+    select(_closure.c.ancestor_id, (_closure.c.depth + 1).label("depth")).where(
+        _closure.c.descendant_id == bindparam("parent_id")
+    ),
+    select(bindparam("parent_id", type_=Integer), literal(1))
+).subquery()
+_members = union_all(
+    select(_closure.c.descendant_id, _closure.c.depth).where(_closure.c.ancestor_id == bindparam("task_id")),
+    select(bindparam("task_id", type_=Integer), literal(0))
+).subquery()
+TASK_CLOSURE_ATTACH = insert(_closure).from_select(
+    ["ancestor_id", "descendant_id", "depth"],
+    select(_new_ancestors.c[0], _members.c[0], _new_ancestors.c[1] + _members.c[1]).select_from(
+        _new_ancestors.join(_members, true())
+    )
+)
+# Deleting a task moves its subtasks up one level, under its parent
+TASK_CLOSURE_SPLICE = update(_closure).where(
+    _closure.c.ancestor_id.in_(select(_closure.c.ancestor_id).where(_closure.c.descendant_id == bindparam("task_id"))),
+    _closure.c.descendant_id.in_(select(_closure.c.descendant_id).where(_closure.c.ancestor_id == bindparam("task_id")))
+).values(depth=_closure.c.depth - 1)
+TASK_CLOSURE_DELETE = delete(_closure).where(
+    or_(_closure.c.ancestor_id == bindparam("task_id"), _closure.c.descendant_id == bindparam("task_id"))
+)
+TASK_CHILDREN_REPARENT = update(Task.__table__).where(
+    Task.__table__.c.parent_id == bindparam("task_id")
+).values(
+    parent_id=bindparam("new_parent_id"), version=Task.__table__.c.version + 1
+).returning(Task.__table__.c.id)
+
+
+def _hierarchy(entity):
+    """Hierarchy views of one task table, keyed by the view's "hierarchy" name."""
+    return {
+        "subtree": _page(select(entity, _closure.c.depth).join(
+            _closure, _closure.c.descendant_id == entity.id
+        ).where(_closure.c.ancestor_id == bindparam("task_id")).order_by(_closure.c.depth, entity.id)),
+        "ancestors": select(entity, _closure.c.depth).join(
+            _closure, _closure.c.ancestor_id == entity.id
+        ).where(_closure.c.descendant_id == bindparam("task_id")).order_by(_closure.c.depth.desc()),
+        "rollup": select(entity.status, func.count()).join(
+            _closure, _closure.c.descendant_id == entity.id
+        ).where(_closure.c.ancestor_id == bindparam("task_id")).group_by(entity.status),
+    }
+
+
+TASK_HIERARCHY = _hierarchy(Task)
+
+# Archived tasks: prefixes in the same merge order, unioned into listings on request
+ARCHIVED_TASK_BY_ID = select(ArchivedTask).where(ArchivedTask.id == bindparam("task_id"))
+ARCHIVED_TASK_HIERARCHY = _hierarchy(ArchivedTask)
+ARCHIVED_TASK_PAGES = {
+    name: select(ArchivedTask).where(*criteria).order_by(
+        ArchivedTask.created_at, ArchivedTask.id
+    ).limit(bindparam("limit"))
+    for name, criteria in _listing_criteria(ArchivedTask).items()
+}
+
+# Analytics snapshot: the columns of every hot and archived task, with
+# status and priority as codes and timestamps as epoch seconds
+def _analytics_columns(entity):
+    return select(
+        entity.owner_id,
+        # Comparisons, unlike case(value=...), bind through the Enum type
+        case(*[(entity.status == status, code) for code, status in enumerate(TaskStatus)]),
+        case(*[(entity.priority == priority, code) for code, priority in enumerate(TaskPriority)]),
+        extract("epoch", entity.created_at),
+        extract("epoch", entity.due_date),
+        extract("epoch", entity.completed_at)
+    )
+
+
+ANALYTICS_SNAPSHOT = [_analytics_columns(Task), _analytics_columns(ArchivedTask)]
+
+# Archival batches: finished tasks idle since the cutoff, moved by ID.
+# Core tables, so the ID list binds as a parameter rather than ORM bulk rows.
+_ARCHIVED_COLUMNS = [
+    "id", "title", "description", "status", "priority", "due_date", "is_completed",
+    "completed_at", "created_at", "updated_at", "owner_id", "parent_id",
+]
+ARCHIVE_CANDIDATES = select(Task.id).where(
+    Task.status.in_([TaskStatus.COMPLETED, TaskStatus.CANCELLED]),
+    func.coalesce(Task.completed_at, Task.updated_at, Task.created_at) < bindparam("cutoff")
+).limit(bindparam("limit"))
+ARCHIVE_COPY = insert(ArchivedTask.__table__).from_select(
+    _ARCHIVED_COLUMNS,
+    select(*[Task.__table__.c[name] for name in _ARCHIVED_COLUMNS]).where(
+        Task.id.in_(bindparam("ids", expanding=True))
+    )
+)
+ARCHIVE_DELETE = delete(Task.__table__).where(Task.id.in_(bindparam("ids", expanding=True)))
+
+# Change feed
+CHANGES_SINCE = select(ChangeEvent).where(
+    ChangeEvent.id > bindparam("since")
+).order_by(ChangeEvent.id).limit(bindparam("limit"))
+CHANGES_OLDEST_SEQ = select(func.min(ChangeEvent.id))
+CHANGES_NEWEST_SEQ = select(func.max(ChangeEvent.id))
+
+# Task history: batches inserted by the history writer; a state is rebuilt
+# from the latest create or snapshot entry plus the entries after it
+TASK_HISTORY_INSERT = insert(TaskHistory.__table__)
+TASK_HISTORY_PAGE = _page(select(TaskHistory).where(
+    TaskHistory.task_id == bindparam("task_id"), TaskHistory.kind != HISTORY_SNAPSHOT
+).order_by(TaskHistory.at, TaskHistory.id))
+TASK_HISTORY_BASE = select(TaskHistory).where(
+    TaskHistory.task_id == bindparam("task_id"),
+    TaskHistory.at <= bindparam("as_of"),
+    TaskHistory.kind.in_([HISTORY_CREATE, HISTORY_SNAPSHOT])
+).order_by(TaskHistory.at.desc(), TaskHistory.id.desc()).limit(1)
+TASK_HISTORY_AFTER = select(TaskHistory).where(
+    TaskHistory.task_id == bindparam("task_id"),
+    TaskHistory.at <= bindparam("as_of"),
+    or_(
+        TaskHistory.at > bindparam("base_at"),
+        and_(TaskHistory.at == bindparam("base_at"), TaskHistory.id > bindparam("base_id"))
+    )
+).order_by(TaskHistory.at, TaskHistory.id)
+TASK_HISTORY_DELETE = delete(TaskHistory.__table__).where(
+    TaskHistory.__table__.c.task_id.in_(bindparam("ids", expanding=True))
+)
+
+# Idempotency keys
+IDEMPOTENCY_KEY = select(IdempotencyKey).where(
+    IdempotencyKey.scope == bindparam("scope"),
+    IdempotencyKey.key == bindparam("key")
+)
+
+# Background jobs: candidates in run order, claimed by a conditional UPDATE
+JOB_BY_ID = select(Job).where(Job.id == bindparam("job_id"))
+JOB_PAGE = _page(select(Job).where(Job.status == bindparam("status")).order_by(Job.id.desc()))
+JOB_CANDIDATES = select(Job.id).where(
+    Job.status == "queued", Job.run_at <= bindparam("now")
+).order_by(Job.priority.desc(), Job.run_at, Job.id).limit(bindparam("limit"))
+
+
+# Parameters matching no rows, used to compile every statement at warm-up
+_WARM_PARAMS = {
+    "user_id": 0, "username": "", "email": "", "task_id": 0, "owner_id": 0,
+    "status": TaskStatus.PENDING, "priority": TaskPriority.MEDIUM, "search_term": "",
+    "now": datetime(1970, 1, 1), "since": 0, "scope": "", "key": "", "job_id": 0, "skip": 0, "limit": 1,
+    "hidden_owners": [],
+}
+
+
+def warm_statements(db) -> int:
+    """Execute each registered statement once so its SQL is in the compiled cache."""
+    statements = [
+        USER_BY_ID, USER_BY_USERNAME, USER_BY_EMAIL, USER_BY_USERNAME_OR_EMAIL, USER_PAGE,
+        USER_DELETION, HIDDEN_OWNERS, TASK_BY_ID, TASK_TAGS, *TASK_PAGES.values(), *TASK_SHARD_PAGES.values(),
+        ARCHIVED_TASK_BY_ID, *ARCHIVED_TASK_PAGES.values(),
+        CHANGES_SINCE, CHANGES_OLDEST_SEQ, CHANGES_NEWEST_SEQ, IDEMPOTENCY_KEY,
+        JOB_BY_ID, JOB_CANDIDATES,
+    ]
+    for stmt in statements:
+        names = stmt.compile().params
+        params = {name: value for name, value in _WARM_PARAMS.items() if name in names}
+        db.execute(stmt, params).all()
+    return len(statements)
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_compiled_cache(conn, cursor, statement, parameters, context, executemany):
+    """Track how often the compiled SQL came from the engine's statement cache."""
+    cache_hit = getattr(context, "cache_hit", None)
+    if cache_hit == CACHE_HIT:
+        metrics.increment("sql.compiled_cache.hits")
+    elif cache_hit == CACHE_MISS:
+        metrics.increment("sql.compiled_cache.misses")
+
+
+metrics.register_gauge(
+    "sql.compiled_cache.hit_rate",
+    lambda: metrics.ratio("sql.compiled_cache.hits", "sql.compiled_cache.misses")
+)
@@ -0,0 +1,213 @@
+"""
+In-memory inverted index of task tags.
+
+Tag queries (all of / any of / none of a set of tags, combined with status
+and priority) are answered from compressed bitmaps of task IDs instead of
+scanning task_tags: one bitmap per tag, status and priority, plus one of
+every hot task that NOT queries subtract from. Archived tasks are not
+indexed.
+
+The index is loaded from every shard at startup and maintained on writes:
+services record their changes on the session with `tag_index.record`, and
+they are applied once the session commits (dropped if the transaction, or
+the operation's group commit savepoint, rolls back). Writes that commit
+while the index loads are replayed on top of it. The index is per process.
+"""
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.services.group_commit import GROUP_SAVEPOINT
+from app.services.statements import TAG_INDEX_TAGS, TAG_INDEX_TASKS
+from app.sharding import task_shards
+from app.utils.bitmap import Bitmap
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Session.info key of the changes waiting for the session to commit
+_PENDING = "tag_index_pending"
+
+# Rows fetched per round trip while loading
+_LOAD_BATCH = 10000
+
+_EMPTY = Bitmap()
+
+
+class _Bitmaps:
+    """The bitmaps of one index generation."""
+    
+    def __init__(self):
+        self.tasks = Bitmap()
+        self.tags: Dict[str, Bitmap] = {}
+        self.statuses: Dict[str, Bitmap] = {}
+        self.priorities: Dict[str, Bitmap] = {}
+    
+    def apply(self, change: Tuple) -> None:
+        kind, task_id = change[0], change[1]
+        if kind == "task":
+            # ("task", id, status, priority): the task exists with these values
+            _, _, status, priority = change
+            self.tasks.add(task_id)
+            for values, value in ((self.statuses, status), (self.priorities, priority)):
+                for key, bitmap in values.items():
+                    if key != value:
+                        bitmap.discard(task_id)
+                values.setdefault(value, Bitmap()).add(task_id)
+        elif kind == "tags":
+            # ("tags", id, removed, added)
+            _, _, removed, added = change
+            self._untag(task_id, removed)
+            for tag in added:
+                self.tags.setdefault(tag, Bitmap()).add(task_id)
+        elif kind == "remove":
+            # ("remove", id, tags): deleted or archived
+            self.tasks.discard(task_id)
+            for values in (self.statuses, self.priorities):
+                for bitmap in values.values():
+                    bitmap.discard(task_id)
+            self._untag(task_id, change[2])
+    
+    def _untag(self, task_id: int, tags: Sequence[str]) -> None:
+        for tag in tags:
+            bitmap = self.tags.get(tag)
+            if bitmap is not None:
+                bitmap.discard(task_id)
+                if not bitmap:
+                    del self.tags[tag]
+    
+    def _union(self, tags: Sequence[str]) -> Bitmap:
+        result = Bitmap()
+        for tag in tags:
+            result = result | self.tags.get(tag, _EMPTY)
+        return result
+    
+    def match(self, all_tags: Sequence[str], any_tags: Sequence[str], no_tags: Sequence[str],
+              status: Optional[str], priority: Optional[str]) -> Bitmap:
+        # Most selective first, so later intersections work on small bitmaps
+        filters = [self.tags.get(tag, _EMPTY) for tag in all_tags]
+        if any_tags:
+            filters.append(self._union(any_tags))
+        if status is not None:
+            filters.append(self.statuses.get(status, _EMPTY))
+        if priority is not None:
+            filters.append(self.priorities.get(priority, _EMPTY))
+        filters.sort(key=lambda bitmap: len(bitmap.chunks))
+        
+        result = self.tasks
+        for bitmap in filters:
+            result = result & bitmap
+        if no_tags:
+            result = result - self._union(no_tags)
+        return result
+
+
+class TagIndex:
+    """Thread-safe tag index with startup loading and commit-time maintenance."""
+    
+    def __init__(self):
+        self.ready = False
+        self._bitmaps = _Bitmaps()
+        self._replay: Optional[List[Tuple]] = None
+        self._lock = threading.Lock()
+    
+    def record(self, db: Session, *change) -> None:
+        """Apply `change` to the index once `db` commits."""
+        db.info.setdefault(_PENDING, []).append((db.info.get(GROUP_SAVEPOINT), change))
+    
+    def apply(self, changes: List[Tuple]) -> None:
+        with self._lock:
+            for change in changes:
+                self._bitmaps.apply(change)
+            if self._replay is not None:
+                self._replay.extend(changes)
+    
+    def load(self) -> int:
+        """(Re)build the index from every shard; blocks, so run it in the threadpool."""
+        with self._lock:
+            self._replay = []
+        bitmaps = _Bitmaps()
+        db = SessionLocal()
+        try:
+            for shard in task_shards.shards:
+                with task_shards.session(db, shard.index) as shard_db:
+                    options = {"yield_per": _LOAD_BATCH}
+                    # Fresh bitmaps: add directly instead of clearing old values like apply
+                    for task_id, status, priority in shard_db.execute(TAG_INDEX_TASKS, execution_options=options):
+                        bitmaps.tasks.add(task_id)
+                        bitmaps.statuses.setdefault(status, Bitmap()).add(task_id)
+                        bitmaps.priorities.setdefault(priority, Bitmap()).add(task_id)
+                    for task_id, tag in shard_db.execute(TAG_INDEX_TAGS, execution_options=options):
+                        bitmaps.tags.setdefault(tag, Bitmap()).add(task_id)
+        except Exception as e:
+            with self._lock:
+                self._replay = None
+            logger.error(f"Error loading the tag index: {e}")
+            raise
+        finally:
+            db.close()
+        
+        with self._lock:
+            # Writes committed during the load may be missing from it
+            for change in self._replay:
+                bitmaps.apply(change)
+            self._bitmaps = bitmaps
+            self._replay = None
+            self.ready = True
+        logger.info(f"Tag index loaded: {len(bitmaps.tasks)} tasks, {len(bitmaps.tags)} tags")
+        return len(bitmaps.tasks)
+    
+    def query(self, all_tags: Sequence[str] = (), any_tags: Sequence[str] = (), no_tags: Sequence[str] = (),
+              status: Optional[str] = None, priority: Optional[str] = None,
+              skip: int = 0, limit: int = 100) -> Tuple[int, List[int]]:
+        """IDs of the matching tasks in ascending order: (total, page of IDs)."""
+        with self._lock:
+            if not self.ready:
+                raise ValueError("Tag index is loading, please retry shortly")
+            result = self._bitmaps.match(all_tags, any_tags, no_tags, status, priority)
+            metrics.increment("tag_index.queries")
+            return len(result), result.slice(skip, limit)
+    
+    @property
+    def tag_count(self) -> int:
+        return len(self._bitmaps.tags)
+
+
+# Global tag index, loaded by the application lifespan
+tag_index = TagIndex()
+
+metrics.register_gauge("tag_index.tags", lambda: tag_index.tag_count)
+
+
+async def run_tag_index_load() -> None:
+    """Load the tag index in the background; tag queries are rejected until it is ready."""
+    try:
+        await run_in_threadpool(tag_index.load)
+    except Exception:
+        # Logged by load; tag queries keep reporting the index as loading
+        pass
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        # A group commit savepoint was released; wait for the batch commit
+        return
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        tag_index.apply([change for _, change in pending])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction) -> None:
+    pending = session.info.get(_PENDING)
+    if not pending:
+        return
+    if previous_transaction.nested:
+        # A group commit operation failed: only its own changes are dropped
+        session.info[_PENDING] = [entry for entry in pending if entry[0] is not previous_transaction]
+    else:
+        del session.info[_PENDING]
@@ -0,0 +1,214 @@
+"""
+Append-only history of task changes.
+
+Services record field-level changes on the session with
+`task_history.record`. Once the session commits, the entries are stamped
+with the commit time and join an in-memory buffer that a background loop
+inserts in batches every HISTORY_FLUSH_MS, so a write pays for neither an
+extra statement nor an extra round trip. Entries are dropped with their
+transaction, or their group commit savepoint, on rollback. A crash loses
+at most the unflushed buffer. The buffer is per process.
+
+Each entry stores its fields as a compact JSON array of field codes and
+values (enum codes, epoch seconds). update_task adds a full snapshot every
+HISTORY_SNAPSHOT_EVERY versions, so a state at any time is rebuilt from
+the latest create or snapshot entry plus the few diffs after it.
+"""
+import asyncio
+import calendar
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models.task import TaskStatus, TaskPriority
+from app.models.task_history import HISTORY_CREATE, HISTORY_UPDATE, HISTORY_DELETE, HISTORY_SNAPSHOT
+from app.services.group_commit import GROUP_SAVEPOINT
+from app.services.statements import TASK_HISTORY_INSERT, TASK_HISTORY_PAGE, TASK_HISTORY_BASE, TASK_HISTORY_AFTER
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+# Session.info key of the entries waiting for the session to commit
+_PENDING = "task_history_pending"
+
+KINDS = {HISTORY_CREATE: "create", HISTORY_UPDATE: "update", HISTORY_DELETE: "delete", HISTORY_SNAPSHOT: "snapshot"}
+
+# Field codes of the encoding; new fields are appended, codes never change
+FIELDS = [
+    "title", "description", "status", "priority", "due_date", "completed_at",
+    "is_completed", "owner_id", "parent_id", "tags"
+]
+_FIELD_CODES = {field: code for code, field in enumerate(FIELDS)}
+_ENUMS = {"status": TaskStatus, "priority": TaskPriority}
+_DATETIMES = {"due_date", "completed_at"}
+
+
+def _encode_value(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if field in _ENUMS:
+        return list(_ENUMS[field]).index(_ENUMS[field](value))
+    if field in _DATETIMES:
+        # Naive datetimes are UTC throughout the API
+        return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
+    return value
+
+
+def _decode_value(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if field in _ENUMS:
+        return list(_ENUMS[field])[value].value
+    if field in _DATETIMES:
+        return datetime.utcfromtimestamp(value)
+    return value
+
+
+def encode(changes: Dict[str, Any]) -> bytes:
+    """Encode changed fields as `[code, value, code, value, ...]`."""
+    flat: List[Any] = []
+    for field, value in changes.items():
+        flat.append(_FIELD_CODES[field])
+        flat.append(_encode_value(field, value))
+    return json.dumps(flat, separators=(",", ":")).encode()
+
+
+def decode(data: bytes) -> Dict[str, Any]:
+    flat = json.loads(data)
+    return {FIELDS[code]: _decode_value(FIELDS[code], value) for code, value in zip(flat[::2], flat[1::2])}
+
+
+def task_state(task: Any, tags: List[str]) -> Dict[str, Any]:
+    """Every recorded field of a task (ORM instance or returned row)."""
+    state = {field: getattr(task, field) for field in FIELDS if field != "tags"}
+    state["tags"] = list(tags)
+    return state
+
+
+class TaskHistoryWriter:
+    """Commit-time buffer of history entries with batched inserts."""
+    
+    def __init__(self):
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # Serializes flushes, so batches are inserted in commit order
+        self._flush_lock = threading.Lock()
+    
+    def record(self, db: Session, task_id: int, kind: int, changes: Optional[Dict[str, Any]] = None) -> None:
+        """Append an entry for `task_id` once `db` commits."""
+        entry = (task_id, kind, encode(changes or {}))
+        db.info.setdefault(_PENDING, []).append((db.info.get(GROUP_SAVEPOINT), entry))
+    
+    def append(self, entries: List[Tuple[int, int, bytes]]) -> None:
+        """Buffer committed entries, flushing inline when the buffer is full."""
+        at = datetime.utcnow()
+        with self._lock:
+            self._buffer.extend(
+                {"task_id": task_id, "at": at, "kind": kind, "data": data} for task_id, kind, data in entries
+            )
+            full = len(self._buffer) >= settings.history_max_buffer
+        if full:
+            try:
+                self.flush()
+            except Exception:
+                # Logged by flush; the entries stay buffered for the next one
+                pass
+    
+    @property
+    def buffered(self) -> int:
+        return len(self._buffer)
+    
+    def flush(self) -> int:
+        """Insert the buffered entries in one batch; blocks, so run it in the threadpool."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            db = SessionLocal()
+            try:
+                db.execute(TASK_HISTORY_INSERT, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                with self._lock:
+                    # Back in front of newer entries, retried by the next flush
+                    self._buffer[:0] = batch
+                logger.error(f"Error flushing {len(batch)} task history entries: {e}")
+                raise
+            finally:
+                db.close()
+        metrics.increment("task_history.flushes")
+        metrics.increment("task_history.entries", len(batch))
+        return len(batch)
+    
+    def entries(self, db: Session, task_id: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """A task's changes in commit order, without snapshots."""
+        # Flushed first, so the page includes every committed change
+        self.flush()
+        rows = db.execute(TASK_HISTORY_PAGE, {"task_id": task_id, "skip": skip, "limit": limit}).scalars()
+        return [{"at": row.at, "kind": KINDS[row.kind], "changes": decode(row.data)} for row in rows]
+    
+    def state_at(self, db: Session, task_id: int, as_of: datetime) -> Optional[Dict[str, Any]]:
+        """A task's fields as of `as_of`, or None if it did not exist then."""
+        self.flush()
+        params = {"task_id": task_id, "as_of": as_of}
+        base = db.execute(TASK_HISTORY_BASE, params).scalars().first()
+        if base is None:
+            return None
+        state = decode(base.data)
+        replayed = 0
+        for row in db.execute(TASK_HISTORY_AFTER, {**params, "base_at": base.at, "base_id": base.id}).scalars():
+            if row.kind == HISTORY_DELETE:
+                return None
+            state.update(decode(row.data))
+            replayed += 1
+        metrics.increment("task_history.replayed", replayed)
+        return state
+
+
+# Global history writer, flushed by the application lifespan
+task_history = TaskHistoryWriter()
+
+metrics.register_gauge("task_history.buffered", lambda: task_history.buffered)
+
+
+async def run_history_flusher(interval_ms: Optional[int] = None) -> None:
+    """Flush the history buffer periodically in the threadpool until cancelled."""
+    interval = (interval_ms or settings.history_flush_ms) / 1000
+    while True:
+        await asyncio.sleep(interval)
+        if task_history.buffered:
+            try:
+                await run_in_threadpool(task_history.flush)
+            except Exception:
+                # Logged by flush; the entries are retried on the next tick
+                pass
+
+
+@event.listens_for(Session, "after_commit")
+def _buffer_pending(session: Session) -> None:
+    if session.in_nested_transaction():
+        # A group commit savepoint was released; wait for the batch commit
+        return
+    pending = session.info.pop(_PENDING, None)
+    if pending:
+        task_history.append([entry for _, entry in pending])
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_pending(session: Session, previous_transaction) -> None:
+    pending = session.info.get(_PENDING)
+    if not pending:
+        return
+    if previous_transaction.nested:
+        # A group commit operation failed: only its own entries are dropped
+        session.info[_PENDING] = [entry for entry in pending if entry[0] is not previous_transaction]
+    else:
+        del session.info[_PENDING]
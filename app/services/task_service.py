@@ -1,15 +1,83 @@
+import heapq
+from sqlalchemy import case, or_, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime
+from app.config import settings
 from app.models.task import Task, TaskStatus, TaskPriority
+from app.models.task_closure import TaskClosure
+from app.models.task_history import HISTORY_CREATE, HISTORY_UPDATE, HISTORY_DELETE, HISTORY_SNAPSHOT
 from app.models.user import User
 from app.schemas.task import TaskCreate, TaskUpdate, TaskResponse
+from app.services.change_feed import ChangeFeedService
+from app.services.group_commit import GROUP_SAVEPOINT, in_group_commit
+from app.services.statements import (
+    USER_BY_ID, HIDDEN_OWNERS, TASK_BY_ID, TASK_PAGES, TASK_SHARD_PAGES, ARCHIVED_TASK_BY_ID, ARCHIVED_TASK_PAGES,
+    TASK_TAGS, TASKS_TAGS, TASK_TAGS_INSERT, TASK_TAGS_DELETE, TASKS_BY_IDS, TASK_OWNER, TASK_DEPTH,
+    TASK_HEIGHT, TASK_IS_DESCENDANT, TASK_CLOSURE_ATTACH, TASK_CLOSURE_DETACH, TASK_CLOSURE_SPLICE,
+    TASK_CLOSURE_DELETE, TASK_CHILDREN_REPARENT, TASK_HIERARCHY, ARCHIVED_TASK_HIERARCHY, task_edit
+)
+from app.services.tag_index import tag_index
+from app.services.task_history import task_history, task_state
+from app.sharding import task_shards, shard_order_key
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
+def _commit(db: Session, shard_db: Session) -> None:
+    """
+    Commit the shard write, then the primary (change events, directory).
+    Inside a group commit batch the primary is only flushed; the writer
+    commits the whole batch at once.
+    """
+    if shard_db is not db:
+        shard_db.commit()
+    if in_group_commit(db):
+        db.flush()
+    else:
+        db.commit()
+
+
+def _rollback(db: Session) -> None:
+    """Roll back the failed operation: its savepoint inside a group commit, else the transaction."""
+    if in_group_commit(db):
+        savepoint = db.info[GROUP_SAVEPOINT]
+        if savepoint.is_active:
+            savepoint.rollback()
+    else:
+        db.rollback()
+
+
+def _hidden_owners(db: Session) -> List[int]:
+    """Owners being deleted in the background; their tasks are left out of reads."""
+    return db.execute(HIDDEN_OWNERS).scalars().all()
+
+
+def _check_parent(shard_db: Session, owner_id: int, parent_id: int, task_id: Optional[int] = None) -> None:
+    """
+    Validate `parent_id` as the new parent of a task of `owner_id` (with
+    `task_id`, an existing task moved with its subtree): same owner, no
+    cycle and within TASK_MAX_DEPTH. The parent must be on the same shard.
+    """
+    parent_owner = shard_db.execute(TASK_OWNER, {"task_id": parent_id}).scalar()
+    if parent_owner is None:
+        raise ValueError("Parent task not found")
+    if parent_owner != owner_id:
+        raise ValueError("A subtask must have the same owner as its parent")
+    height = 0
+    if task_id is not None:
+        if parent_id == task_id or shard_db.execute(
+            TASK_IS_DESCENDANT, {"task_id": task_id, "parent_id": parent_id}
+        ).first():
+            raise ValueError("A task cannot be moved under itself or one of its subtasks")
+        height = shard_db.execute(TASK_HEIGHT, {"task_id": task_id}).scalar()
+    depth = shard_db.execute(TASK_DEPTH, {"task_id": parent_id}).scalar() + 1 + height
+    if depth > settings.task_max_depth:
+        raise ValueError(f"Subtasks can be nested at most {settings.task_max_depth} levels deep")
+
+
 class TaskService:
     """Service class for task-related operations."""
     
@@ -18,41 +86,76 @@ class TaskService:
         """Create a new task."""
         try:
             # Verify that the owner exists
-            owner = db.query(User).filter(User.id == task_data.owner_id).first()
+            owner = db.execute(USER_BY_ID, {"user_id": task_data.owner_id}).scalars().first()
             if not owner:
-                raise ValueError("User not found")
-            
-            # Create task object
-            db_task = Task(
-                title=task_data.title,
-                description=task_data.description,
-                status=task_data.status,
-                priority=task_data.priority,
-                due_date=task_data.due_date,
-                owner_id=task_data.owner_id
-            )
+                raise ValueError("Owner user not found")
             
-            db.add(db_task)
-            db.commit()
-            db.refresh(db_task)
+            shard_index = task_shards.shard_for_owner(db, task_data.owner_id, for_write=True)
+            with task_shards.session(db, shard_index) as shard_db:
+                if task_data.parent_id is not None:
+                    _check_parent(shard_db, task_data.owner_id, task_data.parent_id)
+                
+                # Create task object
+                db_task = Task(
+                    title=task_data.title,
+                    description=task_data.description,
+                    status=task_data.status,
+                    priority=task_data.priority,
+                    due_date=task_data.due_date,
+                    owner_id=task_data.owner_id,
+                    parent_id=task_data.parent_id
+                )
+                if task_shards.enabled:
+                    db_task.id = task_shards.next_task_id(db, shard_db, shard_index)
+                
+                shard_db.add(db_task)
+                shard_db.flush()
+                if task_data.parent_id is not None:
+                    shard_db.execute(TASK_CLOSURE_ATTACH, {"task_id": db_task.id, "parent_id": task_data.parent_id})
+                tags = task_data.tags or []
+                if tags:
+                    shard_db.execute(TASK_TAGS_INSERT, [{"task_id": db_task.id, "tag": tag} for tag in tags])
+                tag_index.record(db, "task", db_task.id, db_task.status, db_task.priority)
+                tag_index.record(db, "tags", db_task.id, [], tags)
+                ChangeFeedService.record(db, "task", db_task.id, "create", {
+                    "title": db_task.title,
+                    "description": db_task.description,
+                    "status": db_task.status,
+                    "priority": db_task.priority,
+                    "due_date": db_task.due_date,
+                    "owner_id": db_task.owner_id,
+                    "parent_id": db_task.parent_id,
+                    "tags": tags
+                })
+                task_history.record(db, db_task.id, HISTORY_CREATE, task_state(db_task, tags))
+                _commit(db, shard_db)
+                shard_db.refresh(db_task)
             
             logger.info(f"Task created successfully: {task_data.title} for user {task_data.owner_id}")
             return db_task
             
         except IntegrityError as e:
-            db.rollback()
+            _rollback(db)
             logger.error(f"Database integrity error creating task: {e}")
             raise ValueError("Task creation failed due to database constraint")
         except Exception as e:
-            db.rollback()
+            _rollback(db)
             logger.error(f"Error creating task: {e}")
             raise
     
     @staticmethod
-    def get_task_by_id(db: Session, task_id: int) -> Optional[Task]:
-        """Get a task by ID."""
+    def get_task_by_id(db: Session, task_id: int, include_archived: bool = False) -> Optional[Task]:
+        """Get a task by ID, falling back to the archive if requested."""
         try:
-            task = db.query(Task).filter(Task.id == task_id).first()
+            task = None
+            shard_index = task_shards.shard_for_task(db, task_id)
+            if shard_index is not None:
+                with task_shards.session(db, shard_index) as shard_db:
+                    task = shard_db.execute(TASK_BY_ID, {"task_id": task_id}).scalars().first()
+                    if not task and include_archived:
+                        task = shard_db.execute(ARCHIVED_TASK_BY_ID, {"task_id": task_id}).scalars().first()
+            if task is not None and task.owner_id in _hidden_owners(db):
+                task = None
             if not task:
                 logger.warning(f"Task not found with ID: {task_id}")
             return task
@@ -61,121 +164,487 @@ class TaskService:
             raise
     
     @staticmethod
-    def get_tasks_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100) -> List[Task]:
+    def _with_archive(listing: str, params: dict):
+        """Per-database query returning the first `fetch` hot and archived tasks in merge order."""
+        def query(shard_db: Session, fetch: int) -> List[Task]:
+            hot = shard_db.execute(TASK_SHARD_PAGES[listing], {**params, "limit": fetch}).scalars().all()
+            cold = shard_db.execute(ARCHIVED_TASK_PAGES[listing], {**params, "limit": fetch}).scalars().all()
+            return list(heapq.merge(hot, cold, key=shard_order_key))[:fetch]
+        return query
+    
+    @staticmethod
+    def _list_tasks(db: Session, listing: str, params: dict, skip: int, limit: int,
+                    include_archived: bool = False) -> List[Task]:
+        """
+        Run a registered task listing, scatter-gathering across shards when sharded.
+        With `include_archived` the archive is merged in by creation time.
+        """
+        params = {**params, "hidden_owners": _hidden_owners(db)}
+        if include_archived:
+            query = TaskService._with_archive(listing, params)
+            if task_shards.enabled:
+                return task_shards.scatter_gather(db, query, skip=skip, limit=limit)
+            return query(db, skip + limit)[skip:]
+        
+        if task_shards.enabled:
+            stmt = TASK_SHARD_PAGES[listing]
+            return task_shards.scatter_gather(
+                db,
+                lambda shard_db, fetch: shard_db.execute(stmt, {**params, "limit": fetch}).scalars().all(),
+                skip=skip,
+                limit=limit
+            )
+        return db.execute(TASK_PAGES[listing], {**params, "skip": skip, "limit": limit}).scalars().all()
+    
+    @staticmethod
+    def get_tasks_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100,
+                           include_archived: bool = False) -> List[Task]:
         """Get tasks for a specific owner."""
         try:
-            tasks = db.query(Task).filter(Task.owner_id == owner_id).offset(skip).limit(limit).all()
+            # All of an owner's tasks live on one shard
+            shard_index = task_shards.shard_for_owner(db, owner_id)
+            params = {"owner_id": owner_id, "hidden_owners": _hidden_owners(db)}
+            with task_shards.session(db, shard_index) as shard_db:
+                if include_archived:
+                    return TaskService._with_archive("owner", params)(shard_db, skip + limit)[skip:]
+                tasks = shard_db.execute(
+                    TASK_PAGES["owner"], {**params, "skip": skip, "limit": limit}
+                ).scalars().all()
             return tasks
         except Exception as e:
             logger.error(f"Error getting tasks for owner {owner_id}: {e}")
             raise
     
     @staticmethod
-    def get_all_tasks(db: Session, skip: int = 0, limit: int = 100) -> List[Task]:
+    def get_all_tasks(db: Session, skip: int = 0, limit: int = 100, include_archived: bool = False) -> List[Task]:
         """Get all tasks with pagination."""
         try:
-            tasks = db.query(Task).offset(skip).limit(limit).all()
-            return tasks
+            return TaskService._list_tasks(db, "all", {}, skip, limit, include_archived)
         except Exception as e:
             logger.error(f"Error getting all tasks: {e}")
             raise
     
     @staticmethod
-    def get_tasks_by_status(db: Session, status: TaskStatus, skip: int = 0, limit: int = 100) -> List[Task]:
+    def get_tasks_by_status(db: Session, status: TaskStatus, skip: int = 0, limit: int = 100,
+                            include_archived: bool = False) -> List[Task]:
         """Get tasks by status."""
         try:
-            tasks = db.query(Task).filter(Task.status == status).offset(skip).limit(limit).all()
-            return tasks
+            return TaskService._list_tasks(db, "status", {"status": status}, skip, limit, include_archived)
         except Exception as e:
             logger.error(f"Error getting tasks by status {status}: {e}")
             raise
     
     @staticmethod
-    def get_tasks_by_priority(db: Session, priority: TaskPriority, skip: int = 0, limit: int = 100) -> List[Task]:
+    def get_tasks_by_priority(db: Session, priority: TaskPriority, skip: int = 0, limit: int = 100,
+                              include_archived: bool = False) -> List[Task]:
         """Get tasks by priority."""
         try:
-            tasks = db.query(Task).filter(Task.priority == priority).offset(skip).limit(limit).all()
-            return tasks
+            return TaskService._list_tasks(db, "priority", {"priority": priority}, skip, limit, include_archived)
         except Exception as e:
             logger.error(f"Error getting tasks by priority {priority}: {e}")
             raise
     
     @staticmethod
-    def search_tasks(db: Session, search_term: str, skip: int = 0, limit: int = 100) -> List[Task]:
+    def search_tasks(db: Session, search_term: str, skip: int = 0, limit: int = 100,
+                     include_archived: bool = False) -> List[Task]:
         """Search tasks by title or description."""
         try:
-            tasks = db.query(Task).filter(
-                (Task.title.contains(search_term)) | 
-                (Task.description.contains(search_term))
-            ).offset(skip).limit(limit).all()
-            return tasks
+            return TaskService._list_tasks(db, "search", {"search_term": search_term}, skip, limit, include_archived)
         except Exception as e:
             logger.error(f"Error searching tasks with term '{search_term}': {e}")
             raise
     
     @staticmethod
-    def update_task(db: Session, task_id: int, task_data: TaskUpdate) -> Optional[Task]:
-        """Update a task."""
+    def update_task(db: Session, task_id: int, task_data: TaskUpdate,
+                    expected_version: Optional[int] = None) -> Task:
+        """
+        Update a task with a single UPDATE ... RETURNING; only a sharded
+        deployment or a new parent reads the task's owner first, for the
+        guards. With `expected_version` the edit only applies if the task is
+        still at that version. Returns the updated task as a detached
+        instance built from the returned row.
+        """
         try:
-            task = TaskService.get_task_by_id(db, task_id)
-            if not task:
+            shard_index = task_shards.shard_for_task(db, task_id)
+            if shard_index is None:
                 raise ValueError("Task not found")
             
-            # Update fields
             update_data = task_data.dict(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(task, field, value)
+            columns = {field: value for field, value in update_data.items() if field != "tags"}
+            tags = update_data.get("tags")
+            params = {f"new_{field}": value for field, value in columns.items()}
+            params["task_id"] = task_id
+            completed = None
+            if task_data.status is not None:
+                # Set completed_at on completion, clear it when the task leaves that status
+                completed = task_data.status == TaskStatus.COMPLETED
+                params["now"] = datetime.utcnow()
+            if expected_version is not None:
+                params["version"] = expected_version
+            stmt = task_edit(frozenset(columns), expected_version is not None, completed)
             
-            # If status is being updated to completed, set completed_at
-            if task_data.status == TaskStatus.COMPLETED and task.status != TaskStatus.COMPLETED:
-                task.completed_at = datetime.utcnow()
-            
-            # If status is being updated from completed to something else, clear completed_at
-            elif task_data.status and task_data.status != TaskStatus.COMPLETED and task.status == TaskStatus.COMPLETED:
-                task.completed_at = None
-            
-            db.commit()
-            db.refresh(task)
+            with task_shards.session(db, shard_index) as shard_db:
+                # Guards run before the UPDATE, so an invalid edit never takes the write lock
+                new_parent = columns.get("parent_id")
+                if task_shards.enabled or new_parent is not None:
+                    owner_id = shard_db.execute(TASK_OWNER, {"task_id": task_id}).scalar()
+                    if owner_id is None:
+                        raise ValueError("Task not found")
+                    task_shards.check_writable(db, owner_id)
+                    if new_parent is not None:
+                        _check_parent(shard_db, owner_id, new_parent, task_id)
+                
+                row = shard_db.execute(stmt, params).first()
+                if row is None:
+                    current = shard_db.execute(TASK_BY_ID, {"task_id": task_id}).scalars().first()
+                    if current is None:
+                        raise ValueError("Task not found")
+                    raise ValueError(
+                        f"Task was modified by another request (now at version {current.version}); "
+                        "reload it and retry"
+                    )
+                
+                if "parent_id" in columns:
+                    # Move the subtree: cut it from its old ancestors, link it under the new parent
+                    shard_db.execute(TASK_CLOSURE_DETACH, {"task_id": task_id})
+                    if row.parent_id is not None:
+                        shard_db.execute(TASK_CLOSURE_ATTACH, {"task_id": task_id, "parent_id": row.parent_id})
+                if tags is not None:
+                    removed = shard_db.execute(TASK_TAGS_DELETE, {"task_id": task_id}).scalars().all()
+                    if tags:
+                        shard_db.execute(TASK_TAGS_INSERT, [{"task_id": task_id, "tag": tag} for tag in tags])
+                    tag_index.record(db, "tags", task_id, removed, tags)
+                if "status" in columns or "priority" in columns:
+                    tag_index.record(db, "task", task_id, row.status, row.priority)
+                ChangeFeedService.record(db, "task", task_id, "update", update_data)
+                history = dict(update_data)
+                if completed is not None:
+                    history["completed_at"] = row.completed_at
+                task_history.record(db, task_id, HISTORY_UPDATE, history)
+                if row.version % settings.history_snapshot_every == 0:
+                    # Bounds the diffs replayed to rebuild a past state
+                    if tags is None:
+                        tags = shard_db.execute(TASK_TAGS, {"task_id": task_id}).scalars().all()
+                    task_history.record(db, task_id, HISTORY_SNAPSHOT, task_state(row, tags))
+                _commit(db, shard_db)
             
+            task = Task(**row._mapping)
             logger.info(f"Task updated successfully: {task.title}")
             return task
             
         except IntegrityError as e:
-            db.rollback()
+            _rollback(db)
             logger.error(f"Database integrity error updating task: {e}")
             raise ValueError("Task update failed due to database constraint")
         except Exception as e:
-            db.rollback()
+            _rollback(db)
             logger.error(f"Error updating task {task_id}: {e}")
             raise
     
+    @staticmethod
+    def _bulk_criteria(criteria: Dict[str, Any]) -> list:
+        """SQL conditions of a bulk_edit filter on the tasks table."""
+        tasks = Task.__table__
+        conditions = []
+        if criteria.get("owner_id") is not None:
+            conditions.append(tasks.c.owner_id == criteria["owner_id"])
+        if criteria.get("status") is not None:
+            conditions.append(tasks.c.status == criteria["status"])
+        if criteria.get("priority") is not None:
+            conditions.append(tasks.c.priority == criteria["priority"])
+        if criteria.get("due_after") is not None:
+            conditions.append(tasks.c.due_date >= criteria["due_after"])
+        if criteria.get("due_before") is not None:
+            conditions.append(tasks.c.due_date < criteria["due_before"])
+        return conditions
+    
+    @staticmethod
+    def bulk_update_tasks(db: Session, criteria: Dict[str, Any], changes: Dict[str, Any],
+                          chunk_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Apply `changes` to every task matching `criteria` with set-based UPDATEs.
+        Tasks are walked in ID order in chunks of `chunk_size`, each chunk in
+        its own transaction with its change events; a chunk holding tasks of
+        an owner being moved between shards is rejected before its UPDATE.
+        completed_at is maintained as in update_task. Returns the affected counts.
+        """
+        chunk_size = chunk_size or settings.bulk_edit_chunk_size
+        tasks = Task.__table__
+        try:
+            conditions = TaskService._bulk_criteria(criteria)
+            if not conditions:
+                raise ValueError("At least one filter condition is required")
+            
+            new_owner = changes.get("owner_id")
+            if new_owner is not None and not db.execute(USER_BY_ID, {"user_id": new_owner}).scalars().first():
+                raise ValueError("New owner user not found")
+            
+            owner_id = criteria.get("owner_id")
+            if owner_id is not None:
+                shard_indexes = [task_shards.shard_for_owner(db, owner_id, for_write=True)]
+            else:
+                shard_indexes = [shard.index for shard in task_shards.shards]
+            if new_owner is not None and task_shards.enabled:
+                # A set-based UPDATE cannot move rows between databases
+                target = task_shards.shard_for_owner(db, new_owner, for_write=True)
+                if any(index != target for index in shard_indexes):
+                    raise ValueError("Tasks can only be reassigned to an owner on the same shard")
+            
+            if new_owner is not None:
+                # Subtasks share their parent's owner, so hierarchies are not reassigned piecemeal
+                closure = TaskClosure.__table__
+                in_hierarchy = select(tasks.c.id).where(
+                    *conditions,
+                    select(closure.c.depth).where(
+                        or_(closure.c.ancestor_id == tasks.c.id, closure.c.descendant_id == tasks.c.id)
+                    ).exists()
+                ).limit(1)
+                for shard_index in shard_indexes:
+                    with task_shards.session(db, shard_index) as shard_db:
+                        if shard_db.execute(in_hierarchy).first():
+                            raise ValueError("Tasks with a parent or subtasks cannot be reassigned to another owner")
+            
+            values = dict(changes)
+            values["version"] = tasks.c.version + 1
+            status = changes.get("status")
+            now = datetime.utcnow()
+            if status == TaskStatus.COMPLETED:
+                # SET expressions see the old row: keep the time of earlier completions
+                values["completed_at"] = case(
+                    (tasks.c.status == TaskStatus.COMPLETED, tasks.c.completed_at),
+                    else_=now
+                )
+            elif status is not None:
+                values["completed_at"] = None
+            
+            counts = {"updated": 0, "completed": 0, "reopened": 0, "chunks": 0}
+            for shard_index in shard_indexes:
+                with task_shards.session(db, shard_index) as shard_db:
+                    last_id = 0
+                    while True:
+                        rows = shard_db.execute(
+                            select(tasks.c.id, tasks.c.status, tasks.c.priority, tasks.c.owner_id)
+                            .where(*conditions, tasks.c.id > last_id)
+                            .order_by(tasks.c.id)
+                            .limit(chunk_size)
+                        ).all()
+                        if not rows:
+                            break
+                        if owner_id is None:
+                            # Rows of an owner being moved would be lost when the copy completes
+                            for row_owner in {row.owner_id for row in rows}:
+                                task_shards.check_writable(db, row_owner)
+                        
+                        ids = [row.id for row in rows]
+                        counts["updated"] += shard_db.execute(
+                            update(tasks).where(tasks.c.id.in_(ids), *conditions).values(**values)
+                        ).rowcount
+                        if status == TaskStatus.COMPLETED:
+                            counts["completed"] += sum(row.status != TaskStatus.COMPLETED for row in rows)
+                        elif status is not None:
+                            counts["reopened"] += sum(row.status == TaskStatus.COMPLETED for row in rows)
+                        for row in rows:
+                            ChangeFeedService.record(db, "task", row.id, "update", changes)
+                            history = dict(changes)
+                            if status == TaskStatus.COMPLETED:
+                                if row.status != TaskStatus.COMPLETED:
+                                    history["completed_at"] = now
+                            elif status is not None:
+                                history["completed_at"] = None
+                            task_history.record(db, row.id, HISTORY_UPDATE, history)
+                            if status is not None or "priority" in changes:
+                                tag_index.record(
+                                    db, "task", row.id, status or row.status, changes.get("priority", row.priority)
+                                )
+                        
+                        _commit(db, shard_db)
+                        counts["chunks"] += 1
+                        last_id = ids[-1]
+                        if len(rows) < chunk_size:
+                            break
+            
+            logger.info(f"Bulk updated {counts['updated']} tasks in {counts['chunks']} chunks")
+            return counts
+            
+        except Exception as e:
+            _rollback(db)
+            logger.error(f"Error bulk updating tasks: {e}")
+            raise
+    
     @staticmethod
     def delete_task(db: Session, task_id: int) -> bool:
         """Delete a task."""
         try:
-            task = TaskService.get_task_by_id(db, task_id)
-            if not task:
+            shard_index = task_shards.shard_for_task(db, task_id)
+            if shard_index is None:
                 raise ValueError("Task not found")
             
-            db.delete(task)
-            db.commit()
+            with task_shards.session(db, shard_index) as shard_db:
+                task = shard_db.execute(TASK_BY_ID, {"task_id": task_id}).scalars().first()
+                if not task:
+                    raise ValueError("Task not found")
+                task_shards.check_writable(db, task.owner_id)
+                
+                # Subtasks move up one level, under the deleted task's parent
+                shard_db.execute(TASK_CLOSURE_SPLICE, {"task_id": task_id})
+                shard_db.execute(TASK_CLOSURE_DELETE, {"task_id": task_id})
+                children = shard_db.execute(
+                    TASK_CHILDREN_REPARENT, {"task_id": task_id, "new_parent_id": task.parent_id}
+                ).scalars().all()
+                for child_id in children:
+                    ChangeFeedService.record(db, "task", child_id, "update", {"parent_id": task.parent_id})
+                    task_history.record(db, child_id, HISTORY_UPDATE, {"parent_id": task.parent_id})
+                
+                shard_db.delete(task)
+                tags = shard_db.execute(TASK_TAGS_DELETE, {"task_id": task_id}).scalars().all()
+                tag_index.record(db, "remove", task_id, tags)
+                ChangeFeedService.record(db, "task", task_id, "delete")
+                task_history.record(db, task_id, HISTORY_DELETE)
+                _commit(db, shard_db)
             
             logger.info(f"Task deleted successfully: {task.title}")
             return True
             
         except Exception as e:
-            db.rollback()
+            _rollback(db)
             logger.error(f"Error deleting task {task_id}: {e}")
             raise
     
     @staticmethod
-    def get_task_with_owner(db: Session, task_id: int) -> Optional[dict]:
+    def get_task_tags(db: Session, task_id: int) -> List[str]:
+        """Tags of a task (hot or archived), sorted."""
+        shard_index = task_shards.shard_for_task(db, task_id)
+        if shard_index is None:
+            return []
+        with task_shards.session(db, shard_index) as shard_db:
+            return shard_db.execute(TASK_TAGS, {"task_id": task_id}).scalars().all()
+    
+    @staticmethod
+    def get_tasks_by_tags(db: Session, all_tags: List[str], any_tags: List[str], no_tags: List[str],
+                          status: Optional[TaskStatus] = None, priority: Optional[TaskPriority] = None,
+                          skip: int = 0, limit: int = 100) -> Tuple[int, List[Tuple[Task, List[str]]]]:
+        """
+        Tasks matching a tag query, answered by the tag index, in ID order.
+        Returns the total match count and a page of (task, tags). Tasks of
+        owners being deleted are left out of the page, not of the total.
+        """
+        try:
+            total, ids = tag_index.query(all_tags, any_tags, no_tags, status, priority, skip, limit)
+            hidden_owners = _hidden_owners(db) if ids else []
+            
+            by_shard: Dict[int, List[int]] = {}
+            for task_id in ids:
+                shard_index = task_shards.shard_for_task(db, task_id)
+                if shard_index is not None:
+                    by_shard.setdefault(shard_index, []).append(task_id)
+            
+            page = []
+            for shard_index, shard_ids in by_shard.items():
+                with task_shards.session(db, shard_index) as shard_db:
+                    tags: Dict[int, List[str]] = {}
+                    for task_id, tag in shard_db.execute(TASKS_TAGS, {"ids": shard_ids}):
+                        tags.setdefault(task_id, []).append(tag)
+                    page.extend(
+                        (task, sorted(tags.get(task.id, [])))
+                        for task in shard_db.execute(
+                            TASKS_BY_IDS, {"ids": shard_ids, "hidden_owners": hidden_owners}
+                        ).scalars().all()
+                    )
+            page.sort(key=lambda item: item[0].id)
+            return total, page
+        except Exception as e:
+            logger.error(f"Error querying tasks by tags: {e}")
+            raise
+    
+    @staticmethod
+    def get_task_subtree(db: Session, task_id: int, skip: int = 0, limit: int = 100,
+                         include_archived: bool = False) -> List[Tuple[Task, int]]:
+        """A page of the task's subtasks at any depth as (task, depth), by depth then ID."""
+        try:
+            shard_index = task_shards.shard_for_task(db, task_id)
+            if shard_index is None:
+                return []
+            with task_shards.session(db, shard_index) as shard_db:
+                if not include_archived:
+                    params = {"task_id": task_id, "skip": skip, "limit": limit}
+                    return [tuple(row) for row in shard_db.execute(TASK_HIERARCHY["subtree"], params)]
+                params = {"task_id": task_id, "skip": 0, "limit": skip + limit}
+                hot = shard_db.execute(TASK_HIERARCHY["subtree"], params).all()
+                cold = shard_db.execute(ARCHIVED_TASK_HIERARCHY["subtree"], params).all()
+                merged = heapq.merge(hot, cold, key=lambda row: (row[1], row[0].id))
+                return [tuple(row) for row in merged][skip:skip + limit]
+        except Exception as e:
+            logger.error(f"Error getting subtasks of task {task_id}: {e}")
+            raise
+    
+    @staticmethod
+    def get_task_ancestors(db: Session, task_id: int, include_archived: bool = False) -> List[Tuple[Task, int]]:
+        """The task's ancestors as (task, depth above it), top-level task first."""
+        try:
+            shard_index = task_shards.shard_for_task(db, task_id)
+            if shard_index is None:
+                return []
+            with task_shards.session(db, shard_index) as shard_db:
+                rows = shard_db.execute(TASK_HIERARCHY["ancestors"], {"task_id": task_id}).all()
+                if include_archived:
+                    rows += shard_db.execute(ARCHIVED_TASK_HIERARCHY["ancestors"], {"task_id": task_id}).all()
+                    rows.sort(key=lambda row: -row[1])
+                return [tuple(row) for row in rows]
+        except Exception as e:
+            logger.error(f"Error getting ancestors of task {task_id}: {e}")
+            raise
+    
+    @staticmethod
+    def get_task_rollup(db: Session, task_id: int, include_archived: bool = False) -> Dict[str, int]:
+        """Counts of the task's subtasks at any depth by status."""
+        try:
+            counts = {status.value: 0 for status in TaskStatus}
+            shard_index = task_shards.shard_for_task(db, task_id)
+            if shard_index is None:
+                return counts
+            statements = [TASK_HIERARCHY["rollup"]]
+            if include_archived:
+                statements.append(ARCHIVED_TASK_HIERARCHY["rollup"])
+            with task_shards.session(db, shard_index) as shard_db:
+                for stmt in statements:
+                    for status, count in shard_db.execute(stmt, {"task_id": task_id}):
+                        counts[status.value] += count
+            return counts
+        except Exception as e:
+            logger.error(f"Error getting subtask counts of task {task_id}: {e}")
+            raise
+    
+    @staticmethod
+    def get_task_history(db: Session, task_id: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """The task's recorded changes in commit order; kept after the task is deleted."""
+        try:
+            return task_history.entries(db, task_id, skip, limit)
+        except Exception as e:
+            logger.error(f"Error getting history of task {task_id}: {e}")
+            raise
+    
+    @staticmethod
+    def get_task_state_at(db: Session, task_id: int, as_of: datetime) -> Optional[Dict[str, Any]]:
+        """The task's fields at `as_of` rebuilt from its history, or None if it did not exist then."""
+        try:
+            return task_history.state_at(db, task_id, as_of)
+        except Exception as e:
+            logger.error(f"Error rebuilding task {task_id} as of {as_of}: {e}")
+            raise
+    
+    @staticmethod
+    def get_task_with_owner(db: Session, task_id: int, include_archived: bool = False) -> Optional[dict]:
         """Get a task with owner information."""
         try:
-            task = db.query(Task).join(User).filter(Task.id == task_id).first()
+            task = TaskService.get_task_by_id(db, task_id, include_archived)
             if not task:
                 return None
             
+            # Users live on the primary, tasks possibly on another shard
+            owner = db.execute(USER_BY_ID, {"user_id": task.owner_id}).scalars().first()
+            if not owner:
+                return None
+            
             # Convert to dict with owner info
             task_dict = {
                 "id": task.id,
@@ -187,11 +656,12 @@ class TaskService:
                 "completed_at": task.completed_at,
                 "created_at": task.created_at,
                 "updated_at": task.updated_at,
+                "parent_id": task.parent_id,
                 "owner": {
-                    "id": task.owner.id,
-                    "username": task.owner.username,
-                    "full_name": task.owner.full_name,
-                    "email": task.owner.email
+                    "id": owner.id,
+                    "username": owner.username,
+                    "full_name": owner.full_name,
+                    "email": owner.email
                 }
             }
             
@@ -202,16 +672,11 @@ class TaskService:
             raise
     
     @staticmethod
-    def get_overdue_tasks(db: Session, skip: int = 0, limit: int = 100) -> List[Task]:
+    def get_overdue_tasks(db: Session, skip: int = 0, limit: int = 100, include_archived: bool = False) -> List[Task]:
         """Get overdue tasks (due date has passed and not completed)."""
         try:
             current_time = datetime.utcnow()
-            overdue_tasks = db.query(Task).filter(
-                Task.due_date < current_time,
-                Task.status != TaskStatus.COMPLETED
-            ).offset(skip).limit(limit).all()
-            
-            return overdue_tasks
+            return TaskService._list_tasks(db, "overdue", {"now": current_time}, skip, limit, include_archived)
             
         except Exception as e:
             logger.error(f"Error getting overdue tasks: {e}")
@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.user_deletion import UserDeletion
+from app.services.change_feed import ChangeFeedService
+from app.services.job_queue import JobService, job_handler
+from app.services.statements import (
+    USER_BY_ID, USER_DELETION, USER_DELETE, OWNER_TASKS_DELETE_CHUNK, OWNER_ARCHIVED_TASKS_DELETE_CHUNK,
+    OWNER_TASK_TAGS_DELETE_CHUNK, OWNER_ARCHIVED_TASK_TAGS_DELETE_CHUNK, OWNER_TASK_CLOSURE_DELETE_CHUNK,
+    OWNER_ARCHIVED_TASK_CLOSURE_DELETE_CHUNK, TASK_HISTORY_DELETE
+)
+from app.services.tag_index import tag_index
+from app.services.task_history import task_history
+from app.sharding import task_shards
+from app.utils.logging import get_logger
+from app.utils.metrics import metrics
+
+logger = get_logger(__name__)
+
+
+class UserDeletionService:
+    """
+    Service class for deleting users with many tasks.
+    A request only records a UserDeletion row, which hides the user from
+    reads, and queues a "user.delete" job in the same transaction. The job
+    deletes the user's tasks with set-based DELETE statements in chunks, one
+    short transaction each, and removes the user row last. Progress is kept
+    on the row; the job queue retries failures and resumes interrupted jobs.
+    """
+    
+    @staticmethod
+    def get_deletion(db: Session, user_id: int) -> Optional[UserDeletion]:
+        """Get the deletion record of a user, if one was requested."""
+        return db.execute(USER_DELETION, {"user_id": user_id}).scalars().first()
+    
+    @staticmethod
+    def request_deletion(db: Session, user_id: int, background: bool = True) -> UserDeletion:
+        """
+        Soft-delete a user and, with `background`, queue the job that purges it.
+        Repeating the request reports the progress of the existing deletion;
+        a failed deletion is queued again.
+        """
+        try:
+            deletion = UserDeletionService.get_deletion(db, user_id)
+            if deletion is not None and deletion.status in ("pending", "running"):
+                return deletion
+            if deletion is not None and deletion.status == "failed":
+                deletion.status = "pending"
+                deletion.error = None
+                if background:
+                    JobService.enqueue(db, "user.delete", {"user_id": user_id}, commit=False)
+                db.commit()
+                return deletion
+            
+            user = db.execute(USER_BY_ID, {"user_id": user_id}).scalars().first()
+            if not user:
+                if deletion is not None:
+                    return deletion
+                raise ValueError("User not found")
+            
+            if deletion is None:
+                deletion = UserDeletion(user_id=user_id)
+                db.add(deletion)
+            # A completed record belongs to an earlier user with the same (reused) ID
+            deletion.username = user.username
+            deletion.status = "pending"
+            deletion.tasks_deleted = 0
+            deletion.finished_at = None
+            ChangeFeedService.record(db, "user", user_id, "delete")
+            if background:
+                JobService.enqueue(db, "user.delete", {"user_id": user_id}, commit=False)
+            db.commit()
+            db.refresh(deletion)
+            
+            logger.info(f"User deletion requested: {user.username}")
+            return deletion
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error requesting deletion of user {user_id}: {e}")
+            raise
+    
+    @staticmethod
+    def purge_user(db: Session, user_id: int, chunk_size: Optional[int] = None) -> int:
+        """Delete a soft-deleted user's tasks in chunks, then the user; returns the task count."""
+        chunk_size = chunk_size or settings.user_delete_chunk_size
+        deletion = UserDeletionService.get_deletion(db, user_id)
+        if deletion is None:
+            raise ValueError("User deletion not requested")
+        if deletion.status == "completed":
+            return deletion.tasks_deleted
+        
+        try:
+            deletion.status = "running"
+            db.commit()
+            # Buffered history of the user's tasks is inserted before it is purged below
+            task_history.flush()
+            
+            shard_index = task_shards.shard_for_owner(db, user_id, for_write=True)
+            with task_shards.session(db, shard_index) as shard_db:
+                for closure_stmt, tags_stmt, stmt in (
+                    (OWNER_TASK_CLOSURE_DELETE_CHUNK, OWNER_TASK_TAGS_DELETE_CHUNK, OWNER_TASKS_DELETE_CHUNK),
+                    (OWNER_ARCHIVED_TASK_CLOSURE_DELETE_CHUNK, OWNER_ARCHIVED_TASK_TAGS_DELETE_CHUNK,
+                     OWNER_ARCHIVED_TASKS_DELETE_CHUNK)
+                ):
+                    while True:
+                        params = {"owner_id": user_id, "limit": chunk_size}
+                        shard_db.execute(closure_stmt, params)
+                        tags: Dict[int, list] = {}
+                        for task_id, tag in shard_db.execute(tags_stmt, params):
+                            tags.setdefault(task_id, []).append(tag)
+                        ids = shard_db.execute(stmt, params).scalars().all()
+                        if stmt is OWNER_TASKS_DELETE_CHUNK:
+                            for task_id in ids:
+                                tag_index.record(db, "remove", task_id, tags.get(task_id, []))
+                        if ids:
+                            db.execute(TASK_HISTORY_DELETE, {"ids": ids})
+                        deleted = len(ids)
+                        if shard_db is not db:
+                            shard_db.commit()
+                        deletion.tasks_deleted += deleted
+                        db.commit()
+                        metrics.increment("user_deletion.tasks", deleted)
+                        if deleted < chunk_size:
+                            break
+            
+            task_shards.forget_owner(db, user_id)
+            db.execute(USER_DELETE, {"user_id": user_id})
+            deletion.status = "completed"
+            deletion.finished_at = datetime.utcnow()
+            db.commit()
+            
+            logger.info(f"User deleted successfully: {deletion.username} ({deletion.tasks_deleted} tasks)")
+            return deletion.tasks_deleted
+            
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error deleting user {user_id}: {e}")
+            deletion.status = "failed"
+            deletion.error = str(e)
+            db.commit()
+            raise
+
+
+@job_handler("user.delete")
+def _purge_job(db: Session, payload: Dict[str, Any]) -> None:
+    UserDeletionService.purge_user(db, payload["user_id"])
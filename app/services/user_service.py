@@ -1,15 +1,27 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from passlib.context import CryptContext
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, UserResponse
+from app.services.change_feed import ChangeFeedService
+from app.services.statements import (
+    USER_BY_ID, USER_BY_USERNAME, USER_BY_EMAIL, USER_BY_USERNAME_OR_EMAIL, USER_PAGE, user_edit
+)
+from app.services.user_deletion_service import UserDeletionService
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_pwd_context = None
+
+
+def get_pwd_context():
+    """Password hashing context, created on first use (passlib is slow to import)."""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 class UserService:
@@ -18,22 +30,22 @@ class UserService:
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash a password using bcrypt."""
-        return pwd_context.hash(password)
+        return get_pwd_context().hash(password)
     
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return pwd_context.verify(plain_password, hashed_password)
+        return get_pwd_context().verify(plain_password, hashed_password)
     
     @staticmethod
     def create_user(db: Session, user_data: UserCreate) -> User:
         """Create a new user."""
         try:
             # Check if username or email already exists
-            existing_user = db.query(User).filter(
-                (User.username == user_data.username) | 
-                (User.email == user_data.email)
-            ).first()
+            existing_user = db.execute(
+                USER_BY_USERNAME_OR_EMAIL,
+                {"username": user_data.username, "email": user_data.email}
+            ).scalars().first()
             
             if existing_user:
                 if existing_user.username == user_data.username:
@@ -54,6 +66,13 @@ class UserService:
             )
             
             db.add(db_user)
+            db.flush()
+            ChangeFeedService.record(db, "user", db_user.id, "create", {
+                "username": db_user.username,
+                "email": db_user.email,
+                "full_name": db_user.full_name,
+                "is_active": db_user.is_active
+            })
             db.commit()
             db.refresh(db_user)
             
@@ -73,7 +92,7 @@ class UserService:
     def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
         """Get a user by ID."""
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = db.execute(USER_BY_ID, {"user_id": user_id}).scalars().first()
             if not user:
                 logger.warning(f"User not found with ID: {user_id}")
             return user
@@ -85,7 +104,7 @@ class UserService:
     def get_user_by_username(db: Session, username: str) -> Optional[User]:
         """Get a user by username."""
         try:
-            user = db.query(User).filter(User.username == username).first()
+            user = db.execute(USER_BY_USERNAME, {"username": username}).scalars().first()
             return user
         except Exception as e:
             logger.error(f"Error getting user by username {username}: {e}")
@@ -95,7 +114,7 @@ class UserService:
     def get_user_by_email(db: Session, email: str) -> Optional[User]:
         """Get a user by email."""
         try:
-            user = db.query(User).filter(User.email == email).first()
+            user = db.execute(USER_BY_EMAIL, {"email": email}).scalars().first()
             return user
         except Exception as e:
             logger.error(f"Error getting user by email {email}: {e}")
@@ -105,45 +124,61 @@ class UserService:
     def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
         """Get a list of users with pagination."""
         try:
-            users = db.query(User).offset(skip).limit(limit).all()
+            users = db.execute(USER_PAGE, {"skip": skip, "limit": limit}).scalars().all()
             return users
         except Exception as e:
             logger.error(f"Error getting users: {e}")
             raise
     
     @staticmethod
-    def update_user(db: Session, user_id: int, user_data: UserUpdate) -> Optional[User]:
-        """Update a user."""
+    def update_user(db: Session, user_id: int, user_data: UserUpdate,
+                    expected_version: Optional[int] = None) -> User:
+        """
+        Update a user with a single UPDATE ... RETURNING.
+        Username and email conflicts are reported by the unique constraints.
+        With `expected_version` the edit only applies if the user is still at
+        that version. Returns the updated user as a detached instance.
+        """
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
-                raise ValueError("User not found")
-            
-            # Check for unique constraints if updating username or email
-            if user_data.username and user_data.username != user.username:
-                existing_user = UserService.get_user_by_username(db, user_data.username)
-                if existing_user:
-                    raise ValueError("Username already exists")
-            
-            if user_data.email and user_data.email != user.email:
-                existing_user = UserService.get_user_by_email(db, user_data.email)
-                if existing_user:
-                    raise ValueError("Email already exists")
-            
-            # Update fields
             update_data = user_data.dict(exclude_unset=True)
-            for field, value in update_data.items():
-                setattr(user, field, value)
-            
+            values = dict(update_data)
+            password = values.pop("password", None)
+            if password is not None:
+                values["hashed_password"] = UserService.hash_password(password)
+            
+            params = {f"new_{field}": value for field, value in values.items()}
+            params["user_id"] = user_id
+            if expected_version is not None:
+                params["version"] = expected_version
+            stmt = user_edit(frozenset(values), expected_version is not None)
+            
+            row = db.execute(stmt, params).first()
+            if row is None:
+                current = UserService.get_user_by_id(db, user_id)
+                if current is None:
+                    raise ValueError("User not found")
+                raise ValueError(
+                    f"User was modified by another request (now at version {current.version}); "
+                    "reload it and retry"
+                )
+            
+            # Never publish password material in the change feed
+            update_data.pop("password", None)
+            ChangeFeedService.record(db, "user", user_id, "update", update_data)
             db.commit()
-            db.refresh(user)
             
+            user = User(**row._mapping)
             logger.info(f"User updated successfully: {user.username}")
             return user
             
         except IntegrityError as e:
             db.rollback()
             logger.error(f"Database integrity error updating user: {e}")
+            message = str(e.orig).lower()
+            if "username" in message:
+                raise ValueError("Username already exists")
+            if "email" in message:
+                raise ValueError("Email already exists")
             raise ValueError("User update failed due to database constraint")
         except Exception as e:
             db.rollback()
@@ -152,22 +187,13 @@ class UserService:
     
     @staticmethod
     def delete_user(db: Session, user_id: int) -> bool:
-        """Delete a user."""
-        try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
-                raise ValueError("User not found")
-            
-            db.delete(user)
-            db.commit()
-            
-            logger.info(f"User deleted successfully: {user.username}")
-            return True
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error deleting user {user_id}: {e}")
-            raise
+        """
+        Delete a user and their tasks synchronously (scripts, maintenance).
+        The API's "delete" action runs the same purge as a background job.
+        """
+        UserDeletionService.request_deletion(db, user_id, background=False)
+        UserDeletionService.purge_user(db, user_id)
+        return True
     
     @staticmethod
     def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
@@ -0,0 +1,354 @@
+"""
+Owner-based sharding of the tasks table.
+
+Shard 0 is the primary database; TASK_SHARD_URLS adds shards 1..N-1.
+Every task is stored on its owner's shard, chosen by hash unless the
+owner has an entry in the task_shard_owners directory. Each shard hands
+out task IDs from its own range (shard index in the high bits), so a
+lookup by ID goes straight to the right shard. IDs are allocated from a
+counter row on the shard, so they are never reused. Tasks moved by the
+resharding tool keep their IDs and are found through task_shard_forwards.
+
+Resharding tool:
+    python -m app.sharding status
+    python -m app.sharding move OWNER_ID SHARD_INDEX
+    python -m app.sharding pin-existing
+"""
+import argparse
+import heapq
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from app.config import settings
+from app.database import SessionLocal, create_db_engine, create_tables, engine, init_db
+from app.models.archived_task import ArchivedTask
+from app.models.task import Task
+from app.models.task_shard import TaskShardOwner, TaskShardForward, TaskIdCounter
+from app.models.task_closure import TaskClosure
+from app.models.task_tag import TaskTag
+from app.utils.logging import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# Task IDs carry the shard index above this many bits
+SHARD_ID_BITS = 40
+SHARD_ID_SPAN = 1 << SHARD_ID_BITS
+
+# Merged cross-shard listings are ordered by creation time, then ID
+SHARD_ORDER = (Task.created_at, Task.id)
+
+
+def shard_order_key(task) -> tuple:
+    """Python-side sort key matching SHARD_ORDER."""
+    return (task.created_at or datetime.min, task.id)
+
+
+class TaskShard:
+    """A database holding the tasks of a subset of owners."""
+    
+    def __init__(self, index: int, url: Optional[str] = None):
+        self.index = index
+        self.url = url or settings.database_url
+        if url is None:
+            self.session_factory = SessionLocal
+            self.engine = engine
+        else:
+            self.engine = create_db_engine(url)
+            self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+    
+    @property
+    def id_base(self) -> int:
+        return self.index << SHARD_ID_BITS
+
+
+class TaskShardRouter:
+    """Routes task reads and writes to the shard that owns them."""
+    
+    def __init__(self, shard_urls: List[str]):
+        self.shards = [TaskShard(0)] + [
+            TaskShard(index, url) for index, url in enumerate(shard_urls, start=1)
+        ]
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(self.shards), thread_name_prefix="task-shard"
+        ) if self.enabled else None
+    
+    @property
+    def enabled(self) -> bool:
+        return len(self.shards) > 1
+    
+    def create_tables(self) -> None:
+        """Create the tasks, archived tasks, task tags, task closure and ID counter tables on every extra shard."""
+        for shard in self.shards[1:]:
+            create_tables(shard.engine, [
+                Task.__table__, ArchivedTask.__table__, TaskTag.__table__, TaskClosure.__table__,
+                TaskIdCounter.__table__
+            ])
+            logger.info(f"Task shard {shard.index} ready at {shard.url}")
+    
+    def hash_shard(self, owner_id: int) -> int:
+        """Default shard of an owner, stable across processes."""
+        return zlib.crc32(str(owner_id).encode()) % len(self.shards)
+    
+    def home_shard(self, task_id: int) -> Optional[int]:
+        """Shard encoded in a task ID, or None when the ID is out of range."""
+        index = task_id >> SHARD_ID_BITS if task_id and task_id > 0 else -1
+        return index if 0 <= index < len(self.shards) else None
+    
+    def shard_for_owner(self, db: Session, owner_id: int, for_write: bool = False) -> int:
+        """Shard holding an owner's tasks."""
+        if not self.enabled:
+            return 0
+        entry = db.get(TaskShardOwner, owner_id)
+        if entry is None:
+            return self.hash_shard(owner_id)
+        if for_write and entry.moving:
+            raise ValueError("Owner's tasks are being moved between shards, please retry shortly")
+        return entry.shard_index
+    
+    def shard_for_task(self, db: Session, task_id: int) -> Optional[int]:
+        """Shard holding a task, following forwards left by resharding."""
+        if not self.enabled:
+            return 0
+        forward = db.get(TaskShardForward, task_id)
+        if forward is not None:
+            return forward.shard_index
+        return self.home_shard(task_id)
+    
+    def check_writable(self, db: Session, owner_id: int) -> None:
+        """Reject writes for an owner whose tasks are currently being moved."""
+        if self.enabled:
+            self.shard_for_owner(db, owner_id, for_write=True)
+    
+    def _id_floor(self, db: Session, shard_db: Session, shard_index: int) -> int:
+        """Highest ID of a shard's range in use: by its hot or archived tasks, or by tasks moved away."""
+        base = self.shards[shard_index].id_base
+        floor = base
+        for model, session in ((Task, shard_db), (ArchivedTask, shard_db), (TaskShardForward, db)):
+            column = model.task_id if model is TaskShardForward else model.id
+            current = session.query(func.max(column)).filter(
+                column >= base, column < base + SHARD_ID_SPAN
+            ).scalar()
+            floor = max(floor, current or base)
+        return floor
+    
+    def next_task_id(self, db: Session, shard_db: Session, shard_index: int) -> int:
+        """
+        Allocate the next ID from a shard's range by bumping its counter row
+        (UPDATE ... RETURNING) in the caller's write transaction. Concurrent
+        creates serialize on the row instead of reading the same max(id),
+        and IDs of archived, deleted or moved tasks are never reissued.
+        """
+        bump = update(TaskIdCounter).where(TaskIdCounter.shard_index == shard_index).values(
+            last_id=TaskIdCounter.last_id + 1
+        ).returning(TaskIdCounter.last_id)
+        task_id = shard_db.execute(bump).scalar()
+        if task_id is None:
+            # First allocation on this shard: start above every ID already used
+            try:
+                with shard_db.begin_nested():
+                    shard_db.add(TaskIdCounter(
+                        shard_index=shard_index, last_id=self._id_floor(db, shard_db, shard_index)
+                    ))
+            except IntegrityError:
+                pass  # Seeded concurrently
+            task_id = shard_db.execute(bump).scalar()
+        return task_id
+    
+    @contextmanager
+    def session(self, db: Session, shard_index: int):
+        """
+        Session for a shard. Shard 0 reuses the caller's session so unsharded
+        deployments keep a single transaction per request.
+        """
+        if not self.enabled or shard_index == 0:
+            yield db
+            return
+        shard_db = self.shards[shard_index].session_factory()
+        try:
+            yield shard_db
+        finally:
+            shard_db.close()
+    
+    def scatter_gather(self, db: Session, query: Callable[[Session, int], List[Task]],
+                       skip: int, limit: int) -> List[Task]:
+        """
+        Run `query(shard_db, fetch)` on all shards in parallel and merge the
+        results by SHARD_ORDER. Each shard returns its first `skip + limit`
+        rows in that order, which is enough to cut the requested global page.
+        """
+        fetch = skip + limit
+        
+        def run(shard: TaskShard) -> List[Task]:
+            with self.session(db, shard.index) as shard_db:
+                return query(shard_db, fetch)
+        
+        results = list(self._executor.map(run, self.shards))
+        merged = heapq.merge(*results, key=shard_order_key)
+        
+        page = []
+        seen = set()
+        for task in merged:
+            # A task being moved can briefly exist on two shards
+            if task.id in seen:
+                continue
+            seen.add(task.id)
+            if len(seen) > skip:
+                page.append(task)
+                if len(page) == limit:
+                    break
+        return page
+    
+    def forget_owner(self, db: Session, owner_id: int) -> None:
+        """Drop a deleted owner's directory entry; the caller commits."""
+        if self.enabled:
+            db.query(TaskShardOwner).filter(TaskShardOwner.owner_id == owner_id).delete(
+                synchronize_session=False
+            )
+    
+    def move_owner(self, db: Session, owner_id: int, target: int, batch_size: int = 500) -> int:
+        """
+        Move all of an owner's tasks to another shard while the API keeps serving.
+        Writes for that owner are rejected with a retryable error during the
+        copy; reads keep going to the source shard until the switch.
+        """
+        if not 0 <= target < len(self.shards):
+            raise ValueError(f"Unknown shard: {target}")
+        
+        source = self.shard_for_owner(db, owner_id, for_write=True)
+        if source == target:
+            return 0
+        
+        entry = db.get(TaskShardOwner, owner_id)
+        if entry is None:
+            entry = TaskShardOwner(owner_id=owner_id, shard_index=source)
+            db.add(entry)
+        entry.moving = True
+        db.commit()
+        
+        moved_ids = []
+        try:
+            with self.session(db, source) as source_db, self.session(db, target) as target_db:
+                # Hot and archived tasks move together
+                for model in (Task, ArchivedTask):
+                    columns = [column.key for column in model.__table__.columns]
+                    last_id = 0
+                    while True:
+                        batch = source_db.query(model).filter(
+                            model.owner_id == owner_id, model.id > last_id
+                        ).order_by(model.id).limit(batch_size).all()
+                        if not batch:
+                            break
+                        for task in batch:
+                            target_db.add(model(**{key: getattr(task, key) for key in columns}))
+                        batch_ids = [task.id for task in batch]
+                        for tag in source_db.query(TaskTag).filter(TaskTag.task_id.in_(batch_ids)):
+                            target_db.add(TaskTag(task_id=tag.task_id, tag=tag.tag))
+                        # Subtasks share the owner, so whole hierarchies move
+                        for link in source_db.query(TaskClosure).filter(TaskClosure.descendant_id.in_(batch_ids)):
+                            target_db.add(TaskClosure(
+                                ancestor_id=link.ancestor_id, descendant_id=link.descendant_id, depth=link.depth
+                            ))
+                        target_db.commit()
+                        last_id = batch[-1].id
+                        moved_ids.extend(task.id for task in batch)
+                
+                # Point lookups and owner routing at the target, then drop the source copies
+                for task_id in moved_ids:
+                    forward = db.get(TaskShardForward, task_id)
+                    if self.home_shard(task_id) == target:
+                        if forward is not None:
+                            db.delete(forward)
+                    elif forward is None:
+                        db.add(TaskShardForward(task_id=task_id, shard_index=target))
+                    else:
+                        forward.shard_index = target
+                entry.shard_index = target
+                entry.moving = False
+                db.commit()
+                
+                for model in (Task, ArchivedTask):
+                    owned = select(model.id).where(model.owner_id == owner_id)
+                    source_db.query(TaskTag).filter(TaskTag.task_id.in_(owned)).delete(synchronize_session=False)
+                    source_db.query(TaskClosure).filter(TaskClosure.descendant_id.in_(owned)).delete(
+                        synchronize_session=False
+                    )
+                    source_db.query(model).filter(model.owner_id == owner_id).delete(
+                        synchronize_session=False
+                    )
+                source_db.commit()
+                
+        except Exception as e:
+            logger.error(f"Error moving owner {owner_id} from shard {source} to {target}: {e}")
+            db.rollback()
+            if entry.shard_index == source and moved_ids:
+                with self.session(db, target) as target_db:
+                    for key in (Task.id, ArchivedTask.id, TaskTag.task_id, TaskClosure.descendant_id):
+                        target_db.query(key.class_).filter(key.in_(moved_ids)).delete(
+                            synchronize_session=False
+                        )
+                    target_db.commit()
+            entry.moving = False
+            db.commit()
+            raise
+        
+        logger.info(f"Moved {len(moved_ids)} tasks of owner {owner_id} from shard {source} to {target}")
+        return len(moved_ids)
+    
+    def pin_existing_owners(self, db: Session) -> int:
+        """
+        Pin owners that already have tasks on the primary to shard 0.
+        Run once when enabling sharding on an existing database.
+        """
+        pinned = 0
+        owner_ids = [row[0] for row in db.query(Task.owner_id).distinct().all()]
+        for owner_id in owner_ids:
+            if db.get(TaskShardOwner, owner_id) is None and self.hash_shard(owner_id) != 0:
+                db.add(TaskShardOwner(owner_id=owner_id, shard_index=0))
+                pinned += 1
+        db.commit()
+        return pinned
+
+
+# Global task shard router
+task_shards = TaskShardRouter(settings.shard_urls)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point for the resharding tool."""
+    parser = argparse.ArgumentParser(description="Task shard maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="Show shards and their task counts")
+    move = commands.add_parser("move", help="Move an owner's tasks to another shard")
+    move.add_argument("owner_id", type=int)
+    move.add_argument("shard", type=int)
+    move.add_argument("--batch-size", type=int, default=500)
+    commands.add_parser("pin-existing", help="Pin owners with tasks on the primary to shard 0")
+    args = parser.parse_args(argv)
+    
+    setup_logging()
+    init_db()
+    task_shards.create_tables()
+    
+    db = SessionLocal()
+    try:
+        if args.command == "status":
+            for shard in task_shards.shards:
+                with task_shards.session(db, shard.index) as shard_db:
+                    count = shard_db.query(func.count(Task.id)).scalar()
+                print(f"shard {shard.index}: {count} tasks ({shard.url})")
+        elif args.command == "move":
+            moved = task_shards.move_owner(db, args.owner_id, args.shard, batch_size=args.batch_size)
+            print(f"Moved {moved} tasks of owner {args.owner_id} to shard {args.shard}")
+        elif args.command == "pin-existing":
+            print(f"Pinned {task_shards.pin_existing_owners(db)} owners to shard 0")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
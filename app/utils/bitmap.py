@@ -0,0 +1,106 @@
+from typing import Dict, Iterable, Iterator, List
+
+# Values are split like in Roaring bitmaps: the high bits select a chunk,
+# the low CHUNK_BITS bits a bit inside it. Each chunk is a Python int used
+# as a bit set, so AND/OR/ANDNOT run in C over whole machine words, and
+# empty chunks are not stored.
+CHUNK_BITS = 16
+_LOW_MASK = (1 << CHUNK_BITS) - 1
+_CHUNK_BYTES = (1 << CHUNK_BITS) // 8
+
+# Positions of the set bits of every byte value, for extracting members
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+class Bitmap:
+    """Compressed set of non-negative integers (task IDs) with fast set algebra."""
+    
+    __slots__ = ("chunks",)
+    
+    def __init__(self, values: Iterable[int] = ()):
+        self.chunks: Dict[int, int] = {}
+        for value in values:
+            self.add(value)
+    
+    @classmethod
+    def _of(cls, chunks: Dict[int, int]) -> "Bitmap":
+        bitmap = cls.__new__(cls)
+        bitmap.chunks = chunks
+        return bitmap
+    
+    def add(self, value: int) -> None:
+        key = value >> CHUNK_BITS
+        self.chunks[key] = self.chunks.get(key, 0) | 1 << (value & _LOW_MASK)
+    
+    def discard(self, value: int) -> None:
+        key = value >> CHUNK_BITS
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            chunk &= ~(1 << (value & _LOW_MASK))
+            if chunk:
+                self.chunks[key] = chunk
+            else:
+                del self.chunks[key]
+    
+    def __contains__(self, value: int) -> bool:
+        return bool(self.chunks.get(value >> CHUNK_BITS, 0) >> (value & _LOW_MASK) & 1)
+    
+    def __len__(self) -> int:
+        return sum(chunk.bit_count() for chunk in self.chunks.values())
+    
+    def __bool__(self) -> bool:
+        return bool(self.chunks)
+    
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        small, large = sorted((self.chunks, other.chunks), key=len)
+        chunks = {}
+        for key, chunk in small.items():
+            both = chunk & large.get(key, 0)
+            if both:
+                chunks[key] = both
+        return Bitmap._of(chunks)
+    
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        chunks = dict(self.chunks)
+        for key, chunk in other.chunks.items():
+            chunks[key] = chunks.get(key, 0) | chunk
+        return Bitmap._of(chunks)
+    
+    def __sub__(self, other: "Bitmap") -> "Bitmap":
+        chunks = {}
+        for key, chunk in self.chunks.items():
+            rest = chunk & ~other.chunks.get(key, 0)
+            if rest:
+                chunks[key] = rest
+        return Bitmap._of(chunks)
+    
+    def copy(self) -> "Bitmap":
+        return Bitmap._of(dict(self.chunks))
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.slice(0, len(self)))
+    
+    def slice(self, skip: int, limit: int) -> List[int]:
+        """Members `skip` to `skip + limit` in ascending order."""
+        values: List[int] = []
+        for key in sorted(self.chunks):
+            if len(values) >= limit:
+                break
+            chunk = self.chunks[key]
+            count = chunk.bit_count()
+            if skip >= count:
+                # Whole chunks before the page are skipped by their cardinality
+                skip -= count
+                continue
+            base = key << CHUNK_BITS
+            for index, byte in enumerate(chunk.to_bytes(_CHUNK_BYTES, "little")):
+                if not byte:
+                    continue
+                for bit in _BYTE_BITS[byte]:
+                    if skip:
+                        skip -= 1
+                    elif len(values) < limit:
+                        values.append(base + index * 8 + bit)
+                    else:
+                        return values
+        return values
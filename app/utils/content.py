@@ -0,0 +1,108 @@
+"""
+Content negotiation of the action endpoints: JSON (the default) or
+MessagePack bodies.
+
+A request whose Content-Type is a MessagePack type is decoded with
+MessagePack and validated like the JSON body; an Accept header preferring
+MessagePack makes APIResponse encode the envelope with it. MessagePack
+carries datetimes as native timestamps (naive datetimes are UTC) and enums
+as their values, skipping jsonable_encoder and the string formatting of
+JSON.
+"""
+from contextvars import ContextVar
+from datetime import date, datetime, time, timezone
+from enum import Enum
+from typing import Any, Optional
+import msgpack
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, TypeAdapter
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+_MSGPACK_TYPES = {MSGPACK, "application/x-msgpack", "application/vnd.msgpack"}
+
+# Media type of the responses of the current request, set by negotiate()
+_response_type: ContextVar[str] = ContextVar("response_type", default=JSON)
+
+
+def _media_type(header: str) -> str:
+    return header.split(";", 1)[0].strip().lower()
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return bool(content_type) and _media_type(content_type) in _MSGPACK_TYPES
+
+
+def preferred_type(accept: Optional[str]) -> str:
+    """MSGPACK if the Accept header ranks a MessagePack type above JSON, else JSON."""
+    if not accept or "msgpack" not in accept:
+        return JSON
+    best, best_quality = JSON, 0.0
+    for media_range in accept.split(","):
+        media_type, *params = media_range.split(";")
+        media_type = media_type.strip().lower()
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        # Ties go to the first listed type
+        if media_type in _MSGPACK_TYPES and quality > best_quality:
+            best, best_quality = MSGPACK, quality
+        elif media_type in (JSON, "application/*", "*/*") and quality > best_quality:
+            best, best_quality = JSON, quality
+    return best
+
+
+def negotiate(request: Request) -> str:
+    """Choose the response media type of the current request from its Accept header."""
+    media_type = preferred_type(request.headers.get("accept"))
+    _response_type.set(media_type)
+    return media_type
+
+
+def response_type() -> str:
+    return _response_type.get()
+
+
+def _encode(value: Any) -> Any:
+    """msgpack `default` hook for the types it does not encode natively."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return jsonable_encoder(value)
+
+
+def packb(content: Any) -> bytes:
+    return msgpack.packb(content, default=_encode)
+
+
+def unpackb(body: bytes) -> Any:
+    """Decode a MessagePack body; timestamps become UTC datetimes."""
+    try:
+        return msgpack.unpackb(body, timestamp=3)
+    except Exception:
+        raise ValueError("Invalid MessagePack body")
+
+
+def validate_action(adapter: TypeAdapter, request: Request, body: bytes) -> Any:
+    """
+    Validate an action body in the request's Content-Type. Raises
+    ValidationError, or ValueError for an undecodable MessagePack body.
+    """
+    if is_msgpack(request.headers.get("content-type")):
+        return adapter.validate_python(unpackb(body))
+    return adapter.validate_json(body)
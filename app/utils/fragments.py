@@ -0,0 +1,122 @@
+"""
+Cache of pre-serialized JSON fragments of task and user rows.
+
+View pages mostly repeat the same hot rows. Each row, shaped as a view
+returns it, is rendered to JSON once and cached under (shape, table, id,
+version, created_at): every edit bumps the version, so a changed row
+misses and its stale fragments age out of the LRU without explicit
+invalidation. created_at guards against SQLite reusing the ID of a
+deleted row. JSON responses are assembled by splicing the cached bytes
+into the envelope; MessagePack responses are built from dicts as before.
+"""
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Union
+from fastapi.encoders import jsonable_encoder
+from app.config import settings
+from app.utils.content import JSON, response_type
+from app.utils.metrics import metrics
+
+
+class Fragment(bytes):
+    """JSON of one value, spliced verbatim into a response."""
+
+
+def dumps(value: Any) -> bytes:
+    """JSON bytes exactly as JSONResponse renders them."""
+    return json.dumps(
+        value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def has_fragments(data: Any) -> bool:
+    """Whether a response's data holds fragments (itself, or as a value or list of its dict)."""
+    if isinstance(data, Fragment):
+        return True
+    if isinstance(data, dict):
+        for value in data.values():
+            if isinstance(value, Fragment) or (isinstance(value, list) and value and isinstance(value[0], Fragment)):
+                return True
+    return False
+
+
+def splice(value: Any) -> bytes:
+    """Render `value` as JSON, copying fragments instead of encoding them."""
+    if isinstance(value, Fragment):
+        return value
+    if isinstance(value, dict):
+        return b"{" + b",".join(dumps(str(key)) + b":" + splice(item) for key, item in value.items()) + b"}"
+    if isinstance(value, list):
+        if value and isinstance(value[0], Fragment):
+            # Rows from serialize_rows, all fragments: one join
+            return b"[" + b",".join(value) + b"]"
+        return b"[" + b",".join(splice(item) for item in value) + b"]"
+    return dumps(jsonable_encoder(value))
+
+
+class FragmentCache:
+    """Thread-safe LRU of row fragments."""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._fragments: "OrderedDict[Tuple, Fragment]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._fragments)
+    
+    def get_many(self, build: Callable[..., Dict[str, Any]], rows: Sequence[Any],
+                 columns: Sequence[Sequence[Any]] = ()) -> List[Fragment]:
+        """
+        The fragments of `build(row, *extra)` for each row and its values in
+        `columns`, rendered for the rows that miss. A page takes the lock
+        once for its lookups and once for its misses.
+        """
+        keys = [(build, row.__tablename__, row.id, getattr(row, "version", None), row.created_at) for row in rows]
+        with self._lock:
+            fragments = [self._fragments.get(key) for key in keys]
+            for key, fragment in zip(keys, fragments):
+                if fragment is not None:
+                    self._fragments.move_to_end(key)
+        
+        misses = {}
+        for index, extra in enumerate(zip(rows, *columns)):
+            if fragments[index] is None:
+                fragments[index] = misses[keys[index]] = Fragment(dumps(jsonable_encoder(build(*extra))))
+        if misses:
+            with self._lock:
+                self._fragments.update(misses)
+                while len(self._fragments) > self.max_entries:
+                    self._fragments.popitem(last=False)
+        metrics.increment("fragments.hits", len(keys) - len(misses))
+        metrics.increment("fragments.misses", len(misses))
+        return fragments
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+
+
+# Global fragment cache shared by the view handlers
+fragment_cache = FragmentCache(settings.fragment_cache_size)
+
+metrics.register_gauge("fragments.entries", lambda: len(fragment_cache))
+metrics.register_gauge("fragments.hit_ratio", lambda: metrics.ratio("fragments.hits", "fragments.misses"))
+
+
+def serialize_rows(build: Callable[..., Dict[str, Any]], rows: Sequence[Any],
+                   *columns: Sequence[Any]) -> List[Union[Fragment, Dict[str, Any]]]:
+    """
+    The rows of a view, each shaped by `build(row, *values)` with its
+    values from `columns`: cached fragments for JSON responses, the dicts
+    themselves otherwise. A shape must only depend on the row's version.
+    """
+    if not settings.fragment_cache_size or response_type() != JSON:
+        return [build(*values) for values in zip(rows, *columns)]
+    return fragment_cache.get_many(build, rows, columns)
+
+
+def serialize(build: Callable[..., Dict[str, Any]], row: Any, *args) -> Union[Fragment, Dict[str, Any]]:
+    """One row of a view, like serialize_rows."""
+    return serialize_rows(build, [row], *([arg] for arg in args))[0]
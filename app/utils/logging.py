@@ -6,7 +6,11 @@ from app.config import settings
 
 
 def setup_logging():
-    """Setup logging configuration with both file and console handlers."""
+    """
+    Setup logging configuration with both file and console handlers.
+    Called explicitly by the entry points (app.main, start.py, CLIs) rather
+    than on import, so importing any module stays free of side effects.
+    """
     
     # Create logs directory if it doesn't exist
     os.makedirs(os.path.dirname(settings.log_file), exist_ok=True)
@@ -55,6 +59,3 @@ def get_logger(name: str) -> logging.Logger:
     """Get a logger instance with the specified name."""
     return logging.getLogger(name)
 
-
-# Initialize logging when module is imported
-setup_logging()
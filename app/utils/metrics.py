@@ -0,0 +1,43 @@
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict
+
+
+class Metrics:
+    """Process-wide counters and computed gauges, exposed on /metrics."""
+    
+    def __init__(self):
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, Callable[[], Any]] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increase a counter."""
+        with self._lock:
+            self._counters[name] += amount
+    
+    def get(self, name: str) -> int:
+        """Current value of a counter."""
+        return self._counters.get(name, 0)
+    
+    def register_gauge(self, name: str, func: Callable[[], Any]) -> None:
+        """Register a value computed each time a snapshot is taken."""
+        self._gauges[name] = func
+    
+    def ratio(self, numerator: str, *others: str) -> float:
+        """numerator / (numerator + others), or 0.0 before any samples."""
+        hits = self.get(numerator)
+        total = hits + sum(self.get(name) for name in others)
+        return round(hits / total, 4) if total else 0.0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """All counters and gauges as a flat dict."""
+        with self._lock:
+            data: Dict[str, Any] = dict(self._counters)
+        for name, func in self._gauges.items():
+            data[name] = func()
+        return dict(sorted(data.items()))
+
+
+# Global metrics registry
+metrics = Metrics()
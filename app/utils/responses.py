@@ -1,16 +1,38 @@
 from typing import Any, Dict, Optional
 from fastapi import HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
+from app.utils.content import JSON, MSGPACK, packb, response_type
+from app.utils.fragments import has_fragments, splice
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
 
+class MsgPackResponse(Response):
+    """A response encoded with MessagePack (see app.utils.content)."""
+    media_type = MSGPACK
+    
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+
+def _respond(content: Dict[str, Any], status_code: int, headers: Optional[Dict[str, str]] = None) -> Response:
+    """The envelope in the media type negotiated for the current request."""
+    if response_type() == MSGPACK:
+        return MsgPackResponse(content=content, status_code=status_code, headers=headers)
+    if has_fragments(content.get("data")):
+        # Cached row fragments are copied into the body, not encoded again
+        return Response(content=splice(content), status_code=status_code, headers=headers, media_type=JSON)
+    return JSONResponse(content=jsonable_encoder(content), status_code=status_code, headers=headers)
+
+
 class APIResponse:
     """Custom response handler that ensures only 200/500 status codes."""
     
     @staticmethod
-    def success(data: Any = None, message: str = "Success") -> JSONResponse:
+    def success(data: Any = None, message: str = "Success") -> Response:
         """Return a successful response with 200 status."""
         response_data = {
             "success": True,
@@ -18,10 +40,10 @@ class APIResponse:
             "data": data
         }
         logger.info(f"Success response: {message}")
-        return JSONResponse(content=response_data, status_code=200)
+        return _respond(response_data, 200)
     
     @staticmethod
-    def error(reason: str, status_code: int = 200) -> JSONResponse:
+    def error(reason: str, status_code: int = 200) -> Response:
         """
         Return an error response.
         Note: Even for errors, we return 200 status with error details in 'reason' field.
@@ -40,15 +62,64 @@ class APIResponse:
         else:
             logger.warning(f"Client error: {reason}")
             
-        return JSONResponse(content=response_data, status_code=status_code)
+        return _respond(response_data, status_code)
     
     @staticmethod
-    def server_error(reason: str = "Internal server error") -> JSONResponse:
+    def validation_error(exc: ValidationError) -> Response:
+        """Return a 200 error response describing the first validation problem."""
+        return APIResponse.error(describe_validation_error(exc))
+    
+    @staticmethod
+    def server_error(reason: str = "Internal server error") -> Response:
         """Return a server error response with 500 status."""
         return APIResponse.error(reason, status_code=500)
+    
+    @staticmethod
+    def overloaded(reason: str, retry_after: int) -> JSONResponse:
+        """
+        Return a 500 response for a shed request with a retry hint.
+        Not logged per request (shedding is counted in metrics) and always
+        JSON, as it is sent before content negotiation, so that rejecting
+        load stays cheap.
+        """
+        response_data = {
+            "success": False,
+            "reason": reason,
+            "retry_after": retry_after
+        }
+        return JSONResponse(
+            content=response_data,
+            status_code=500,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+def describe_validation_error(exc: ValidationError) -> str:
+    """Turn a request validation error into a short, user-facing reason."""
+    error = exc.errors()[0]
+    loc = [str(part) for part in error["loc"]]
+    # Drop the action tag and the "data" wrapper from the location
+    if "data" in loc:
+        loc = loc[loc.index("data") + 1:]
+    field = ".".join(loc) or "data"
+    
+    error_type = error["type"]
+    if error_type == "union_tag_invalid":
+        return f"Invalid action: {error['ctx']['tag']}"
+    if error_type == "literal_error" and field == "action":
+        return f"Invalid action: {error['input']}"
+    if error_type == "union_tag_not_found":
+        return "Missing required field: action"
+    if error_type == "missing":
+        return f"Missing required field: {field}"
+    if error_type == "enum":
+        return f"Invalid {field}: {error['input']}"
+    if error_type == "json_invalid":
+        return "Invalid JSON body"
+    return f"Invalid value for {field}: {error['msg']}"
 
 
-def handle_exception(exc: Exception) -> JSONResponse:
+def handle_exception(exc: Exception) -> Response:
     """Handle exceptions and return appropriate responses."""
     logger.error(f"Exception occurred: {str(exc)}", exc_info=True)
     
@@ -0,0 +1,100 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from pydantic import BaseModel
+from starlette.responses import Response
+from app.config import settings
+from app.utils.metrics import metrics
+
+
+def flight_key(router: str, action: str, data: Optional[BaseModel], media_type: str = "application/json") -> str:
+    """
+    Normalized key of an action request.
+    Dumping the validated model fills defaults and fixes field order, so
+    requests that differ only in formatting share a key. Requests that
+    negotiated different response media types do not.
+    """
+    return f"{router}:{action}:{media_type}:{data.model_dump_json() if data is not None else ''}"
+
+
+def _copy(response: Response) -> Response:
+    """A new response carrying the same already-serialized body."""
+    return Response(
+        content=response.body,
+        status_code=response.status_code,
+        media_type=response.media_type
+    )
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent requests onto one computation.
+    The first request for a key (the leader) runs `compute`; requests that
+    arrive while it is in flight (followers) await the same future and get a
+    copy of the serialized response. With a grace window, a successful
+    response is also served to identical requests for `grace_seconds` after
+    it completed.
+    """
+    
+    def __init__(self, name: str, grace_seconds: float = 0.0):
+        self.name = name
+        self.grace_seconds = grace_seconds
+        self._flights: Dict[str, asyncio.Future] = {}
+        self._recent: Dict[str, Tuple[float, Response]] = {}
+        metrics.register_gauge(
+            f"coalesce.{name}.ratio",
+            lambda: metrics.ratio(f"coalesce.{name}.followers", f"coalesce.{name}.leaders")
+        )
+    
+    async def do(self, key: str, compute: Callable[[], Awaitable[Response]]) -> Response:
+        """Return the response for `key`, sharing an in-flight or recent computation."""
+        if self.grace_seconds:
+            recent = self._recent.get(key)
+            if recent is not None:
+                if recent[0] > time.monotonic():
+                    metrics.increment(f"coalesce.{self.name}.followers")
+                    return _copy(recent[1])
+                del self._recent[key]
+        
+        flight = self._flights.get(key)
+        if flight is not None:
+            metrics.increment(f"coalesce.{self.name}.followers")
+            try:
+                # Shield so a disconnecting follower never cancels the leader's work
+                return _copy(await asyncio.shield(flight))
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise
+                # The leader was cancelled; compute independently
+                return await compute()
+        
+        metrics.increment(f"coalesce.{self.name}.leaders")
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            response = await compute()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            # Mark retrieved so an unobserved failure is not reported at GC
+            flight.exception()
+            raise
+        else:
+            flight.set_result(response)
+            if self.grace_seconds and response.status_code == 200:
+                self._prune()
+                self._recent[key] = (time.monotonic() + self.grace_seconds, response)
+            return response
+        finally:
+            del self._flights[key]
+    
+    def _prune(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (until, _) in self._recent.items() if until <= now]:
+            del self._recent[key]
+
+
+# Shared by the routers' read-only "view" actions
+view_flights = SingleFlight("view", settings.coalesce_grace_ms / 1000)
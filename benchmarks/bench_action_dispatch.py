@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: request validation plus dispatch overhead per request.
+
+Compares the previous path (FastAPI-style model with a free-form `data`
+dict, hand-written required-field checks, a second TaskCreate validation
+and an if/elif chain) with the discriminated-union TypeAdapter and the
+dispatch table used by app/api/tasks.py. No database work is included.
+
+Usage: python benchmarks/bench_action_dispatch.py [iterations]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from pydantic import BaseModel
+from app.models.task import TaskStatus, TaskPriority
+from app.schemas.task import TaskCreate, task_action_adapter
+
+BODIES = [
+    json.dumps({"action": "create", "data": {
+        "title": "Write report", "description": "Quarterly numbers", "status": "pending",
+        "priority": "high", "due_date": "2030-01-01T12:00:00", "owner_id": 7
+    }}).encode(),
+    json.dumps({"action": "edit", "data": {"id": 42, "status": "in_progress", "priority": "urgent"}}).encode(),
+    json.dumps({"action": "view", "data": {"owner_id": 7, "page": 2, "size": 20}}).encode(),
+]
+
+
+class LegacyActionRequest(BaseModel):
+    action: str
+    data: Optional[dict] = None
+
+
+def legacy_create(data):
+    for field in ["title", "owner_id"]:
+        if field not in data:
+            return None
+    task = TaskCreate(
+        title=data["title"],
+        description=data.get("description"),
+        status=data.get("status", TaskStatus.PENDING),
+        priority=data.get("priority", TaskPriority.MEDIUM),
+        due_date=data.get("due_date"),
+        owner_id=data["owner_id"]
+    )
+    return task.status in TaskStatus and task.priority in TaskPriority
+
+
+def legacy_edit(data):
+    update = {field: data[field] for field in ["title", "description", "status", "priority", "due_date"]
+              if field in data}
+    return update.get("status", "pending") in {status.value for status in TaskStatus}
+
+
+def legacy_view(data):
+    page = data.get("page", 1)
+    size = data.get("size", 10)
+    return (max(page, 1) - 1) * size
+
+
+def legacy(body):
+    request = LegacyActionRequest.model_validate(json.loads(body))
+    data = request.data or {}
+    if request.action == "create":
+        return legacy_create(data)
+    elif request.action == "edit":
+        return legacy_edit(data)
+    elif request.action == "view":
+        return legacy_view(data)
+
+
+TABLE = {
+    "create": lambda data: data.owner_id,
+    "edit": lambda data: data.to_update(),
+    "view": lambda data: data.skip,
+}
+
+
+def typed(body):
+    request = task_action_adapter.validate_json(body)
+    return TABLE[request.action](request.data)
+
+
+def timed(label, func, iterations):
+    for body in BODIES:
+        func(body)
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(BODIES[i % len(BODIES)])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<50} {elapsed / iterations * 1e6:8.2f} µs/request")
+    return elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 60000
+    print(f"Validation + dispatch over create/edit/view bodies ({iterations} requests)")
+    old = timed("  dict payload + manual checks + if/elif", legacy, iterations)
+    new = timed("  TypeAdapter.validate_json + dispatch table", typed, iterations)
+    print(f"  speedup: {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
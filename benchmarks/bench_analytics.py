@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark: task analytics over a columnar snapshot at 10M tasks.
+
+Times the vectorized per-owner aggregation (AnalyticsReport) over a
+synthetic snapshot of N tasks, against the same aggregation written as a
+Python loop over row tuples (measured on a sample and scaled to N, which
+still flatters the loop: ORM Task objects would be slower). Then times
+what a request does, a page of owners and one owner's lookup, and the
+snapshot load from SQLite on a smaller table.
+
+Usage: python benchmarks/bench_analytics.py [tasks] [owners] [load_tasks]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import numpy as np
+from app.database import SessionLocal, engine, init_db
+from app.services.analytics import AnalyticsReport, TaskSnapshot, WEEK_SECONDS, _COMPLETED, _OPEN
+
+DAY = 86400
+PYTHON_SAMPLE = 500000
+
+
+def synthetic(count, owners, now):
+    rng = np.random.default_rng(7)
+    created = now - rng.uniform(0, 365 * DAY, count)
+    status = rng.integers(0, 4, count).astype(np.int8)
+    completed = np.where(status == _COMPLETED, created + rng.exponential(3 * DAY, count), np.nan)
+    due = np.where(rng.random(count) < 0.6, created + rng.uniform(0, 60 * DAY, count), np.nan)
+    return TaskSnapshot(
+        owner_id=rng.integers(1, owners + 1, count),
+        status=status,
+        priority=rng.integers(0, 4, count).astype(np.int8),
+        created=created,
+        due=due,
+        completed=completed,
+        taken_at=now
+    )
+
+
+def python_report(rows, now, weeks):
+    """The same per-owner aggregates as AnalyticsReport, one row at a time."""
+    first_week = (now - 4 * DAY) // WEEK_SECONDS * WEEK_SECONDS + 4 * DAY - (weeks - 1) * WEEK_SECONDS
+    owners = defaultdict(lambda: {"tasks": 0, "open": 0, "overdue": 0, "leads": [], "weeks": [0] * weeks})
+    for owner_id, status, priority, created, due, completed in rows:
+        owner = owners[owner_id]
+        owner["tasks"] += 1
+        if status in _OPEN:
+            owner["open"] += 1
+            if due == due and due < now:
+                owner["overdue"] += 1
+        elif status == _COMPLETED and completed == completed:
+            owner["leads"].append(completed - created)
+            week = int((completed - first_week) // WEEK_SECONDS)
+            if 0 <= week < weeks:
+                owner["weeks"][week] += 1
+    for owner in owners.values():
+        leads = sorted(owner["leads"])
+        owner["lead_mean"] = sum(leads) / len(leads) if leads else None
+        owner["lead_median"] = (leads[(len(leads) - 1) // 2] + leads[len(leads) // 2]) / 2 if leads else None
+        owner["overdue_ratio"] = owner["overdue"] / owner["open"] if owner["open"] else 0.0
+    return owners
+
+
+def fill_database(count, owners, now):
+    """Insert `count` tasks with raw sqlite3, bypassing the ORM."""
+    path = engine.url.database
+    connection = sqlite3.connect(path)
+    connection.executemany(
+        "INSERT INTO users (id, username, email, full_name, hashed_password, is_active, version) "
+        "VALUES (?, ?, ?, 'Bench', 'x', 1, 1)",
+        [(owner, f"user{owner}", f"user{owner}@example.com") for owner in range(1, owners + 1)]
+    )
+    statuses = ["PENDING", "IN_PROGRESS", "COMPLETED", "CANCELLED"]
+    priorities = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+    stamp = lambda seconds: time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(seconds))
+    random.seed(7)
+    rows = []
+    for _ in range(count):
+        created = now - random.uniform(0, 365 * DAY)
+        status = random.choice(statuses)
+        rows.append((
+            "task", status, random.choice(priorities), random.randint(1, owners), 1,
+            stamp(created), stamp(created + 30 * DAY) if random.random() < 0.6 else None,
+            stamp(created + random.expovariate(1 / (3 * DAY))) if status == "COMPLETED" else None
+        ))
+    connection.executemany(
+        "INSERT INTO tasks (title, status, priority, owner_id, version, created_at, due_date, completed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    connection.commit()
+    connection.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    owners = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    load_count = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000_000
+    now = time.time()
+    
+    print(f"Analytics over {count} tasks of {owners} owners")
+    snapshot = synthetic(count, owners, now)
+    start = time.perf_counter()
+    report = AnalyticsReport(snapshot, 12)
+    vectorized = time.perf_counter() - start
+    print(f"  vectorized aggregation (NumPy)        {vectorized:8.2f} s")
+    
+    sample = min(PYTHON_SAMPLE, count)
+    rows = list(zip(*(column[:sample].tolist() for column in (
+        snapshot.owner_id, snapshot.status, snapshot.priority, snapshot.created, snapshot.due, snapshot.completed
+    ))))
+    start = time.perf_counter()
+    python_report(rows, now, 12)
+    looped = (time.perf_counter() - start) * count / sample
+    print(f"  Python loop over tuples (scaled)      {looped:8.2f} s")
+    print(f"  speedup: {looped / vectorized:.1f}x")
+    del rows
+    
+    iterations = 10000
+    start = time.perf_counter()
+    for i in range(iterations):
+        report.owner(i % owners + 1)
+    lookup = (time.perf_counter() - start) / iterations
+    start = time.perf_counter()
+    for i in range(iterations // 10):
+        report.owners_page((i * 20) % owners, 20)
+    page = (time.perf_counter() - start) / (iterations // 10)
+    print(f"  request: one owner {lookup * 1e6:.1f} µs, page of 20 owners {page * 1e6:.1f} µs")
+    del snapshot
+    
+    if load_count:
+        init_db()
+        fill_database(load_count, min(owners, load_count), now)
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            loaded = TaskSnapshot.load(db)
+            elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+        print(f"Snapshot load from SQLite: {len(loaded)} tasks in {elapsed:.2f} s "
+              f"({len(loaded) / elapsed / 1e6:.2f}M rows/s, ~{count / len(loaded) * elapsed:.0f} s at {count})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: cost of authenticating one request.
+
+Compares checking the password on every request (bcrypt verify, what any
+per-request auth built on UserService.authenticate_user would cost) with
+verifying a signed token without and with the verified-token cache used
+by app/auth.py. No database work is included.
+
+Usage: python benchmarks/bench_auth.py [iterations]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.auth import TokenSigner
+from app.services.user_service import UserService
+
+
+def timed(label, func, iterations):
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = (time.perf_counter() - start) / iterations
+    print(f"{label:<40} {elapsed * 1e6:12.2f} µs/request")
+    return elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    user = SimpleNamespace(id=1, username="alice")
+    hashed = UserService.hash_password("secret123")
+    uncached = TokenSigner("bench-secret", "", "HS256", 30, cache_size=0)
+    cached = TokenSigner("bench-secret", "", "HS256", 30, cache_size=10000)
+    token, _ = cached.issue(user)
+    
+    print(f"Authenticating one request ({iterations} token checks, 20 bcrypt checks)")
+    bcrypt = timed("  bcrypt password check", lambda: UserService.verify_password("secret123", hashed), 20)
+    jwt = timed("  JWT verify (no cache)", lambda: uncached.verify(token), iterations)
+    lru = timed("  JWT verify (verified-token cache)", lambda: cached.verify(token), iterations)
+    print(f"  speedup vs bcrypt: {bcrypt / jwt:.0f}x uncached, {bcrypt / lru:.0f}x cached")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: client throughput against the application served by uvicorn in
+this process, over real localhost TCP.
+
+- a new connection per call (what bare `requests.post` does)
+- TaskAPIClient, one call at a time on a kept-alive connection
+- TaskAPIClient.batch and AsyncTaskAPIClient.batch over the pool
+- idempotent creates through batch, retried on server errors
+
+Usage: python benchmarks/bench_client.py [calls]
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+import uvicorn
+from app.main import app
+from client import AsyncTaskAPIClient, TaskAPIClient
+
+
+def serve():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def report(label, count, elapsed):
+    print(f"  {label:<42} {count / elapsed:8.0f} calls/s")
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    server, base_url = serve()
+    try:
+        with TaskAPIClient(base_url) as api:
+            user = api.users.create(
+                username="bench", email="bench@example.com", full_name="Bench", password="password123"
+            )
+            task = api.tasks.create(title="Bench", owner_id=user["id"])
+            view = ("tasks", "view", {"id": task["id"]})
+            print(f"{count} task views")
+            
+            def connection_per_call():
+                for _ in range(count):
+                    httpx.post(f"{base_url}/api/tasks/", json={"action": "view", "data": view[2]})
+            
+            report("new connection per call (httpx.post)", count, timed(connection_per_call))
+            report("TaskAPIClient, sequential", count, timed(lambda: [api.action(*view) for _ in range(count)]))
+            report("TaskAPIClient.batch", count, timed(lambda: api.batch([view] * count)))
+            
+            async def async_batch():
+                async with AsyncTaskAPIClient(base_url) as async_api:
+                    await async_api.batch([view] * count)
+            
+            report("AsyncTaskAPIClient.batch", count, timed(lambda: asyncio.run(async_batch())))
+            
+            creates = [("tasks", "create", {"title": f"Task {i}", "owner_id": user["id"]}) for i in range(count)]
+            report("TaskAPIClient.batch, idempotent creates", count, timed(lambda: api.batch(creates)))
+            total = sum(1 for _ in api.tasks.iter(owner_id=user["id"]))
+            print(f"  tasks listed by iterator: {total} (expected {count + 1})")
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: view responses assembled from cached row fragments.
+
+Renders the JSON response of a page of tasks the way view_task does, once
+building each row's dict and encoding the envelope (no cache), and once
+splicing cached fragments into it (warm cache), then reports the cost per
+row. The rows are transient Task instances, so no database is involved.
+
+Usage: python benchmarks/bench_fragments.py [page_size] [iterations]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.api.tasks import _task_row
+from app.config import settings
+from app.models.task import Task, TaskPriority, TaskStatus
+from app.utils.fragments import serialize_rows
+from app.utils.responses import APIResponse
+
+
+def tasks(count):
+    now = datetime(2026, 1, 1, 12, 0)
+    return [Task(
+        id=i + 1,
+        title=f"Task number {i}",
+        description="Follow up with the customer about the renewal" if i % 2 else None,
+        status=list(TaskStatus)[i % 4],
+        priority=list(TaskPriority)[i % 4],
+        due_date=now + timedelta(days=i) if i % 3 else None,
+        owner_id=42,
+        version=1,
+        created_at=now - timedelta(hours=i)
+    ) for i in range(count)]
+
+
+def render(page):
+    return APIResponse.success(
+        data={
+            "tasks": serialize_rows(_task_row, page),
+            "pagination": {"page": 1, "size": len(page), "total": len(page)}
+        },
+        message="Tasks retrieved successfully"
+    )
+
+
+def timed(page, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        body = render(page).body
+    return (time.perf_counter() - start) / iterations, body
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    page = tasks(size)
+    
+    settings.fragment_cache_size = 0
+    uncached, expected = timed(page, iterations)
+    settings.fragment_cache_size = 50000
+    render(page)
+    cached, body = timed(page, iterations)
+    assert body == expected, "spliced response differs from the encoded one"
+    
+    print(f"JSON response of {size} tasks ({len(body)} bytes)")
+    print(f"  dicts + jsonable_encoder   {uncached * 1e6:8.0f} µs  ({uncached / size * 1e6:6.2f} µs/row)")
+    print(f"  cached fragments           {cached * 1e6:8.0f} µs  ({cached / size * 1e6:6.2f} µs/row)")
+    print(f"  speedup: {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: task create throughput with one commit per create versus the
+group commit writer, against a file-backed SQLite database (so each commit
+pays for its fsync).
+
+Usage: python benchmarks/bench_group_commit.py [creates]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ["GROUP_COMMIT_ENABLED"] = "true"
+
+from app.database import SessionLocal, init_db
+from app.models import User
+from app.schemas.task import TaskCreate
+from app.services.group_commit import GroupCommitWriter
+from app.services.task_service import TaskService
+from app.utils.metrics import metrics
+
+
+def seed():
+    db = SessionLocal()
+    user = User(username="bench", email="bench@example.com", full_name="Bench", hashed_password="x")
+    db.add(user)
+    db.commit()
+    owner_id = user.id
+    db.close()
+    return owner_id
+
+
+def per_request(owner_id, count):
+    db = SessionLocal()
+    start = time.perf_counter()
+    for i in range(count):
+        TaskService.create_task(db, TaskCreate(title=f"Direct {i}", owner_id=owner_id))
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed
+
+
+async def grouped(owner_id, count, concurrency):
+    writer = GroupCommitWriter(window_seconds=0.002, max_batch=64)
+    writer.start()
+    db = SessionLocal()
+    queue = iter(range(count))
+    
+    async def client():
+        for i in queue:
+            await writer.submit(db, TaskService.create_task, TaskCreate(title=f"Grouped {i}", owner_id=owner_id))
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    await writer.stop()
+    db.close()
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    init_db()
+    owner_id = seed()
+    
+    print(f"Task creates on file-backed SQLite ({count} creates)")
+    direct = per_request(owner_id, count)
+    print(f"  {'one commit per create':<36} {count / direct:8.0f} creates/s")
+    batched = asyncio.run(grouped(owner_id, count, concurrency=64))
+    print(f"  {'group commit, 64 concurrent callers':<36} {count / batched:8.0f} creates/s")
+    print(f"  speedup: {direct / batched:.2f}x, "
+          f"{metrics.snapshot()['group_commit.writes_per_batch']} writes per batch")
+
+
+if __name__ == "__main__":
+    main()
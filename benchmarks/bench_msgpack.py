@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: JSON vs MessagePack action bodies and response envelopes.
+
+Compares payload size and the CPU time of each side of an exchange:
+- the server rendering an APIResponse envelope of a page of tasks
+  (jsonable_encoder + JSONResponse vs MsgPackResponse);
+- the client decoding it (json.loads vs msgpack.unpackb with timestamps
+  as datetimes);
+- the client encoding an edit action and the server validating it
+  (validate_json vs unpackb + validate_python).
+
+Usage: python benchmarks/bench_msgpack.py [tasks_per_page] [iterations]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import msgpack
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models.task import TaskPriority, TaskStatus
+from app.schemas.task import task_action_adapter
+from app.utils.content import packb, unpackb
+from app.utils.responses import MsgPackResponse
+
+
+def task_page(size):
+    now = datetime(2026, 1, 1, 12, 0)
+    return {
+        "tasks": [{
+            "id": 100000 + i,
+            "title": f"Task number {i}",
+            "description": "Follow up with the customer about the renewal" if i % 2 else None,
+            "status": list(TaskStatus)[i % 4],
+            "priority": list(TaskPriority)[i % 4],
+            "due_date": now + timedelta(days=i) if i % 3 else None,
+            "completed_at": now if i % 4 == 2 else None,
+            "owner_id": 42,
+            "tags": ["backend", "q3"] if i % 5 == 0 else [],
+            "created_at": now - timedelta(hours=i)
+        } for i in range(size)],
+        "pagination": {"page": 1, "size": size, "total": size}
+    }
+
+
+def timed(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    envelope = {"success": True, "message": "Tasks retrieved successfully", "data": task_page(size)}
+    
+    json_body = JSONResponse(content=jsonable_encoder(envelope)).body
+    msgpack_body = MsgPackResponse(content=envelope).body
+    print(f"Response envelope with {size} tasks")
+    print(f"  size      JSON {len(json_body):7d} B   MessagePack {len(msgpack_body):7d} B "
+          f"({len(msgpack_body) / len(json_body):.0%})")
+    encode_json = timed(lambda: JSONResponse(content=jsonable_encoder(envelope)), iterations)
+    encode_msgpack = timed(lambda: MsgPackResponse(content=envelope), iterations)
+    print(f"  encode    JSON {encode_json:7.0f} µs  MessagePack {encode_msgpack:7.0f} µs "
+          f"({encode_json / encode_msgpack:.1f}x)")
+    decode_json = timed(lambda: json.loads(json_body), iterations)
+    decode_msgpack = timed(lambda: msgpack.unpackb(msgpack_body, timestamp=3), iterations)
+    print(f"  decode    JSON {decode_json:7.0f} µs  MessagePack {decode_msgpack:7.0f} µs "
+          f"({decode_json / decode_msgpack:.1f}x; MessagePack returns datetimes, JSON strings)")
+    
+    action = {"action": "edit", "data": {
+        "id": 12345, "title": "Renamed task", "status": "in_progress", "priority": "high",
+        "due_date": datetime(2026, 3, 1, 9, 30), "tags": ["backend", "q3"], "version": 7
+    }}
+    json_request = json.dumps(jsonable_encoder(action)).encode()
+    msgpack_request = packb(action)
+    print("Edit action request")
+    print(f"  size      JSON {len(json_request):7d} B   MessagePack {len(msgpack_request):7d} B")
+    encode_json = timed(lambda: json.dumps(jsonable_encoder(action)).encode(), iterations * 10)
+    encode_msgpack = timed(lambda: packb(action), iterations * 10)
+    print(f"  encode    JSON {encode_json:7.1f} µs  MessagePack {encode_msgpack:7.1f} µs")
+    parse_json = timed(lambda: task_action_adapter.validate_json(json_request), iterations * 10)
+    parse_msgpack = timed(
+        lambda: task_action_adapter.validate_python(unpackb(msgpack_request)), iterations * 10
+    )
+    print(f"  validate  JSON {parse_json:7.1f} µs  MessagePack {parse_msgpack:7.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start. Each run is a fresh interpreter that imports
+app.main, runs the lifespan startup and serves its first requests (a task
+view and a user create) against an existing file-backed SQLite database,
+with and without the warm-up phase. Reports medians over the runs.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+
+async def call(path, body):
+    scope = {"type": "http", "method": "POST", "path": path,
+             "headers": [(b"content-type", b"application/json")], "query_string": b"",
+             "client": ("127.0.0.1", 1), "server": ("bench", 80), "scheme": "http", "root_path": ""}
+    sent = False
+    
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    
+    async def send(message):
+        pass
+    
+    began = time.perf_counter()
+    await app(scope, receive, send)
+    return time.perf_counter() - began
+
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        view = await call("/api/tasks/", b'{"action": "view", "data": {"id": 1}}')
+        create = await call("/api/users/", json.dumps({"action": "create", "data": {
+            "username": f"u{time.time_ns()}", "email": f"u{time.time_ns()}@example.com",
+            "full_name": "Bench", "password": "password123"}}).encode())
+    print(json.dumps({"import": imported - start, "startup": ready - imported,
+                      "first_view": view, "first_create": create}))
+
+
+asyncio.run(main())
+'''
+
+
+def run_child(env):
+    output = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    db_dir = tempfile.mkdtemp()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'bench.db')}",
+        LOG_FILE=os.path.join(db_dir, "bench.log"),
+        LOG_LEVEL="ERROR",
+        ADMISSION_ENABLED="false",
+    )
+    run_child(env)  # First boot creates the schema
+    
+    print(f"Cold start, median of {runs} fresh interpreters (schema already current)")
+    for warmup in ("false", "true"):
+        samples = [run_child(dict(env, STARTUP_WARMUP=warmup)) for _ in range(runs)]
+        median = {key: statistics.median(sample[key] for sample in samples) * 1000 for key in samples[0]}
+        print(f"  warm-up {warmup:<5}  import {median['import']:6.1f} ms  startup {median['startup']:6.1f} ms  "
+              f"first view {median['first_view']:6.1f} ms  first create {median['first_create']:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
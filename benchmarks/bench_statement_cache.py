@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-call overhead of ORM Query construction versus the
+pre-built statements in app.services.statements, on primary-key lookups
+and paginated listings against an in-memory SQLite database.
+
+Usage: python benchmarks/bench_statement_cache.py [iterations]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.database import SessionLocal, init_db
+from app.models import Task, User
+from app.services.statements import TASK_BY_ID, TASK_PAGES
+from app.utils.metrics import metrics
+
+
+def seed(db, count=1000):
+    user = User(username="bench", email="bench@example.com", full_name="Bench", hashed_password="x")
+    db.add(user)
+    db.flush()
+    db.add_all([Task(title=f"Task {i}", owner_id=user.id) for i in range(count)])
+    db.commit()
+    return user.id
+
+
+def timed(label, func, iterations):
+    func(0)  # warm up caches
+    start = time.perf_counter()
+    for i in range(iterations):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed / iterations * 1e6:8.1f} µs/call")
+    return elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    init_db()
+    db = SessionLocal()
+    owner_id = seed(db)
+
+    print(f"Primary-key lookup ({iterations} calls)")
+    orm = timed("  db.query(Task).filter(...).first()",
+                lambda i: db.query(Task).filter(Task.id == i % 1000 + 1).first(), iterations)
+    stmt = timed("  db.execute(TASK_BY_ID, params)",
+                 lambda i: db.execute(TASK_BY_ID, {"task_id": i % 1000 + 1}).scalars().first(), iterations)
+    print(f"  speedup: {orm / stmt:.2f}x")
+
+    print(f"Owner page of 10 ({iterations // 4} calls)")
+    orm = timed("  db.query(Task).filter().offset().limit()",
+                lambda i: db.query(Task).filter(Task.owner_id == owner_id).offset(i % 90).limit(10).all(),
+                iterations // 4)
+    stmt = timed("  db.execute(TASK_PAGES['owner'], params)",
+                 lambda i: db.execute(TASK_PAGES["owner"],
+                                      {"owner_id": owner_id, "hidden_owners": [],
+                                       "skip": i % 90, "limit": 10}).scalars().all(),
+                 iterations // 4)
+    print(f"  speedup: {orm / stmt:.2f}x")
+
+    print(f"Compiled cache hit rate: {metrics.snapshot()['sql.compiled_cache.hit_rate']}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: subtree reads from the closure table vs level-by-level queries.
+
+Builds a task hierarchy through TaskService (so the closure table is
+maintained as in production), then times a whole subtree, a rollup of
+subtask counts by status and an ancestor path, each one closure-table
+query, against the recursive approach: one children query per level by
+parent_id, or one parent lookup per ancestor.
+
+Usage: python benchmarks/bench_subtasks.py [fanout] [depth] [iterations]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from collections import Counter
+from sqlalchemy import select
+from app.database import SessionLocal, init_db
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.task import TaskCreate
+from app.services.task_service import TaskService
+
+
+def build(db, fanout, depth):
+    owner = User(username="bench", email="bench@example.com", full_name="Bench", hashed_password="x")
+    db.add(owner)
+    db.commit()
+    root = TaskService.create_task(db, TaskCreate(title="root", owner_id=owner.id))
+    level = [root.id]
+    count = 1
+    for _ in range(depth):
+        next_level = []
+        for parent_id in level:
+            for i in range(fanout):
+                task = TaskService.create_task(
+                    db, TaskCreate(title=f"task {i}", owner_id=owner.id, parent_id=parent_id)
+                )
+                next_level.append(task.id)
+        level = next_level
+        count += len(level)
+    return root.id, count
+
+
+def subtree_by_level(db, task_id):
+    """All subtasks by one children query per level."""
+    tasks, level = [], [task_id]
+    while level:
+        children = db.execute(select(Task).where(Task.parent_id.in_(level))).scalars().all()
+        tasks.extend(children)
+        level = [task.id for task in children]
+    return tasks
+
+
+def ancestors_by_parent(db, task_id):
+    """Ancestor path by following parent_id one task at a time."""
+    path = []
+    parent_id = db.execute(select(Task.parent_id).where(Task.id == task_id)).scalar()
+    while parent_id is not None:
+        path.append(parent_id)
+        parent_id = db.execute(select(Task.parent_id).where(Task.id == parent_id)).scalar()
+    return path
+
+
+def timed(label, func, iterations):
+    result = func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<28} {elapsed / iterations * 1e3:8.3f} ms")
+    return elapsed, result
+
+
+def compare(title, old_label, old, new_label, new, check, iterations):
+    print(f"  {title}")
+    old_time, expected = timed(old_label, old, iterations)
+    new_time, result = timed(new_label, new, iterations)
+    assert check(result) == check(expected)
+    print(f"    speedup: {old_time / new_time:.2f}x")
+
+
+def main():
+    fanout = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    iterations = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    init_db()
+    db = SessionLocal()
+    try:
+        root_id, count = build(db, fanout, depth)
+        leaf_id = root_id
+        for _ in range(depth):
+            leaf_id = db.execute(select(Task.id).where(Task.parent_id == leaf_id).limit(1)).scalar()
+        print(f"Hierarchy of {count} tasks (fanout {fanout}, depth {depth}), {iterations} iterations")
+        
+        compare(
+            "whole subtree of the root",
+            "children query per level", lambda: subtree_by_level(db, root_id),
+            "closure table", lambda: TaskService.get_task_subtree(db, root_id, limit=count),
+            lambda tasks: len(tasks), iterations
+        )
+        compare(
+            "subtask counts by status",
+            "children query per level", lambda: Counter(task.status.value for task in subtree_by_level(db, root_id)),
+            "closure table", lambda: TaskService.get_task_rollup(db, root_id),
+            lambda counts: sum(counts.values()), iterations
+        )
+        compare(
+            f"ancestor path of a depth-{depth} task",
+            "parent_id walk", lambda: ancestors_by_parent(db, leaf_id),
+            "closure table", lambda: TaskService.get_task_ancestors(db, leaf_id),
+            len, iterations
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
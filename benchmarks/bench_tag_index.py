@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: tag queries answered by the bitmap tag index vs SQL.
+
+Fills a SQLite database with tasks and task_tags rows, then times the same
+AND / OR / NOT tag queries (first page plus total count) as GROUP BY / NOT
+EXISTS queries over task_tags and through TagIndex.query.
+
+Usage: python benchmarks/bench_tag_index.py [tasks] [iterations]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import text
+from app.database import SessionLocal, engine, init_db
+from app.services.tag_index import tag_index
+
+TAGS = [f"tag{i}" for i in range(200)]
+STATUSES = ["PENDING", "IN_PROGRESS", "COMPLETED", "CANCELLED"]
+PRIORITIES = ["LOW", "MEDIUM", "HIGH", "URGENT"]
+
+QUERIES = [
+    ("all of 2 tags", ["tag1", "tag2"], [], []),
+    ("any of 3 tags", [], ["tag3", "tag4", "tag5"], []),
+    ("all + none", ["tag1"], [], ["tag2", "tag3"]),
+]
+
+
+def fill(count):
+    random.seed(7)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO users (username, email, full_name, hashed_password, is_active, version) "
+            "VALUES ('bench', 'bench@example.com', 'Bench', 'x', 1, 1)"
+        ))
+        conn.execute(
+            text("INSERT INTO tasks (id, title, status, priority, owner_id, version) "
+                 "VALUES (:id, 'task', :status, :priority, 1, 1)"),
+            [{"id": i, "status": random.choice(STATUSES), "priority": random.choice(PRIORITIES)}
+             for i in range(1, count + 1)]
+        )
+        # Skewed tag popularity, a few tags per task
+        conn.execute(
+            text("INSERT INTO task_tags (task_id, tag) VALUES (:task_id, :tag)"),
+            [{"task_id": i, "tag": tag}
+             for i in range(1, count + 1)
+             for tag in {TAGS[min(int(random.expovariate(0.05)), len(TAGS) - 1)] for _ in range(3)}]
+        )
+
+
+def sql_query(db, all_tags, any_tags, no_tags):
+    conditions, params = [], {}
+    if all_tags:
+        names = ", ".join(f":all{i}" for i in range(len(all_tags)))
+        conditions.append(f"t.id IN (SELECT task_id FROM task_tags WHERE tag IN ({names}) "
+                          f"GROUP BY task_id HAVING COUNT(*) = {len(all_tags)})")
+        params.update({f"all{i}": tag for i, tag in enumerate(all_tags)})
+    if any_tags:
+        names = ", ".join(f":any{i}" for i in range(len(any_tags)))
+        conditions.append(f"t.id IN (SELECT task_id FROM task_tags WHERE tag IN ({names}))")
+        params.update({f"any{i}": tag for i, tag in enumerate(any_tags)})
+    if no_tags:
+        names = ", ".join(f":none{i}" for i in range(len(no_tags)))
+        conditions.append(f"NOT EXISTS (SELECT 1 FROM task_tags x WHERE x.task_id = t.id AND x.tag IN ({names}))")
+        params.update({f"none{i}": tag for i, tag in enumerate(no_tags)})
+    where = " AND ".join(conditions)
+    total = db.execute(text(f"SELECT COUNT(*) FROM tasks t WHERE {where}"), params).scalar()
+    ids = db.execute(text(f"SELECT t.id FROM tasks t WHERE {where} ORDER BY t.id LIMIT 20"), params).scalars().all()
+    return total, ids
+
+
+def timed(label, func, iterations):
+    result = func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    print(f"    {label:<12} {elapsed / iterations * 1e6:10.1f} µs/query  ({result[0]} matches)")
+    return elapsed, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    init_db()
+    fill(count)
+    start = time.perf_counter()
+    tag_index.load()
+    print(f"Tag queries over {count} tasks (index loaded in {time.perf_counter() - start:.2f}s)")
+    
+    db = SessionLocal()
+    try:
+        for label, all_tags, any_tags, no_tags in QUERIES:
+            print(f"  {label}")
+            old, expected = timed("SQL", lambda: sql_query(db, all_tags, any_tags, no_tags), iterations)
+            new, result = timed("bitmaps", lambda: tag_index.query(all_tags, any_tags, no_tags, limit=20), iterations)
+            assert list(result[1]) == list(expected[1]) and result[0] == expected[0]
+            print(f"    speedup: {old / new:.1f}x")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of task history on the update path.
+
+Times the same stream of TaskService.update_task calls on a SQLite file
+database three ways: without history, with a history INSERT executed in
+every update's transaction (the naive design), and with entries buffered
+and inserted in one batch per flush. Then reports the
+size of the compact entry encoding against a JSON object of the same
+fields, and the time to rebuild a past state with and without snapshots.
+
+Usage: python benchmarks/bench_task_history.py [updates]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "bench.log"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from app.config import settings
+from app.database import SessionLocal, init_db
+from app.models.task import TaskPriority, TaskStatus
+from app.schemas.task import TaskCreate, TaskUpdate
+from app.schemas.user import UserCreate
+from app.services.statements import TASK_HISTORY_INSERT
+from app.services.task_history import encode, task_history
+from app.services.task_service import TaskService
+from app.services.user_service import UserService
+
+EDITS = [
+    TaskUpdate(title="renamed"),
+    TaskUpdate(status=TaskStatus.IN_PROGRESS),
+    TaskUpdate(priority=TaskPriority.HIGH, tags=["backend", "urgent"]),
+    TaskUpdate(due_date=datetime(2030, 1, 1, 12, 0)),
+    TaskUpdate(status=TaskStatus.COMPLETED),
+]
+
+
+def run_updates(db, task_ids, count):
+    start = time.perf_counter()
+    for i in range(count):
+        TaskService.update_task(db, task_ids[i % len(task_ids)], EDITS[i % len(EDITS)])
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    init_db()
+    # Only the explicit flushes below insert the buffer
+    settings.history_max_buffer = 10 ** 9
+    db = SessionLocal()
+    try:
+        owner = UserService.create_user(db, UserCreate(
+            username="bench", email="bench@example.com", full_name="Bench", password="password123"
+        ))
+        task_ids = [
+            TaskService.create_task(db, TaskCreate(title=f"task {i}", owner_id=owner.id)).id for i in range(100)
+        ]
+        # Warm-up, so the first measurement does not pay for caches and the page cache
+        run_updates(db, task_ids, min(count, 500))
+        task_history.flush()
+        
+        print(f"{count} update_task calls")
+        record = task_history.record
+        task_history.record = lambda *args, **kwargs: None
+        baseline = run_updates(db, task_ids, count)
+        task_history.record = record
+        print(f"  no history                      {count / baseline:8.0f} updates/s")
+        
+        task_history.record = lambda session, task_id, kind, changes=None: session.execute(TASK_HISTORY_INSERT, {
+            "task_id": task_id, "at": datetime.utcnow(), "kind": kind, "data": encode(changes or {})
+        })
+        inline = run_updates(db, task_ids, count)
+        task_history.record = record
+        print(f"  INSERT per update               {count / inline:8.0f} updates/s")
+        
+        buffered = run_updates(db, task_ids, count)
+        start = time.perf_counter()
+        flushed = task_history.flush()
+        flush = time.perf_counter() - start
+        print(f"  buffered                        {count / buffered:8.0f} updates/s "
+              f"(+ {flushed} entries flushed in {flush * 1000:.0f} ms)")
+        print(f"  overhead vs no history: inline {inline / baseline - 1:+.0%}, buffered {buffered / baseline - 1:+.0%}")
+        
+        task = TaskService.get_task_by_id(db, task_ids[0])
+        fields = {field: getattr(task, field) for field in (
+            "title", "description", "status", "priority", "due_date", "completed_at", "owner_id", "parent_id"
+        )}
+        verbose = json.dumps(fields, default=str)
+        print(f"Full state entry: {len(encode(fields))} bytes encoded vs {len(verbose)} bytes as a JSON object")
+        
+        as_of = datetime.utcnow()
+        for every in (settings.history_snapshot_every, 10 ** 9):
+            settings.history_snapshot_every = every
+            task_id = TaskService.create_task(db, TaskCreate(title="replayed", owner_id=owner.id)).id
+            for i in range(200):
+                TaskService.update_task(db, task_id, EDITS[i % len(EDITS)])
+            as_of = datetime.utcnow()
+            task_history.flush()
+            start = time.perf_counter()
+            for _ in range(100):
+                TaskService.get_task_state_at(db, task_id, as_of)
+            label = f"snapshot every {every} versions" if every < 10 ** 9 else "no snapshots"
+            print(f"State after 200 edits ({label}): {(time.perf_counter() - start) * 10:.2f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
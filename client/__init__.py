@@ -0,0 +1,17 @@
+"""
+Python client of the User Account and Tasks API action protocol.
+
+    with TaskAPIClient("http://localhost:8000") as api:
+        user = api.users.create(username="jane", email="jane@example.com",
+                                full_name="Jane", password="password123")
+        api.tasks.create(title="Write docs", owner_id=user["id"])
+        for task in api.tasks.iter(owner_id=user["id"]):
+            print(task["title"])
+
+AsyncTaskAPIClient offers the same methods as coroutines.
+"""
+from .base import APIError, ServerError, RetryPolicy
+from .sync import TaskAPIClient
+from .aio import AsyncTaskAPIClient
+
+__all__ = ["TaskAPIClient", "AsyncTaskAPIClient", "APIError", "ServerError", "RetryPolicy"]
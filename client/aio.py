@@ -0,0 +1,125 @@
+"""
+Asyncio client on a pooled HTTP/1.1 keep-alive connection pool.
+"""
+import asyncio
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+import httpx
+from client.base import (
+    Call, LIST_KEYS, Resource, RetryPolicy, ServerError,
+    action_path, envelope, request_content, request_headers, should_retry, unwrap
+)
+
+
+class AsyncTaskAPIClient:
+    """
+    Asyncio variant of TaskAPIClient with the same methods as coroutines.
+    Concurrent calls share the connection pool; `batch` bounds them to the
+    pool size. Pass `transport=httpx.ASGITransport(app=app)` to call an
+    application in-process.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:8000", token: Optional[str] = None,
+                 timeout: float = 10.0, max_connections: int = 16, retry: Optional[RetryPolicy] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, use_msgpack: bool = False):
+        self.max_connections = max_connections
+        self.retry = retry or RetryPolicy()
+        self.use_msgpack = use_msgpack
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+        if token:
+            self.token = token
+        self.users = Resource(self, "users")
+        self.tasks = Resource(self, "tasks")
+        self.jobs = Resource(self, "jobs")
+    
+    @property
+    def token(self) -> Optional[str]:
+        header = self._http.headers.get("authorization")
+        return header[len("Bearer "):] if header else None
+    
+    @token.setter
+    def token(self, value: Optional[str]) -> None:
+        if value:
+            self._http.headers["Authorization"] = f"Bearer {value}"
+        else:
+            self._http.headers.pop("Authorization", None)
+    
+    async def action(self, resource: str, action: str, data: Optional[Dict[str, Any]] = None,
+                     idempotency_key: Optional[str] = None) -> Any:
+        """Run one action and return its `data`; raises APIError when rejected."""
+        body = envelope(action, data)
+        headers = request_headers(resource, action, idempotency_key)
+        attempt = 1
+        while True:
+            try:
+                return unwrap(await self._http.post(
+                    action_path(resource), **request_content(resource, body, headers, self.use_msgpack)
+                ))
+            except Exception as e:
+                if not should_retry(e) or attempt >= self.retry.attempts:
+                    raise
+                await asyncio.sleep(self.retry.delay(attempt, e.retry_after if isinstance(e, ServerError) else None))
+                attempt += 1
+    
+    async def login(self, username: str, password: str) -> str:
+        """Log in and send the returned token with every later call."""
+        data = await self.action("users", "login", {"username": username, "password": password})
+        self.token = data["access_token"]
+        return self.token
+    
+    async def batch(self, calls: Iterable[Call], return_exceptions: bool = False) -> List[Any]:
+        """
+        Run many actions concurrently over the connection pool and return
+        their results in order. With return_exceptions, failed calls give
+        their exception instead of raising the first one.
+        """
+        slots = asyncio.Semaphore(self.max_connections)
+        
+        async def run(call: Call) -> Any:
+            async with slots:
+                return await self.action(*call)
+        
+        return await asyncio.gather(*(run(call) for call in calls), return_exceptions=return_exceptions)
+    
+    async def iter_pages(self, resource: str, selectors: Optional[Dict[str, Any]] = None,
+                         size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Every item of a paginated view, page after page."""
+        page = 1
+        while True:
+            data = await self.action(resource, "view", {**(selectors or {}), "page": page, "size": size})
+            items = data[LIST_KEYS[resource]]
+            for item in items:
+                yield item
+            if len(items) < size:
+                return
+            page += 1
+    
+    async def iter_changes(self, since: int = 0, wait: float = 0,
+                           follow: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Change events after `since`, following the feed's cursor. With
+        `follow`, keeps long-polling (`wait` seconds, 30 by default) for new
+        events instead of stopping at the end of the feed.
+        """
+        if follow and not wait:
+            wait = 30
+        while True:
+            feed = await self.action("changes", "view", {"since": since, "wait": wait})
+            for event in feed["events"]:
+                yield event
+            if feed["last_seq"] == since and not follow:
+                return
+            since = feed["last_seq"]
+    
+    async def close(self) -> None:
+        await self._http.aclose()
+    
+    async def __aenter__(self) -> "AsyncTaskAPIClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,160 @@
+"""
+Pieces shared by the sync and async clients: the action envelope, response
+unwrapping, the retry policy and the per-resource helpers.
+"""
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+import httpx
+import msgpack
+
+# Actions that create rows; they carry an Idempotency-Key so retries are safe
+IDEMPOTENT_CREATES = {("users", "create"), ("tasks", "create")}
+
+# Key of the item list in the data of each paginated "view"
+LIST_KEYS = {"users": "users", "tasks": "tasks", "jobs": "jobs"}
+
+# Routers that accept and return MessagePack bodies
+MSGPACK = "application/msgpack"
+MSGPACK_RESOURCES = {"users", "tasks"}
+
+# One action call of a batch: (resource, action, data)
+Call = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class APIError(Exception):
+    """An action the API rejected (a 200 response with "success": false)."""
+    
+    def __init__(self, reason: str, status_code: int = 200, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ServerError(APIError):
+    """A 500 response: a server failure or a shed request (with retry_after)."""
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Retries of transport errors and 500 responses, with exponential backoff
+    and full jitter. A Retry-After hint from load shedding is honoured.
+    """
+    attempts: int = 4
+    backoff: float = 0.1
+    max_backoff: float = 5.0
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait after failed attempt number `attempt` (1-based)."""
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        return random.uniform(0, min(self.backoff * 2 ** (attempt - 1), self.max_backoff))
+
+
+def action_path(resource: str) -> str:
+    # The routers are mounted with a trailing slash; posting to it avoids a redirect
+    return f"/api/{resource}/"
+
+
+def envelope(action: str, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    body: Dict[str, Any] = {"action": action}
+    if data is not None:
+        body["data"] = data
+    return body
+
+
+def request_headers(resource: str, action: str, idempotency_key: Optional[str]) -> Dict[str, str]:
+    """Headers of one logical call, reused by all of its attempts."""
+    if idempotency_key is None and (resource, action) in IDEMPOTENT_CREATES:
+        idempotency_key = uuid.uuid4().hex
+    return {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+
+
+def _pack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # Naive datetimes are UTC, as in the API
+        return msgpack.Timestamp.from_datetime(value if value.tzinfo else value.replace(tzinfo=timezone.utc))
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def request_content(resource: str, body: Dict[str, Any], headers: Dict[str, str],
+                    use_msgpack: bool) -> Dict[str, Any]:
+    """Keyword arguments of the POST of one action: a JSON or a MessagePack body."""
+    if use_msgpack and resource in MSGPACK_RESOURCES:
+        return {
+            "content": msgpack.packb(body, default=_pack_default),
+            "headers": {**headers, "Content-Type": MSGPACK, "Accept": MSGPACK}
+        }
+    return {"json": body, "headers": headers}
+
+
+def unwrap(response: httpx.Response) -> Any:
+    """The `data` of a successful response; raises APIError or ServerError otherwise."""
+    try:
+        if response.headers.get("content-type", "").startswith(MSGPACK):
+            body = msgpack.unpackb(response.content, timestamp=3)
+        else:
+            body = response.json()
+    except (ValueError, msgpack.UnpackException):
+        body = {"success": False, "reason": response.text or f"HTTP {response.status_code}"}
+    if response.status_code >= 500:
+        retry_after = body.get("retry_after") or response.headers.get("retry-after")
+        raise ServerError(
+            body.get("reason", "Internal server error"),
+            response.status_code,
+            float(retry_after) if retry_after is not None else None
+        )
+    if response.status_code != 200 or not body.get("success"):
+        raise APIError(body.get("reason") or body.get("detail") or f"HTTP {response.status_code}",
+                       response.status_code)
+    return body.get("data")
+
+
+def should_retry(error: Exception) -> bool:
+    return isinstance(error, (httpx.TransportError, ServerError))
+
+
+class Resource:
+    """
+    Actions of one router, e.g. `client.tasks.edit(3, status="completed")`.
+    Methods return what the client's `action` returns, so on the async
+    client they are awaitable.
+    """
+    
+    def __init__(self, client, name: str):
+        self._client = client
+        self.name = name
+    
+    def create(self, idempotency_key: Optional[str] = None, **fields):
+        return self._client.action(self.name, "create", fields, idempotency_key=idempotency_key)
+    
+    def edit(self, id: int, version: Optional[int] = None, **fields):
+        """Edit fields; with `version` the edit fails if the row changed since."""
+        if version is not None:
+            fields["version"] = version
+        return self._client.action(self.name, "edit", {"id": id, **fields})
+    
+    def get(self, id: int, **options):
+        return self._client.action(self.name, "view", {"id": id, **options})
+    
+    def view(self, **selectors):
+        return self._client.action(self.name, "view", selectors)
+    
+    def delete(self, id: int):
+        return self._client.action(self.name, "delete", {"id": id})
+    
+    def bulk_edit(self, filter: Dict[str, Any], patch: Dict[str, Any]):
+        return self._client.action(self.name, "bulk_edit", {"filter": filter, "patch": patch})
+    
+    def iter(self, size: int = 100, **selectors):
+        """Every item of a paginated view, following pages until a short one."""
+        return self._client.iter_pages(self.name, selectors, size)
@@ -0,0 +1,133 @@
+"""
+Blocking client on a pooled HTTP/1.1 keep-alive connection pool.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import httpx
+from client.base import (
+    Call, LIST_KEYS, Resource, RetryPolicy, ServerError,
+    action_path, envelope, request_content, request_headers, should_retry, unwrap
+)
+
+
+class TaskAPIClient:
+    """
+    Client of the action endpoints.
+    
+    Connections are kept alive and reused across calls (and threads; the
+    client is thread-safe). Creates carry an Idempotency-Key, so every call
+    can be retried after transport errors and 500 responses. With
+    `use_msgpack`, user and task actions are sent and received as
+    MessagePack, and returned timestamps are datetimes instead of strings.
+    """
+    
+    def __init__(self, base_url: str = "http://localhost:8000", token: Optional[str] = None,
+                 timeout: float = 10.0, max_connections: int = 16, retry: Optional[RetryPolicy] = None,
+                 transport: Optional[httpx.BaseTransport] = None, use_msgpack: bool = False):
+        self.max_connections = max_connections
+        self.retry = retry or RetryPolicy()
+        self.use_msgpack = use_msgpack
+        self._http = httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if token:
+            self.token = token
+        self.users = Resource(self, "users")
+        self.tasks = Resource(self, "tasks")
+        self.jobs = Resource(self, "jobs")
+    
+    @property
+    def token(self) -> Optional[str]:
+        header = self._http.headers.get("authorization")
+        return header[len("Bearer "):] if header else None
+    
+    @token.setter
+    def token(self, value: Optional[str]) -> None:
+        if value:
+            self._http.headers["Authorization"] = f"Bearer {value}"
+        else:
+            self._http.headers.pop("Authorization", None)
+    
+    def action(self, resource: str, action: str, data: Optional[Dict[str, Any]] = None,
+               idempotency_key: Optional[str] = None) -> Any:
+        """Run one action and return its `data`; raises APIError when rejected."""
+        body = envelope(action, data)
+        headers = request_headers(resource, action, idempotency_key)
+        attempt = 1
+        while True:
+            try:
+                return unwrap(self._http.post(
+                    action_path(resource), **request_content(resource, body, headers, self.use_msgpack)
+                ))
+            except Exception as e:
+                if not should_retry(e) or attempt >= self.retry.attempts:
+                    raise
+                time.sleep(self.retry.delay(attempt, e.retry_after if isinstance(e, ServerError) else None))
+                attempt += 1
+    
+    def login(self, username: str, password: str) -> str:
+        """Log in and send the returned token with every later call."""
+        data = self.action("users", "login", {"username": username, "password": password})
+        self.token = data["access_token"]
+        return self.token
+    
+    def batch(self, calls: Iterable[Call], return_exceptions: bool = False) -> List[Any]:
+        """
+        Run many actions concurrently over the connection pool and return
+        their results in order. With return_exceptions, failed calls give
+        their exception instead of raising the first one.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_connections, thread_name_prefix="api-client")
+        futures = [self._executor.submit(self.action, *call) for call in calls]
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else future.result())
+        return results
+    
+    def iter_pages(self, resource: str, selectors: Optional[Dict[str, Any]] = None,
+                   size: int = 100) -> Iterator[Dict[str, Any]]:
+        """Every item of a paginated view, page after page."""
+        page = 1
+        while True:
+            data = self.action(resource, "view", {**(selectors or {}), "page": page, "size": size})
+            items = data[LIST_KEYS[resource]]
+            yield from items
+            if len(items) < size:
+                return
+            page += 1
+    
+    def iter_changes(self, since: int = 0, wait: float = 0, follow: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Change events after `since`, following the feed's cursor. With
+        `follow`, keeps long-polling (`wait` seconds, 30 by default) for new
+        events instead of stopping at the end of the feed.
+        """
+        if follow and not wait:
+            wait = 30
+        while True:
+            feed = self.action("changes", "view", {"since": since, "wait": wait})
+            yield from feed["events"]
+            if feed["last_seq"] == since and not follow:
+                return
+            since = feed["last_seq"]
+    
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._http.close()
+    
+    def __enter__(self) -> "TaskAPIClient":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
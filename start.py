@@ -5,11 +5,12 @@ Startup script for the User Account and Tasks API
 
 import uvicorn
 from app.config import settings
-from app.utils.logging import get_logger
+from app.utils.logging import get_logger, setup_logging
 
 logger = get_logger(__name__)
 
 if __name__ == "__main__":
+    setup_logging()
     logger.info("Starting User Account and Tasks API...")
     
     uvicorn.run(